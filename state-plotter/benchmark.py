@@ -0,0 +1,575 @@
+#!/usr/bin/env python3
+
+# ------------------------------------------------------------------------------
+# Copyright (c) 2019, Battelle Memorial Institute All rights reserved.
+# Battelle Memorial Institute (hereinafter Battelle) hereby grants permission to any person or entity
+# lawfully obtaining a copy of this software and associated documentation files (hereinafter the
+# Software) to redistribute and use the Software in source and binary forms, with or without modification.
+# Such person or entity may use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and may permit others to do so, subject to the following conditions:
+# Redistributions of source code must retain the above copyright notice, this list of conditions and the
+# following disclaimers.
+# Redistributions in binary form must reproduce the above copyright notice, this list of conditions and
+# the following disclaimer in the documentation and/or other materials provided with the distribution.
+# Other than as used herein, neither the name Battelle Memorial Institute or Battelle may be used in any
+# form whatsoever without the express written consent of Battelle.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL
+# BATTELLE OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE
+# GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED
+# AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+# General disclaimer for use with OSS licenses
+#
+# This material was prepared as an account of work sponsored by an agency of the United States Government.
+# Neither the United States Government nor the United States Department of Energy, nor Battelle, nor any
+# of their employees, nor any jurisdiction or organization that has cooperated in the development of these
+# materials, makes any warranty, express or implied, or assumes any legal liability or responsibility for
+# the accuracy, completeness, or usefulness or any information, apparatus, product, software, or process
+# disclosed, or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or service by trade name, trademark, manufacturer,
+# or otherwise does not necessarily constitute or imply its endorsement, recommendation, or favoring by the United
+# States Government or any agency thereof, or Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by BATTELLE for the
+# UNITED STATES DEPARTMENT OF ENERGY under Contract DE-AC05-76RL01830
+"""
+Benchmark suite for the state plotter.
+
+Each case runs state-plotter.py on a -replay journal or a -synthetic
+feeder, fed as fast as it is processed, in one plotting mode such as
+-stats, -all or -bus. Every case is a separate process so peak memory and
+module state belong to that case alone. Inside it the plotter runs with the
+Agg backend, so rendering is timed without a display, and the show call
+becomes a loop that drains the message queue and redraws the way the GUI
+timers would. Messages are fed only once startup has finished, so they are
+timed as they arrive rather than when replayed from the startup buffer,
+and the feed waits after each estimate until it has been drawn, so every
+case redraws once per timestamp.
+
+The message callbacks and the functions for the join, aggregation, plot
+update and draw stages are wrapped with timers before the plotter starts.
+Each case reports the count, total, mean, median, 95th percentile and
+maximum milliseconds for each of them along with its peak resident
+memory, and the results for all the cases are written as JSON together
+with the git commit they were run on. Two results files, say from before
+and after a change, are compared with -compare.
+
+Journals for the IEEE 13, IEEE 123 and 9500 node models are recorded with
+state-plotter.py -journal against a running GridAPPS-D simulation.
+
+@author: Gary D. Black
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import platform
+import subprocess
+import tempfile
+import importlib.util
+
+import numpy as np
+
+from messagejournal import JournalReader
+from startupreport import peakMemoryMB
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PLOTTER_PATH = os.path.join(SCRIPT_DIR, 'state-plotter.py')
+
+# the plotting modes, with None standing for the -bus arguments picked for
+# each source
+MODE_DICT = {
+    'stats': ['-stats'],
+    'all': ['-all'],
+    'number': ['-100'],
+    'bus': [None],
+    'overlay': ['-overlay', None],
+    'match': ['-all', '-match'],
+    'ang': ['-ang', '-all'],
+}
+
+# number of buses plotted by the -bus and -overlay modes
+BUS_COUNT = 10
+
+# default -synthetic size when no source is given
+DEFAULT_BUSES = 50000
+DEFAULT_TIMESTAMPS = 20
+
+CALLBACK_NAMES = ('simulationCallback',
+                  'measurementConfigCallback', 'measurementNoConfigCallback',
+                  'measurementStatsCallback',
+                  'sensorConfigCallback', 'sensorNoConfigCallback',
+                  'sensorStatsCallback',
+                  'estimateConfigCallback', 'estimateNoConfigCallback',
+                  'estimateStatsCallback')
+
+# functions timed for each stage other than the callbacks, none of which
+# call another in the same stage so their times add up
+STAGE_DICT = {
+    'join': ('findMeasTS', 'indexEstimates'),
+    'aggregate': ('normalizeBatch', 'aggregateStats'),
+    'update': ('plotMeasurementData', 'plotEstimateData'),
+    'draw': ('updatePlots',),
+}
+
+# summary metrics compared between results files, all lower is better
+SUMMARY_NAMES = ('callbackMeanMs', 'callbackP95Ms', 'joinMs', 'aggregateMs',
+                 'updateMeanMs', 'drawMeanMs', 'drawP95Ms', 'startupSeconds',
+                 'seconds', 'peakMB')
+
+
+def timingStats(durations):
+    # milliseconds for a list of durations in seconds
+    if len(durations) == 0:
+        return {'count': 0}
+
+    ms = np.array(durations) * 1000.0
+    return {'count': len(ms), 'totalMs': round(float(ms.sum()), 3),
+            'meanMs': round(float(ms.mean()), 3),
+            'p50Ms': round(float(np.percentile(ms, 50)), 3),
+            'p95Ms': round(float(np.percentile(ms, 95)), 3),
+            'maxMs': round(float(ms.max()), 3)}
+
+
+def timed(func, durations):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            durations.append(time.perf_counter() - start)
+
+    return wrapper
+
+
+def runCase(resultPath, plotterArgs):
+    # runs in the case process, with the plotter loaded as a module so its
+    # functions can be wrapped before _main subscribes the callbacks
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    # the plotter finds its icons relative to its own directory
+    os.chdir(SCRIPT_DIR)
+    spec = importlib.util.spec_from_file_location('stateplotter',
+                                                  PLOTTER_PATH)
+    sp = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sp)
+
+    durationDict = {}
+    for name in CALLBACK_NAMES + sum(STAGE_DICT.values(), ()):
+        durationDict[name] = []
+        setattr(sp, name, timed(getattr(sp, name), durationDict[name]))
+
+    # hold back the feed until the plot setup is done
+    startupFinishedEvent = threading.Event()
+    startupSeconds = None
+    finishStartup = sp.finishStartup
+
+    def timedFinishStartup():
+        nonlocal startupSeconds
+        finishStartup()
+        startupSeconds = time.perf_counter() - start
+        startupFinishedEvent.set()
+
+    sp.finishStartup = timedFinishStartup
+
+    for feedClass in (sp.ReplayGridAPPSD, sp.SyntheticGridAPPSD):
+        def deferredStart(self, doneCallback=None, feedStart=feedClass.start):
+            def waitStart():
+                startupFinishedEvent.wait()
+                feedStart(self, doneCallback)
+
+            threading.Thread(target=waitStart, daemon=True).start()
+
+        feedClass.start = deferredStart
+
+    # the feed waits after each estimate until it has been plotted so
+    # there is one redraw per timestamp however fast messages are fed
+    frameSemaphore = threading.Semaphore(0)
+    queueCallback = sp.queueCallback
+
+    def pacedQueueCallback(callback, dirtyPlots, topicName):
+        enqueue = queueCallback(callback, dirtyPlots, topicName)
+        if 'est' not in dirtyPlots:
+            return enqueue
+
+        def pacedEnqueue(header, message):
+            enqueue(header, message)
+            if 'processStatus' not in message:
+                frameSemaphore.acquire()
+
+        return pacedEnqueue
+
+    sp.queueCallback = pacedQueueCallback
+
+    def estimateCount():
+        return sum(len(durationDict[name]) for name in CALLBACK_NAMES
+                   if name.startswith('estimate'))
+
+    def plotLoop():
+        # stands in for the drain and redraw timers of the plot window
+        while True:
+            feedDoneFlag = sp.feedDoneEvent.is_set()
+            estimates = estimateCount()
+            sp.drainQueueCallback()
+            if sp.startupError and sp.startupMsgList is None:
+                return
+
+            doneFlag = feedDoneFlag and sp.startupMsgList is None and \
+                       sp.replayMsgList is None and sp.msgQueue.empty()
+            frames = estimateCount() - estimates
+            if frames > 0 or doneFlag:
+                sp.redrawPlotsCallback()
+            for frame in range(frames):
+                frameSemaphore.release()
+
+            if doneFlag:
+                return
+
+            time.sleep(0.001)
+
+    plt.show = plotLoop
+    sys.argv = [PLOTTER_PATH] + plotterArgs
+
+    start = time.perf_counter()
+    exitCode = 0
+    try:
+        sp._main()
+    except SystemExit as e:
+        exitCode = e.code
+    seconds = time.perf_counter() - start
+
+    callbackDurations = sum((durationDict[name]
+                             for name in CALLBACK_NAMES), [])
+    callbackStats = timingStats(callbackDurations)
+    stageDict = {}
+    for stage, names in STAGE_DICT.items():
+        stageDict[stage] = {name: timingStats(durationDict[name])
+                            for name in names}
+    drawStats = timingStats(durationDict['updatePlots'])
+    updateStats = timingStats(durationDict['plotMeasurementData'] +
+                              durationDict['plotEstimateData'])
+
+    def stageMs(stage):
+        return round(sum(stats.get('totalMs', 0.0)
+                         for stats in stageDict[stage].values()), 3)
+
+    resultDict = {
+        'args': plotterArgs,
+        'exitCode': exitCode,
+        'planEntries': len(sp.estJoinPlanDict),
+        'measurements': len(sp.measJoinPlanDict),
+        'series': sum(len(store.keys()) for store in
+                      (sp.measStore, sp.estStore, sp.diffMeasStore,
+                       sp.diffEstStore)),
+        'messages': callbackStats['count'],
+        'summary': {
+            'callbackMeanMs': callbackStats.get('meanMs'),
+            'callbackP95Ms': callbackStats.get('p95Ms'),
+            'joinMs': stageMs('join'),
+            'aggregateMs': stageMs('aggregate'),
+            'updateMeanMs': updateStats.get('meanMs'),
+            'drawMeanMs': drawStats.get('meanMs'),
+            'drawP95Ms': drawStats.get('p95Ms'),
+            'startupSeconds': startupSeconds and round(startupSeconds, 3),
+            'seconds': round(seconds, 3),
+            'peakMB': peakMemoryMB()},
+        'callbacks': {name: timingStats(durationDict[name])
+                      for name in CALLBACK_NAMES if durationDict[name]},
+        'stages': stageDict,
+    }
+    with open(resultPath, 'w') as resultFile:
+        json.dump(resultDict, resultFile, indent=1)
+
+
+def sourceBuses(source):
+    # names of the first buses of a source for the -bus modes
+    if source['kind'] == 'synthetic':
+        # the synthetic feeder numbers its buses in order
+        return ['bus' + str(bus)
+                for bus in range(min(BUS_COUNT, source['buses']))]
+
+    # the estimate node query response lists every bus name
+    nameSet = set()
+    for response in JournalReader(source['path']).responseDict.values():
+        try:
+            bindings = response['data']['results']['bindings']
+        except (KeyError, TypeError):
+            continue
+        nameSet.update(binding['cnname']['value'] for binding in bindings
+                       if 'cnname' in binding)
+    return sorted(nameSet)[:BUS_COUNT]
+
+
+def sourceArgs(source, timestamps):
+    # plotter arguments feeding a source as fast as it is processed,
+    # without the metadata cache so every case makes the same queries
+    if source['kind'] == 'synthetic':
+        return ['-synthetic', str(source['buses']),
+                '-timestamps', str(timestamps), '-speed', '0', '-nocache']
+
+    return ['-replay', source['path'], '-speed', '0', '-nocache']
+
+
+def gitCommit():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short',
+                                          'HEAD'], cwd=SCRIPT_DIR,
+                                         stderr=subprocess.DEVNULL)
+        status = subprocess.check_output(['git', 'status', '--porcelain',
+                                          '--untracked-files=no'],
+                                         cwd=SCRIPT_DIR,
+                                         stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return commit.decode().strip() + ('-dirty' if status.strip() else '')
+
+
+def runSuite(sourceList, modeList, timestamps, repeat, outputPath,
+             verboseFlag):
+    caseList = []
+    for source in sourceList:
+        try:
+            busList = sourceBuses(source)
+        except (OSError, ValueError) as e:
+            print('benchmark: ERROR: unable to read journal: ' + str(e), flush=True)
+            continue
+
+        baseArgs = sourceArgs(source, timestamps)
+        busArgs = sum((['-bus', bus] for bus in busList), [])
+
+        for mode in modeList:
+            modeArgs = []
+            for arg in MODE_DICT[mode]:
+                modeArgs.extend(busArgs if arg is None else [arg])
+
+            print('benchmark: ' + source['label'] + ' ' + mode + ' ' + ' '.join(modeArgs), flush=True)
+            runList = []
+            for run in range(repeat):
+                with tempfile.TemporaryDirectory() as tempDir:
+                    resultPath = os.path.join(tempDir, 'case.json')
+                    proc = subprocess.run([sys.executable,
+                                           os.path.abspath(__file__), '-case',
+                                           resultPath] + baseArgs + modeArgs,
+                                          stdout=None if verboseFlag else subprocess.PIPE,
+                                          stderr=subprocess.STDOUT)
+                    if proc.returncode!=0 or not os.path.exists(resultPath):
+                        print('benchmark: ERROR: case failed with exit status ' + str(proc.returncode), flush=True)
+                        if proc.stdout:
+                            print(proc.stdout.decode()[-2000:], flush=True)
+                        break
+
+                    with open(resultPath) as resultFile:
+                        runList.append(json.load(resultFile))
+
+            if len(runList) == 0:
+                continue
+
+            # the fastest run in detail with the best of each summary metric
+            # over the repeats, which is least affected by other load
+            caseDict = min(runList, key=lambda r: r['summary']['seconds'])
+            for name in SUMMARY_NAMES:
+                valueList = [r['summary'][name] for r in runList
+                             if r['summary'][name] is not None]
+                caseDict['summary'][name] = min(valueList) \
+                        if valueList else None
+            caseDict.update(source=source['label'], mode=mode, runs=len(runList))
+            caseList.append(caseDict)
+
+            summary = caseDict['summary']
+            print('benchmark: ' + str(caseDict['measurements']) + ' measurements, ' + str(caseDict['messages']) + ' messages, callback mean ' + str(summary['callbackMeanMs']) + ' ms, join ' + str(summary['joinMs']) + ' ms, aggregate ' + str(summary['aggregateMs']) + ' ms, draw mean ' + str(summary['drawMeanMs']) + ' ms, peak memory ' + str(summary['peakMB']) + ' MB', flush=True)
+
+    resultsDict = {
+        'commit': gitCommit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamps': timestamps,
+        'cases': caseList,
+    }
+    with open(outputPath, 'w') as outputFile:
+        json.dump(resultsDict, outputFile, indent=1)
+    print('benchmark: wrote ' + str(len(caseList)) + ' cases to ' + outputPath, flush=True)
+
+
+def compareResults(basePath, newPath, tolerance):
+    # prints each summary metric of the cases run in both files with the
+    # percent change, returning the number changed by more than tolerance
+    # percent for the worse
+    with open(basePath) as baseFile:
+        baseDict = json.load(baseFile)
+    with open(newPath) as newFile:
+        newDict = json.load(newFile)
+
+    baseCaseDict = {(case['source'], case['mode']): case
+                    for case in baseDict['cases']}
+    print('benchmark: comparing ' + str(baseDict['commit']) + ' to ' + str(newDict['commit']), flush=True)
+
+    regressions = 0
+    for case in newDict['cases']:
+        key = (case['source'], case['mode'])
+        if key not in baseCaseDict:
+            continue
+
+        print('\n' + key[0] + ' ' + key[1] + ':')
+        for name in SUMMARY_NAMES:
+            base = baseCaseDict[key]['summary'].get(name)
+            new = case['summary'].get(name)
+            if base is None or new is None:
+                continue
+
+            change = 100.0*(new - base)/base if base else 0.0
+            flag = ''
+            if change > tolerance:
+                flag = '  <-- slower' if name != 'peakMB' else '  <-- larger'
+                regressions += 1
+            print('  {:<16}{:>12}{:>12}{:>+9.1f}%{}'.format(name, base, new, change, flag))
+
+    print('\nbenchmark: ' + str(regressions) + ' metrics worse by more than ' + str(tolerance) + '%', flush=True)
+    return regressions
+
+
+def _main():
+    if len(sys.argv) > 1 and sys.argv[1] == '-case':
+        runCase(sys.argv[2], sys.argv[3:])
+        return
+
+    if '-help' in sys.argv:
+        usestr =  '\nUsage: ' + sys.argv[0] + ' [options]\n'
+        usestr += '       ' + sys.argv[0] + ' -compare baseFile newFile\n'
+        usestr += '''
+Optional command line arguments:
+        -journal: benchmarks the journal file recorded with state-plotter.py
+         -journal given as the argument that follows, labeled by the
+         argument after that, e.g. "-journal ieee13.jrn ieee13". Can be
+         repeated to benchmark several models.
+        -synthetic: benchmarks a -synthetic feeder with the number of buses
+         given as the argument that follows. Can be repeated. Without any
+         -journal or -synthetic options a 50000 bus feeder is benchmarked.
+        -timestamps: number of -synthetic timestamps given as the argument
+         that follows (default 20)
+        -mode: benchmarks only the plotting mode given as the argument that
+         follows, one of stats, all, number (-100), bus (-bus with ten of
+         the buses), overlay (-overlay with the same buses), match
+         (-all -match) and ang (-ang -all). Can be repeated. By default all
+         of them are run.
+        -repeat: number of times each case is run given as the argument
+         that follows (default 1), keeping the best of each metric
+        -output: JSON file the results are written to given as the argument
+         that follows (default benchmark-<commit>.json)
+        -compare: compares the results file given as the argument that
+         follows with the one given after that, showing the percent change
+         in each metric for the cases in both. The exit status is 1 when
+         any got worse by more than -tolerance.
+        -tolerance: percent change allowed by -compare given as the argument
+         that follows (default 10)
+        -verbose: shows the plotter output for each case
+        -help: show this usage message
+        '''
+        print(usestr, flush=True)
+        exit()
+
+    sourceList = []
+    modeList = []
+    timestamps = DEFAULT_TIMESTAMPS
+    repeat = 1
+    outputPath = None
+    comparePathList = []
+    tolerance = 10.0
+    verboseFlag = False
+
+    journalPath = None
+    journalFlag = False
+    syntheticFlag = False
+    timestampsFlag = False
+    modeFlag = False
+    repeatFlag = False
+    outputFlag = False
+    compareFlag = False
+    toleranceFlag = False
+    for arg in sys.argv[1:]:
+        if journalFlag:
+            if journalPath is None:
+                journalPath = arg
+            else:
+                sourceList.append({'kind': 'journal', 'label': arg,
+                                   'path': os.path.abspath(journalPath)})
+                journalPath = None
+                journalFlag = False
+        elif syntheticFlag:
+            buses = max(int(arg), 1)
+            sourceList.append({'kind': 'synthetic', 'buses': buses,
+                               'label': 'synthetic-' + str(buses)})
+            syntheticFlag = False
+        elif timestampsFlag:
+            timestamps = max(int(arg), 1)
+            timestampsFlag = False
+        elif modeFlag:
+            if arg not in MODE_DICT:
+                print('benchmark: ERROR: unknown mode ' + arg + ', expected one of ' + ', '.join(MODE_DICT), flush=True)
+                exit(1)
+            modeList.append(arg)
+            modeFlag = False
+        elif repeatFlag:
+            repeat = max(int(arg), 1)
+            repeatFlag = False
+        elif outputFlag:
+            outputPath = arg
+            outputFlag = False
+        elif compareFlag:
+            comparePathList.append(arg)
+            compareFlag = len(comparePathList) < 2
+        elif toleranceFlag:
+            tolerance = float(arg)
+            toleranceFlag = False
+        elif arg == '-journal':
+            journalFlag = True
+        elif arg == '-synthetic':
+            syntheticFlag = True
+        elif arg == '-timestamps':
+            timestampsFlag = True
+        elif arg == '-mode':
+            modeFlag = True
+        elif arg == '-repeat':
+            repeatFlag = True
+        elif arg == '-output':
+            outputFlag = True
+        elif arg == '-compare':
+            compareFlag = True
+        elif arg == '-tolerance':
+            toleranceFlag = True
+        elif arg == '-verbose':
+            verboseFlag = True
+        else:
+            print('benchmark: WARNING: unknown command line argument ' + arg, flush=True)
+
+    if comparePathList:
+        if len(comparePathList) < 2:
+            print('benchmark: ERROR: -compare needs two results files', flush=True)
+            exit(1)
+        exit(1 if compareResults(*comparePathList, tolerance) else 0)
+
+    if len(sourceList) == 0:
+        sourceList.append({'kind': 'synthetic', 'buses': DEFAULT_BUSES,
+                           'label': 'synthetic-' + str(DEFAULT_BUSES)})
+    if len(modeList) == 0:
+        modeList = list(MODE_DICT)
+    if outputPath is None:
+        outputPath = 'benchmark-' + (gitCommit() or 'results') + '.json'
+
+    runSuite(sourceList, modeList, timestamps, repeat, outputPath,
+             verboseFlag)
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,223 @@
+# ------------------------------------------------------------------------------
+# Copyright (c) 2019, Battelle Memorial Institute All rights reserved.
+# Battelle Memorial Institute (hereinafter Battelle) hereby grants permission to any person or entity
+# lawfully obtaining a copy of this software and associated documentation files (hereinafter the
+# Software) to redistribute and use the Software in source and binary forms, with or without modification.
+# Such person or entity may use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and may permit others to do so, subject to the following conditions:
+# Redistributions of source code must retain the above copyright notice, this list of conditions and the
+# following disclaimers.
+# Redistributions in binary form must reproduce the above copyright notice, this list of conditions and
+# the following disclaimer in the documentation and/or other materials provided with the distribution.
+# Other than as used herein, neither the name Battelle Memorial Institute or Battelle may be used in any
+# form whatsoever without the express written consent of Battelle.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL
+# BATTELLE OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE
+# GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED
+# AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+# General disclaimer for use with OSS licenses
+#
+# This material was prepared as an account of work sponsored by an agency of the United States Government.
+# Neither the United States Government nor the United States Department of Energy, nor Battelle, nor any
+# of their employees, nor any jurisdiction or organization that has cooperated in the development of these
+# materials, makes any warranty, express or implied, or assumes any legal liability or responsibility for
+# the accuracy, completeness, or usefulness or any information, apparatus, product, software, or process
+# disclosed, or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or service by trade name, trademark, manufacturer,
+# or otherwise does not necessarily constitute or imply its endorsement, recommendation, or favoring by the United
+# States Government or any agency thereof, or Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by BATTELLE for the
+# UNITED STATES DEPARTMENT OF ENERGY under Contract DE-AC05-76RL01830
+"""
+Always-on hot path timing for the state plotter.
+
+A HotPathStats keeps a fixed-bucket Histogram of wall times for each stage
+of handling messages and redrawing plots, along with counters such as the
+messages received per topic and the bus,phase pairs appended. Stage times
+are added up over a unit of work, a message or a frame, with record and
+become a single histogram sample when the unit ends, so a stage timed in
+several places within one message counts once. Whatever part of a
+message isn't covered by a timed stage is recorded as decode, the work of
+pulling values out of the message, which for the first message with a
+bus,phase pair also includes creating its plot lines.
+
+The buckets are fixed 1-2-5 steps from 10 microseconds to 10 seconds so
+recording is a bisect and an increment and the histograms never grow.
+Percentiles are estimated as the upper bound of the bucket they fall in.
+Reports cover the interval since the previous report. The time from each
+estimate arriving until the redraw that plotted it finishes is kept as
+est_to_render.
+
+@author: Gary D. Black
+"""
+
+import time
+import threading
+from bisect import bisect_left
+
+# upper bounds in seconds of every bucket but the last, which is unbounded
+BUCKET_BOUNDS = tuple(mult * 10.0**exp for exp in range(-5, 1)
+                      for mult in (1, 2, 5)) + (10.0,)
+
+# stages in the order they are reported
+MESSAGE_STAGES = ('decode', 'join', 'append', 'stats')
+FRAME_STAGES = ('set_data', 'autoscale', 'draw')
+
+
+class Histogram:
+    def __init__(self):
+        self.countList = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.countList[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def copy(self):
+        hist = Histogram()
+        hist.countList = list(self.countList)
+        hist.count = self.count
+        hist.total = self.total
+        hist.max = self.max
+        return hist
+
+    def since(self, earlier, maxSeconds):
+        # the samples added after earlier, a copy of this histogram, whose
+        # maximum the buckets can't tell so it is given
+        hist = Histogram()
+        hist.countList = [count - prev for count, prev in
+                          zip(self.countList, earlier.countList)]
+        hist.count = self.count - earlier.count
+        hist.total = self.total - earlier.total
+        hist.max = maxSeconds
+        return hist
+
+    def mean(self):
+        return self.total/self.count if self.count > 0 else 0.0
+
+    def percentile(self, pct):
+        # upper bound of the bucket holding the percentile, or the maximum
+        # for the unbounded bucket
+        target = self.count * pct/100.0
+        cumulative = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.countList):
+            cumulative += count
+            if count > 0 and cumulative >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+class HotPathStats:
+    def __init__(self):
+        self.histDict = {stage: Histogram() for stage in
+                         MESSAGE_STAGES + ('message',) + FRAME_STAGES +
+                         ('redraw', 'est_to_render')}
+        self.counterDict = {}
+        self.pendingDict = {}
+        # counters are also updated from the broker listener thread
+        self.lock = threading.Lock()
+        self.lastTime = time.perf_counter()
+        self.lastHistDict = {stage: hist.copy()
+                             for stage, hist in self.histDict.items()}
+        self.lastCounterDict = {}
+        self.lastMaxDict = {}
+
+    def record(self, stage, start):
+        # add the time since start, a perf_counter value, to the stage for
+        # the current message or frame
+        self.pendingDict[stage] = self.pendingDict.get(stage, 0.0) + \
+                                  time.perf_counter() - start
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counterDict[name] = self.counterDict.get(name, 0) + amount
+
+    def endMessage(self, start):
+        # ends the message started at start, with whatever time the timed
+        # stages didn't take counted as decode
+        seconds = time.perf_counter() - start
+        self.pendingDict['decode'] = max(seconds -
+                                         sum(self.pendingDict.values()), 0.0)
+        self._commit()
+        self._add('message', seconds)
+
+    def endFrame(self, start):
+        self._commit()
+        self._add('redraw', time.perf_counter() - start)
+
+    def recordLatency(self, arrival):
+        # time from an estimate arriving, a perf_counter value, to the end
+        # of the redraw that plotted it
+        self._add('est_to_render', time.perf_counter() - arrival)
+
+    def _commit(self):
+        for stage, seconds in self.pendingDict.items():
+            self._add(stage, seconds)
+        self.pendingDict.clear()
+
+    def _add(self, stage, seconds):
+        self.histDict[stage].add(seconds)
+        self.lastMaxDict[stage] = max(self.lastMaxDict.get(stage, 0.0),
+                                      seconds)
+
+    def secondsSinceReport(self):
+        return time.perf_counter() - self.lastTime
+
+    def report(self, extraDict=None):
+        # log lines for the interval since the last report with the counter
+        # rates and extraDict counts first, then the mean, 95th percentile
+        # and maximum milliseconds for each stage
+        now = time.perf_counter()
+        seconds = max(now - self.lastTime, 1e-9)
+        with self.lock:
+            counterDict = dict(self.counterDict)
+
+        def rate(name):
+            return (counterDict.get(name, 0) -
+                    self.lastCounterDict.get(name, 0))/seconds
+
+        topicList = sorted(name[len('messages '):] for name in counterDict
+                           if name.startswith('messages '))
+        countLine = 'last {:.1f} s: {:.1f} messages/s'.format(
+                seconds, sum(rate('messages ' + topic)
+                             for topic in topicList))
+        if topicList:
+            countLine += ' (' + ', '.join('{} {:.1f}'.format(
+                    topic, rate('messages ' + topic))
+                    for topic in topicList) + ')'
+        countLine += ', {:.1f} pairs/s, {:.1f} frames/s'.format(
+                rate('pairs'), (self.histDict['redraw'].count -
+                                self.lastHistDict['redraw'].count)/seconds)
+        for name, value in (extraDict or {}).items():
+            countLine += ', ' + name + ' ' + str(value)
+
+        stageList = []
+        for stage, hist in self.histDict.items():
+            interval = hist.since(self.lastHistDict[stage],
+                                  self.lastMaxDict.get(stage, 0.0))
+            if interval.count == 0:
+                continue
+            stageList.append('{} {:.2f}/{:.2f}/{:.2f}'.format(
+                    stage, 1000*interval.mean(),
+                    1000*interval.percentile(95), 1000*interval.max))
+        stageLine = 'ms mean/p95/max: ' + (', '.join(stageList)
+                                           if stageList else 'no samples')
+
+        self.lastTime = now
+        self.lastHistDict = {stage: hist.copy()
+                             for stage, hist in self.histDict.items()}
+        self.lastCounterDict = counterDict
+        self.lastMaxDict = {}
+        return [countLine, stageLine]
@@ -0,0 +1,240 @@
+# ------------------------------------------------------------------------------
+# Copyright (c) 2019, Battelle Memorial Institute All rights reserved.
+# Battelle Memorial Institute (hereinafter Battelle) hereby grants permission to any person or entity
+# lawfully obtaining a copy of this software and associated documentation files (hereinafter the
+# Software) to redistribute and use the Software in source and binary forms, with or without modification.
+# Such person or entity may use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and may permit others to do so, subject to the following conditions:
+# Redistributions of source code must retain the above copyright notice, this list of conditions and the
+# following disclaimers.
+# Redistributions in binary form must reproduce the above copyright notice, this list of conditions and
+# the following disclaimer in the documentation and/or other materials provided with the distribution.
+# Other than as used herein, neither the name Battelle Memorial Institute or Battelle may be used in any
+# form whatsoever without the express written consent of Battelle.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL
+# BATTELLE OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE
+# GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED
+# AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+# General disclaimer for use with OSS licenses
+#
+# This material was prepared as an account of work sponsored by an agency of the United States Government.
+# Neither the United States Government nor the United States Department of Energy, nor Battelle, nor any
+# of their employees, nor any jurisdiction or organization that has cooperated in the development of these
+# materials, makes any warranty, express or implied, or assumes any legal liability or responsibility for
+# the accuracy, completeness, or usefulness or any information, apparatus, product, software, or process
+# disclosed, or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or service by trade name, trademark, manufacturer,
+# or otherwise does not necessarily constitute or imply its endorsement, recommendation, or favoring by the United
+# States Government or any agency thereof, or Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by BATTELLE for the
+# UNITED STATES DEPARTMENT OF ENERGY under Contract DE-AC05-76RL01830
+# ------------------------------------------------------------------------------
+"""
+Timestamp join buffer for the state plotter.
+
+Simulation and sensor measurement messages are held until the state estimate
+for the same timestamp arrives so the two can be plotted together. Each
+stream is kept in a TimestampRing, an ordered ring of entries with a dict
+index, so an exact timestamp lookup is O(1) and old entries are only ever
+removed from the oldest end.
+
+The JoinBuffer keeps a watermark timestamp below which measurements are
+discarded. The state estimator processes timestamps in order, so an estimate
+advances the watermark to its own timestamp. A measurement advances it to
+its timestamp less the maximum lag, which bounds the buffers when estimates
+fall behind or stop arriving. Measurements discarded without ever matching
+an estimate, estimates without matching measurements, and measurements that
+arrive after the watermark has passed them are counted.
+
+A JoinPlanEntry holds what is needed to join one estimate (ConnectivityNode,
+phase) with measurements, resolved once after the metadata queries so the
+per-timestamp work doesn't repeat dictionary lookups and string building,
+and a SampleBatch gathers the values joined for one timestamp so they can be
+processed together.
+
+@author: Gary D. Black
+"""
+
+import math
+from collections import deque
+
+# default seconds measurements are held waiting for a matching estimate and
+# the most measurement timestamps held per stream regardless of lag
+DEFAULT_MAX_LAG = 600
+DEFAULT_CAPACITY = 1000
+
+
+class TimestampRing:
+    # [timestamp, value, matched] entries in timestamp order
+    def __init__(self):
+        self.entryDeque = deque()
+        self.entryDict = {}
+
+    def __len__(self):
+        return len(self.entryDeque)
+
+    def put(self, ts, value):
+        # returns False for a timestamp older than the newest one, which
+        # would break the ordering
+        entry = self.entryDict.get(ts)
+        if entry:
+            entry[1] = value
+            return True
+
+        if self.entryDeque and ts<self.entryDeque[-1][0]:
+            return False
+
+        entry = [ts, value, False]
+        self.entryDeque.append(entry)
+        self.entryDict[ts] = entry
+        return True
+
+    def get(self, ts):
+        return self.entryDict.get(ts)
+
+    def expire(self, watermark):
+        # remove entries older than watermark returning how many never matched
+        unmatched = 0
+        while self.entryDeque and self.entryDeque[0][0]<watermark:
+            unmatched += self._popOldest()
+        return unmatched
+
+    def trim(self, capacity):
+        # remove the oldest entries beyond capacity returning how many never
+        # matched
+        unmatched = 0
+        while len(self.entryDeque) > capacity:
+            unmatched += self._popOldest()
+        return unmatched
+
+    def _popOldest(self):
+        entry = self.entryDeque.popleft()
+        del self.entryDict[entry[0]]
+        return 0 if entry[2] else 1
+
+
+class JoinBuffer:
+    def __init__(self, maxLag=DEFAULT_MAX_LAG, capacity=DEFAULT_CAPACITY):
+        self.maxLag = maxLag
+        self.capacity = capacity
+        self.simRing = TimestampRing()
+        self.senRing = TimestampRing()
+        # measurements older than the watermark are discarded
+        self.watermark = -math.inf
+        self.unmatchedSimCount = 0
+        self.unmatchedSenCount = 0
+        self.unmatchedEstCount = 0
+        self.lateCount = 0
+
+    def putSim(self, ts, value):
+        self._put(self.simRing, ts, value)
+
+    def putSen(self, ts, value):
+        self._put(self.senRing, ts, value)
+
+    def sim(self, ts):
+        # simulation measurement for the timestamp, None if there isn't one
+        entry = self.simRing.get(ts)
+        return entry[1] if entry else None
+
+    def matchEstimate(self, ts, sensorFlag):
+        # simulation and, with sensorFlag, sensor measurements for an estimate
+        # timestamp, None for each that is missing. Older measurements are
+        # discarded since estimates arrive in timestamp order.
+        self._advance(ts)
+
+        simEntry = self.simRing.get(ts)
+        senEntry = self.senRing.get(ts) if sensorFlag else None
+        if not simEntry or (sensorFlag and not senEntry):
+            self.unmatchedEstCount += 1
+
+        simDataTS = None
+        if simEntry:
+            simEntry[2] = True
+            simDataTS = simEntry[1]
+
+        senDataTS = None
+        if senEntry:
+            senEntry[2] = True
+            senDataTS = senEntry[1]
+
+        return simDataTS, senDataTS
+
+    def _put(self, ring, ts, value):
+        if ts<self.watermark or not ring.put(ts, value):
+            self.lateCount += 1
+            return
+
+        self._advance(ts - self.maxLag)
+        if len(ring) > self.capacity:
+            self._countUnmatched(ring, ring.trim(self.capacity))
+
+    def _advance(self, watermark):
+        if watermark <= self.watermark:
+            return
+
+        self.watermark = watermark
+        self._countUnmatched(self.simRing, self.simRing.expire(watermark))
+        self._countUnmatched(self.senRing, self.senRing.expire(watermark))
+
+    def _countUnmatched(self, ring, unmatched):
+        if ring is self.simRing:
+            self.unmatchedSimCount += unmatched
+        else:
+            self.unmatchedSenCount += unmatched
+
+
+class JoinPlanEntry:
+    __slots__ = ('cnid', 'phase', 'buspair', 'slot', 'measMRIDList', 'vnom',
+                 'plotFlag', 'measRow', 'diffMeasRow', 'estRow', 'diffEstRow')
+
+    def __init__(self, cnid, phase, buspair, slot, measMRIDList, vnom,
+                 plotFlag):
+        self.cnid = cnid
+        self.phase = phase
+        self.buspair = buspair
+        # index into arrays aligned with the plan such as nominal voltages
+        self.slot = slot
+        # candidate measurement mRIDs in the order they are checked
+        self.measMRIDList = measMRIDList
+        # nominal magnitude divisor or angle offset, None to plot as is
+        self.vnom = vnom
+        # whether the phase is plotted given any -phase options
+        self.plotFlag = plotFlag
+        # store rows once the series exist, -1 before then
+        self.measRow = -1
+        self.diffMeasRow = -1
+        self.estRow = -1
+        self.diffEstRow = -1
+
+
+class SampleBatch:
+    # raw values joined for one timestamp, gathered while walking a message
+    # so they can be normalized and appended to the stores together. For
+    # estimates the measurement value and whether the estimate is appended
+    # are kept as well.
+    def __init__(self):
+        self.entryList = []
+        self.valueList = []
+        self.measList = []
+        self.simList = []
+        self.appendList = []
+
+    def __len__(self):
+        return len(self.entryList)
+
+    def add(self, entry, value, measValue=math.nan, simValue=math.nan,
+            appendFlag=True):
+        self.entryList.append(entry)
+        self.valueList.append(value)
+        self.measList.append(measValue)
+        self.simList.append(simValue)
+        self.appendList.append(appendFlag)
@@ -0,0 +1,334 @@
+# ------------------------------------------------------------------------------
+# Copyright (c) 2019, Battelle Memorial Institute All rights reserved.
+# Battelle Memorial Institute (hereinafter Battelle) hereby grants permission to any person or entity
+# lawfully obtaining a copy of this software and associated documentation files (hereinafter the
+# Software) to redistribute and use the Software in source and binary forms, with or without modification.
+# Such person or entity may use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and may permit others to do so, subject to the following conditions:
+# Redistributions of source code must retain the above copyright notice, this list of conditions and the
+# following disclaimers.
+# Redistributions in binary form must reproduce the above copyright notice, this list of conditions and
+# the following disclaimer in the documentation and/or other materials provided with the distribution.
+# Other than as used herein, neither the name Battelle Memorial Institute or Battelle may be used in any
+# form whatsoever without the express written consent of Battelle.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL
+# BATTELLE OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE
+# GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED
+# AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+# General disclaimer for use with OSS licenses
+#
+# This material was prepared as an account of work sponsored by an agency of the United States Government.
+# Neither the United States Government nor the United States Department of Energy, nor Battelle, nor any
+# of their employees, nor any jurisdiction or organization that has cooperated in the development of these
+# materials, makes any warranty, express or implied, or assumes any legal liability or responsibility for
+# the accuracy, completeness, or usefulness or any information, apparatus, product, software, or process
+# disclosed, or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or service by trade name, trademark, manufacturer,
+# or otherwise does not necessarily constitute or imply its endorsement, recommendation, or favoring by the United
+# States Government or any agency thereof, or Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by BATTELLE for the
+# UNITED STATES DEPARTMENT OF ENERGY under Contract DE-AC05-76RL01830
+"""
+Raw message journal and replay for the state plotter.
+
+A JournalingGridAPPSD wraps the GridAPPSD object. Every message received on
+a subscribed topic is appended to a MessageJournal before it is passed on,
+and so is every get_response reply along with the request that produced
+it. The metadata query responses and the simulation, sensor and state
+estimator messages of a run are thus kept together in one file.
+
+A ReplayGridAPPSD stands in for the GridAPPSD object without a broker.
+get_response answers from the journaled replies. Once start is called, a
+thread delivers the journaled messages to the callbacks subscribed to their
+topics, either as fast as the callbacks take them or spaced by their
+original arrival times divided by a speed factor. This gives reproducible
+runs of the real callbacks and join logic from a single recorded
+simulation.
+
+The file starts with MAGIC followed by records, each a 4-byte kind, the
+8-byte little-endian payload length and the payload:
+    INFO: JSON with the simulation ID and request the run was started with
+    RESP: zlib compressed JSON with the topic, request and response of a
+          get_response call
+    MESG: the arrival time in seconds from when the journal was opened as
+          a float64, the 4-byte length and text of the topic, then the zlib
+          compressed JSON of the header and message
+    INDX: JSON with the topics, the offset of every RESP record and, for
+          every message, its offset, arrival time, topic number and
+          timestamp
+Closing the journal writes the INDX record and a trailer of its 8-byte
+offset and MAGIC. A journal without the trailer, from a run that was
+killed, is read by scanning the records instead.
+
+@author: Gary D. Black
+"""
+
+import json
+import struct
+import threading
+import time
+import zlib
+
+MAGIC = b'STPLJRN1'
+
+# fast compression since messages are compressed on the listener thread
+COMPRESS_LEVEL = 1
+
+RECORD_HEADER = struct.Struct('<4sQ')
+MESSAGE_HEADER = struct.Struct('<dI')
+TRAILER = struct.Struct('<Q8s')
+
+
+def requestKey(topic, request):
+    # requests are dictionaries or JSON text, matched by their content
+    if isinstance(request, str):
+        try:
+            request = json.loads(request)
+        except ValueError:
+            pass
+    return topic + '\n' + json.dumps(request, sort_keys=True)
+
+
+class MessageJournal:
+    def __init__(self, path, infoDict):
+        self.path = path
+        self.lock = threading.Lock()
+        self.start = time.monotonic()
+        self.topicDict = {}
+        self.responseList = []
+        self.indexList = []
+        self.byteCount = len(MAGIC)
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self._writeRecord(b'INFO', json.dumps(infoDict).encode())
+        self.file.flush()
+
+    def appendResponse(self, topic, request, response):
+        payload = zlib.compress(json.dumps({'topic': topic,
+                                            'request': request,
+                                            'response': response},
+                                           default=str).encode(),
+                                COMPRESS_LEVEL)
+        with self.lock:
+            # a late message after the journal is closed on exit is dropped
+            if self.file.closed:
+                return
+            self.responseList.append(self.file.tell())
+            self._writeRecord(b'RESP', payload)
+            self.file.flush()
+
+    def appendMessage(self, topic, header, message):
+        arrival = time.monotonic() - self.start
+        ts = None
+        if isinstance(message, dict) and isinstance(message.get('message'),
+                                                    dict):
+            ts = message['message'].get('timestamp')
+
+        # compressed outside the lock so the query threads and listener
+        # threads only wait on each other for the write
+        topicBytes = topic.encode()
+        payload = b''.join([MESSAGE_HEADER.pack(arrival, len(topicBytes)),
+                            topicBytes,
+                            zlib.compress(json.dumps([header, message],
+                                                     default=str).encode(),
+                                          COMPRESS_LEVEL)])
+        with self.lock:
+            if self.file.closed:
+                return
+            topicNum = self.topicDict.setdefault(topic, len(self.topicDict))
+            self.indexList.append([self.file.tell(), arrival, topicNum, ts])
+            self._writeRecord(b'MESG', payload)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            offset = self.file.tell()
+            self._writeRecord(b'INDX', json.dumps({
+                    'topics': list(self.topicDict),
+                    'responses': self.responseList,
+                    'messages': self.indexList}).encode())
+            self.file.write(TRAILER.pack(offset, MAGIC))
+            self.file.close()
+
+    def _writeRecord(self, kind, payload):
+        self.file.write(RECORD_HEADER.pack(kind, len(payload)))
+        self.file.write(payload)
+        self.byteCount += RECORD_HEADER.size + len(payload)
+
+
+class JournalingGridAPPSD:
+    # the GridAPPSD methods used by the plotter with the replies and
+    # messages journaled
+    def __init__(self, gapps, journal):
+        self.gapps = gapps
+        self.journal = journal
+
+    def get_response(self, topic, request, timeout=None):
+        response = self.gapps.get_response(topic, request, timeout=timeout)
+        self.journal.appendResponse(topic, request, response)
+        return response
+
+    def subscribe(self, topic, callback):
+        def journalCallback(header, message):
+            self.journal.appendMessage(topic, header, message)
+            callback(header, message)
+
+        self.gapps.subscribe(topic, journalCallback)
+
+    def disconnect(self):
+        self.gapps.disconnect()
+
+
+def _readRecord(jrnFile):
+    # (kind, payload) of the record at the current position or None at the
+    # end of the file or a record truncated by a killed run
+    header = jrnFile.read(RECORD_HEADER.size)
+    if len(header) < RECORD_HEADER.size:
+        return None
+    kind, length = RECORD_HEADER.unpack(header)
+    payload = jrnFile.read(length)
+    if len(payload) < length:
+        return None
+    return kind, payload
+
+
+def _messageRecord(payload):
+    # (arrival, topic, header, message) from a MESG payload
+    arrival, topicLen = MESSAGE_HEADER.unpack_from(payload)
+    start = MESSAGE_HEADER.size
+    topic = payload[start:start+topicLen].decode()
+    header, message = json.loads(zlib.decompress(payload[start+topicLen:]))
+    return arrival, topic, header, message
+
+
+class JournalReader:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as jrnFile:
+            if jrnFile.read(len(MAGIC)) != MAGIC:
+                raise ValueError(path + ' is not a state plotter journal')
+            self.info = json.loads(_readRecord(jrnFile)[1])
+
+            index = _readIndex(jrnFile)
+            if index:
+                responseList = index['responses']
+                self.offsetList = [entry[0] for entry in index['messages']]
+            else:
+                responseList, self.offsetList = _scanOffsets(jrnFile)
+
+            # replies are few so they are all read up front while messages
+            # are read as they are replayed
+            self.responseDict = {}
+            for offset in responseList:
+                jrnFile.seek(offset)
+                resp = json.loads(zlib.decompress(_readRecord(jrnFile)[1]))
+                self.responseDict[requestKey(resp['topic'],
+                                             resp['request'])] = \
+                        resp['response']
+
+    def __len__(self):
+        return len(self.offsetList)
+
+    def response(self, topic, request):
+        return self.responseDict.get(requestKey(topic, request))
+
+    def messages(self):
+        # (arrival, topic, header, message) for each message in order
+        with open(self.path, 'rb') as jrnFile:
+            for offset in self.offsetList:
+                jrnFile.seek(offset)
+                yield _messageRecord(_readRecord(jrnFile)[1])
+
+
+def _readIndex(jrnFile):
+    # the INDX record contents, None without a trailer
+    jrnFile.seek(0, 2)
+    size = jrnFile.tell()
+    if size < len(MAGIC) + TRAILER.size:
+        return None
+    jrnFile.seek(size - TRAILER.size)
+    offset, magic = TRAILER.unpack(jrnFile.read(TRAILER.size))
+    if magic != MAGIC:
+        return None
+    jrnFile.seek(offset)
+    return json.loads(_readRecord(jrnFile)[1])
+
+
+def _scanOffsets(jrnFile):
+    # RESP and MESG record offsets found by stepping over every record
+    # after INFO, stopping at one truncated by a killed run
+    jrnFile.seek(0, 2)
+    size = jrnFile.tell()
+    jrnFile.seek(len(MAGIC))
+    kind, length = RECORD_HEADER.unpack(jrnFile.read(RECORD_HEADER.size))
+    offset = len(MAGIC) + RECORD_HEADER.size + length
+
+    responseList = []
+    messageList = []
+    while offset + RECORD_HEADER.size <= size:
+        jrnFile.seek(offset)
+        kind, length = RECORD_HEADER.unpack(jrnFile.read(RECORD_HEADER.size))
+        if offset + RECORD_HEADER.size + length > size:
+            break
+        if kind == b'RESP':
+            responseList.append(offset)
+        elif kind == b'MESG':
+            messageList.append(offset)
+        offset += RECORD_HEADER.size + length
+
+    return responseList, messageList
+
+
+class ReplayGridAPPSD:
+    # the GridAPPSD methods used by the plotter answered from a journal
+    def __init__(self, path, speed=1.0):
+        self.reader = JournalReader(path)
+        self.info = self.reader.info
+        self.speed = speed
+        self.callbackDict = {}
+        self.stopEvent = threading.Event()
+        self.thread = None
+        self.count = 0
+        self.seconds = 0.0
+
+    def get_response(self, topic, request, timeout=None):
+        response = self.reader.response(topic, request)
+        if response is None:
+            raise KeyError('no journaled response for request to ' + topic)
+        return response
+
+    def subscribe(self, topic, callback):
+        self.callbackDict.setdefault(topic, []).append(callback)
+
+    def start(self, doneCallback=None):
+        # deliver the messages from a thread as the broker listener would,
+        # calling doneCallback after the last one
+        def deliver():
+            start = time.monotonic()
+            for arrival, topic, header, message in self.reader.messages():
+                if self.stopEvent.is_set():
+                    break
+                if self.speed > 0:
+                    delay = start + arrival/self.speed - time.monotonic()
+                    if delay > 0 and self.stopEvent.wait(delay):
+                        break
+                for callback in self.callbackDict.get(topic, []):
+                    callback(header, message)
+                self.count += 1
+            self.seconds = time.monotonic() - start
+            if doneCallback:
+                doneCallback()
+
+        self.thread = threading.Thread(target=deliver, daemon=True)
+        self.thread.start()
+
+    def disconnect(self):
+        self.stopEvent.set()
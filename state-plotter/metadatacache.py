@@ -0,0 +1,122 @@
+# ------------------------------------------------------------------------------
+# Copyright (c) 2019, Battelle Memorial Institute All rights reserved.
+# Battelle Memorial Institute (hereinafter Battelle) hereby grants permission to any person or entity
+# lawfully obtaining a copy of this software and associated documentation files (hereinafter the
+# Software) to redistribute and use the Software in source and binary forms, with or without modification.
+# Such person or entity may use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and may permit others to do so, subject to the following conditions:
+# Redistributions of source code must retain the above copyright notice, this list of conditions and the
+# following disclaimers.
+# Redistributions in binary form must reproduce the above copyright notice, this list of conditions and
+# the following disclaimer in the documentation and/or other materials provided with the distribution.
+# Other than as used herein, neither the name Battelle Memorial Institute or Battelle may be used in any
+# form whatsoever without the express written consent of Battelle.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL
+# BATTELLE OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE
+# GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED
+# AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+# General disclaimer for use with OSS licenses
+#
+# This material was prepared as an account of work sponsored by an agency of the United States Government.
+# Neither the United States Government nor the United States Department of Energy, nor Battelle, nor any
+# of their employees, nor any jurisdiction or organization that has cooperated in the development of these
+# materials, makes any warranty, express or implied, or assumes any legal liability or responsibility for
+# the accuracy, completeness, or usefulness or any information, apparatus, product, software, or process
+# disclosed, or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or service by trade name, trademark, manufacturer,
+# or otherwise does not necessarily constitute or imply its endorsement, recommendation, or favoring by the United
+# States Government or any agency thereof, or Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by BATTELLE for the
+# UNITED STATES DEPARTMENT OF ENERGY under Contract DE-AC05-76RL01830
+"""
+On-disk cache of model metadata for the state plotter.
+
+The connectivity node, measurement mRID and nominal voltage mappings only
+depend on the model, yet each launch would otherwise repeat the queries
+that build them and several plotters are often started at once for the same
+model. A MetadataCache keeps one compressed NumPy .npz file per model mRID
+holding a version stamp, the model mRID and the plain arrays from
+MetadataTables.toArrays. Nothing is pickled, so the files are loaded with
+allow_pickle off and don't depend on where the classes are imported from.
+A file with a different version stamp or model mRID is ignored, which is
+how changes to what is cached invalidate older files, and a file that can't
+be read back for any other reason is treated the same way and removed.
+invalidate removes the file for a model so the next launch queries again.
+Files are written to a temporary name and renamed into place so plotters
+starting together never read a partially written file.
+
+@author: Gary D. Black
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from metadatatables import MetadataTables
+
+# bump whenever the cached tables or how they are derived from the query
+# responses change so existing cache files are ignored
+CACHE_VERSION = 3
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache',
+                                 'state-plotter')
+
+
+class MetadataCache:
+    def __init__(self, directory=None):
+        self.directory = directory if directory else DEFAULT_DIRECTORY
+
+    def path(self, modelMRID):
+        # model mRIDs are normally safe as file names, but make sure
+        name = ''.join(c if c.isalnum() or c in '-_.' else '_'
+                       for c in modelMRID)
+        return os.path.join(self.directory, name + '.cache')
+
+    def load(self, modelMRID):
+        # the cached tables, None if there is no usable cache file
+        try:
+            with np.load(self.path(modelMRID), allow_pickle=False) as arrays:
+                if int(arrays['cacheVersion']) != CACHE_VERSION or \
+                   str(arrays['modelMRID']) != modelMRID:
+                    return None
+                tables = MetadataTables()
+                tables.loadArrays(arrays)
+            tables.finalize()
+            return tables
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # unreadable, truncated or inconsistent so remove it and let the
+            # queries run and save a fresh one
+            try:
+                self.invalidate(modelMRID)
+            except OSError:
+                pass
+            return None
+
+    def save(self, modelMRID, tables):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmpPath = tempfile.mkstemp(prefix='.tmp-', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as cacheFile:
+                np.savez_compressed(cacheFile, cacheVersion=CACHE_VERSION,
+                                    modelMRID=modelMRID, **tables.toArrays())
+            os.replace(tmpPath, self.path(modelMRID))
+        except BaseException:
+            os.unlink(tmpPath)
+            raise
+
+    def invalidate(self, modelMRID):
+        try:
+            os.remove(self.path(modelMRID))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,275 @@
+# ------------------------------------------------------------------------------
+# Copyright (c) 2019, Battelle Memorial Institute All rights reserved.
+# Battelle Memorial Institute (hereinafter Battelle) hereby grants permission to any person or entity
+# lawfully obtaining a copy of this software and associated documentation files (hereinafter the
+# Software) to redistribute and use the Software in source and binary forms, with or without modification.
+# Such person or entity may use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and may permit others to do so, subject to the following conditions:
+# Redistributions of source code must retain the above copyright notice, this list of conditions and the
+# following disclaimers.
+# Redistributions in binary form must reproduce the above copyright notice, this list of conditions and
+# the following disclaimer in the documentation and/or other materials provided with the distribution.
+# Other than as used herein, neither the name Battelle Memorial Institute or Battelle may be used in any
+# form whatsoever without the express written consent of Battelle.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL
+# BATTELLE OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE
+# GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED
+# AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+# General disclaimer for use with OSS licenses
+#
+# This material was prepared as an account of work sponsored by an agency of the United States Government.
+# Neither the United States Government nor the United States Department of Energy, nor Battelle, nor any
+# of their employees, nor any jurisdiction or organization that has cooperated in the development of these
+# materials, makes any warranty, express or implied, or assumes any legal liability or responsibility for
+# the accuracy, completeness, or usefulness or any information, apparatus, product, software, or process
+# disclosed, or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or service by trade name, trademark, manufacturer,
+# or otherwise does not necessarily constitute or imply its endorsement, recommendation, or favoring by the United
+# States Government or any agency thereof, or Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by BATTELLE for the
+# UNITED STATES DEPARTMENT OF ENERGY under Contract DE-AC05-76RL01830
+"""
+Compact model metadata tables for the state plotter.
+
+The metadata queries at startup describe tens of thousands of bus,phase
+pairs for the larger models. Rather than building a dictionary keyed by a
+"bus,phase" string for each mapping, MetadataTables interns every bus name
+once and gives it an integer id, and phases get small integer codes. The
+loaders take a single pass over each query response, appending to flat
+typed arrays:
+
+    state estimate nodes: ConnectivityNode mRID by bus id
+    nominal voltages: bus id, phase code, magnitude and angle per row
+    measurements: mRID, bus id and phase code per row
+
+Once all responses are loaded, finalize builds the lookup forms used when
+compiling the join plan. These are dense bus id by phase code arrays of
+nominal magnitudes and angles, NaN where there is none, and the measurement
+mRID indices for each (bus id, phase code) pair. The tables only expand
+back into the "bus,phase" string keyed dictionaries for diagnostic output.
+
+toArrays gives the loaded rows as plain NumPy arrays, with '' for buses
+without an estimate node, and loadArrays restores them, so the metadata
+cache never pickles the class itself.
+
+The loaders may run concurrently from the startup query threads, so bus
+name interning is serialized with a lock.
+
+@author: Gary D. Black
+"""
+
+import sys
+import math
+import threading
+from array import array
+
+import numpy as np
+
+# phase codes for the phases reported by the state estimator, any other
+# phases found in measurements are given codes after these
+PHASE_LIST = ['A', 'B', 'C', 'S1', 'S2']
+
+# Vnom Export phase numbers and the codes of the phases they give nominal
+# values for
+VNOM_PHASE_DICT = {1: (0, 3), 2: (1, 4), 3: (2,)}
+
+
+class MetadataTables:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.busList = []
+        self.busIndexDict = {}
+        self.phaseList = list(PHASE_LIST)
+        self.phaseIndexDict = {phase: code
+                               for code, phase in enumerate(self.phaseList)}
+        # ConnectivityNode mRID by bus id, None for buses without one
+        self.estCNIDList = []
+        # nominal voltage rows
+        self.vnomBusArray = array('i')
+        self.vnomPhaseArray = array('b')
+        self.vnomMagArray = array('d')
+        self.vnomAngArray = array('d')
+        # measurement rows
+        self.measMRIDList = []
+        self.measBusArray = array('i')
+        self.measPhaseArray = array('b')
+        # built by finalize
+        self.vnomMagTable = None
+        self.vnomAngTable = None
+        self.pairMeasDict = {}
+
+    def busId(self, name):
+        busId = self.busIndexDict.get(name)
+        if busId is None:
+            with self.lock:
+                busId = self.busIndexDict.get(name)
+                if busId is None:
+                    busId = len(self.busList)
+                    self.busList.append(sys.intern(name))
+                    self.busIndexDict[self.busList[-1]] = busId
+        return busId
+
+    def phaseCode(self, phase):
+        code = self.phaseIndexDict.get(phase)
+        if code is None:
+            with self.lock:
+                code = self.phaseIndexDict.get(phase)
+                if code is None:
+                    code = len(self.phaseList)
+                    self.phaseList.append(phase)
+                    self.phaseIndexDict[phase] = code
+        return code
+
+    def pairKey(self, buspair):
+        # (bus id, phase code) for a "bus,phase" string, None if either is
+        # unknown
+        bus, _, phase = buspair.rpartition(',')
+        busId = self.busIndexDict.get(bus)
+        code = self.phaseIndexDict.get(phase)
+        if busId is None or code is None:
+            return None
+        return busId, code
+
+    def pairName(self, busId, code):
+        return self.busList[busId] + ',' + self.phaseList[code]
+
+    def loadEstimateNodes(self, bindings):
+        # SPARQL ConnectivityNode bindings
+        for node in bindings:
+            busId = self.busId(node['cnname']['value'].upper())
+            cnid = node['cnid']['value']
+            with self.lock:
+                if busId >= len(self.estCNIDList):
+                    self.estCNIDList.extend(
+                            [None]*(busId + 1 - len(self.estCNIDList)))
+                self.estCNIDList[busId] = cnid
+
+    def loadVnom(self, lines):
+        # Vnom Export CSV lines, each after the header with the bus name and
+        # then a phase number, magnitude and angle at fields 2-4, 6-8 and
+        # 10-12
+        lines = iter(lines)
+        # skip header line
+        next(lines, None)
+
+        for line in lines:
+            vnom = line.split(',')
+            busId = self.busId(vnom[0].strip('"'))
+
+            for field in (2, 6, 10):
+                for code in VNOM_PHASE_DICT.get(int(vnom[field]), ()):
+                    self.vnomBusArray.append(busId)
+                    self.vnomPhaseArray.append(code)
+                    self.vnomMagArray.append(float(vnom[field+1]))
+                    self.vnomAngArray.append(float(vnom[field+2]))
+
+    def loadMeasurements(self, feeders):
+        # CIM Dictionary feeders, keeping only the PNV measurements
+        for feeder in feeders:
+            for meas in feeder['measurements']:
+                if meas['measurementType'] != 'PNV':
+                    continue
+
+                self.measMRIDList.append(meas['mRID'])
+                self.measBusArray.append(
+                        self.busId(meas['ConnectivityNode'].upper()))
+                self.measPhaseArray.append(
+                        self.phaseCode(meas['phases'].upper()))
+
+    def toArrays(self):
+        # the loaded rows as plain arrays, without the lookup forms finalize
+        # builds from them
+        return {'busList': np.array(self.busList, dtype=str),
+                'phaseList': np.array(self.phaseList, dtype=str),
+                'estCNIDList': np.array([cnid if cnid is not None else ''
+                                         for cnid in self.estCNIDList],
+                                        dtype=str),
+                'vnomBusArray': np.frombuffer(self.vnomBusArray,
+                                              dtype=np.int32),
+                'vnomPhaseArray': np.frombuffer(self.vnomPhaseArray,
+                                                dtype=np.int8),
+                'vnomMagArray': np.frombuffer(self.vnomMagArray,
+                                              dtype=np.float64),
+                'vnomAngArray': np.frombuffer(self.vnomAngArray,
+                                              dtype=np.float64),
+                'measMRIDList': np.array(self.measMRIDList, dtype=str),
+                'measBusArray': np.frombuffer(self.measBusArray,
+                                              dtype=np.int32),
+                'measPhaseArray': np.frombuffer(self.measPhaseArray,
+                                                dtype=np.int8)}
+
+    def loadArrays(self, arrays):
+        # rows from toArrays, replacing anything already loaded
+        self.busList = [sys.intern(name) for name in arrays['busList'].tolist()]
+        self.busIndexDict = {name: busId
+                             for busId, name in enumerate(self.busList)}
+        self.phaseList = arrays['phaseList'].tolist()
+        self.phaseIndexDict = {phase: code
+                               for code, phase in enumerate(self.phaseList)}
+        self.estCNIDList = [cnid if cnid else None
+                            for cnid in arrays['estCNIDList'].tolist()]
+        self.vnomBusArray = array('i', arrays['vnomBusArray'].astype(np.int32).tobytes())
+        self.vnomPhaseArray = array('b', arrays['vnomPhaseArray'].astype(np.int8).tobytes())
+        self.vnomMagArray = array('d', arrays['vnomMagArray'].astype(np.float64).tobytes())
+        self.vnomAngArray = array('d', arrays['vnomAngArray'].astype(np.float64).tobytes())
+        self.measMRIDList = arrays['measMRIDList'].tolist()
+        self.measBusArray = array('i', arrays['measBusArray'].astype(np.int32).tobytes())
+        self.measPhaseArray = array('b', arrays['measPhaseArray'].astype(np.int8).tobytes())
+
+    def finalize(self):
+        # dense nominal voltage tables, where a later row for the same pair
+        # replaces an earlier one, and the measurement index by pair
+        shape = (len(self.busList), len(self.phaseList))
+        busArray = np.frombuffer(self.vnomBusArray, dtype=np.int32)
+        phaseArray = np.frombuffer(self.vnomPhaseArray, dtype=np.int8)
+        self.vnomMagTable = np.full(shape, math.nan)
+        self.vnomMagTable[busArray, phaseArray] = self.vnomMagArray
+        self.vnomAngTable = np.full(shape, math.nan)
+        self.vnomAngTable[busArray, phaseArray] = self.vnomAngArray
+
+        self.pairMeasDict = {}
+        for ix, key in enumerate(zip(self.measBusArray, self.measPhaseArray)):
+            self.pairMeasDict.setdefault(key, []).append(ix)
+
+    def measured(self, buspair):
+        return self.pairKey(buspair) in self.pairMeasDict
+
+    def vnom(self, busId, code, magFlag):
+        # nominal magnitude or angle, None if there is none
+        vnom = (self.vnomMagTable if magFlag else self.vnomAngTable)[busId, code]
+        return None if math.isnan(vnom) else float(vnom)
+
+    def measMRIDs(self, key):
+        return [self.measMRIDList[ix] for ix in self.pairMeasDict.get(key, ())]
+
+    def estimateNodes(self):
+        # (bus id, ConnectivityNode mRID) for buses with an estimate node
+        return [(busId, cnid) for busId, cnid in enumerate(self.estCNIDList)
+                if cnid is not None]
+
+    def counts(self):
+        return {'buses': len(self.busList),
+                'estimate nodes': len(self.estimateNodes()),
+                'nominal voltages': len(self.vnomBusArray),
+                'measurements': len(self.measMRIDList)}
+
+    def busToEstDict(self):
+        return {self.busList[busId]: cnid
+                for busId, cnid in self.estimateNodes()}
+
+    def busToMeasDict(self):
+        return {self.pairName(*key): self.measMRIDs(key)
+                for key in self.pairMeasDict}
+
+    def busToVnomDict(self, magFlag):
+        table = self.vnomMagTable if magFlag else self.vnomAngTable
+        return {self.pairName(busId, code): float(table[busId, code])
+                for busId, code in zip(*np.nonzero(~np.isnan(table)))}
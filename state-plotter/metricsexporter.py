@@ -0,0 +1,204 @@
+# ------------------------------------------------------------------------------
+# Copyright (c) 2019, Battelle Memorial Institute All rights reserved.
+# Battelle Memorial Institute (hereinafter Battelle) hereby grants permission to any person or entity
+# lawfully obtaining a copy of this software and associated documentation files (hereinafter the
+# Software) to redistribute and use the Software in source and binary forms, with or without modification.
+# Such person or entity may use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and may permit others to do so, subject to the following conditions:
+# Redistributions of source code must retain the above copyright notice, this list of conditions and the
+# following disclaimers.
+# Redistributions in binary form must reproduce the above copyright notice, this list of conditions and
+# the following disclaimer in the documentation and/or other materials provided with the distribution.
+# Other than as used herein, neither the name Battelle Memorial Institute or Battelle may be used in any
+# form whatsoever without the express written consent of Battelle.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL
+# BATTELLE OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE
+# GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED
+# AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+# General disclaimer for use with OSS licenses
+#
+# This material was prepared as an account of work sponsored by an agency of the United States Government.
+# Neither the United States Government nor the United States Department of Energy, nor Battelle, nor any
+# of their employees, nor any jurisdiction or organization that has cooperated in the development of these
+# materials, makes any warranty, express or implied, or assumes any legal liability or responsibility for
+# the accuracy, completeness, or usefulness or any information, apparatus, product, software, or process
+# disclosed, or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or service by trade name, trademark, manufacturer,
+# or otherwise does not necessarily constitute or imply its endorsement, recommendation, or favoring by the United
+# States Government or any agency thereof, or Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by BATTELLE for the
+# UNITED STATES DEPARTMENT OF ENERGY under Contract DE-AC05-76RL01830
+"""
+Prometheus text format metrics for the state plotter.
+
+PrometheusText builds the text exposition format from counters, gauges and
+HotPathStats histograms. A MetricsPublisher holds the latest text, which
+the plotter refreshes from its GUI thread, and serves it to a local HTTP
+endpoint at /metrics, rewrites a file with it, or both. The file is
+written to a temporary file in the same directory and renamed over the old
+one so readers such as the node exporter textfile collector never see a
+partial file. Serving a snapshot means the HTTP thread never reads plotter
+state that the GUI thread is changing.
+
+@author: Gary D. Black
+"""
+
+import os
+import time
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from hotpathstats import BUCKET_BOUNDS
+
+# seconds between refreshes of the published text
+REFRESH_SECONDS = 1.0
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def residentBytes():
+    # current resident set size from /proc, None where that isn't available
+    try:
+        with open('/proc/self/statm') as statmFile:
+            return int(statmFile.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _labelText(labelDict):
+    if not labelDict:
+        return ''
+    return '{' + ','.join(name + '="' + str(value).replace('\\', '\\\\')
+                          .replace('"', '\\"').replace('\n', '\\n') + '"'
+                          for name, value in labelDict.items()) + '}'
+
+
+def _valueText(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PrometheusText:
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.lineList = []
+
+    def metric(self, name, kind, helpText, sampleList):
+        # sampleList holds (labelDict, value) pairs, with None values left out
+        sampleList = [sample for sample in sampleList
+                      if sample[1] is not None]
+        if len(sampleList) == 0:
+            return
+
+        name = self.prefix + name
+        self.lineList.append('# HELP ' + name + ' ' + helpText)
+        self.lineList.append('# TYPE ' + name + ' ' + kind)
+        for labelDict, value in sampleList:
+            self.lineList.append(name + _labelText(labelDict) + ' ' +
+                                 _valueText(value))
+
+    def histogram(self, name, helpText, histList):
+        # histList holds (labelDict, Histogram) pairs
+        name = self.prefix + name
+        self.lineList.append('# HELP ' + name + ' ' + helpText)
+        self.lineList.append('# TYPE ' + name + ' histogram')
+        for labelDict, hist in histList:
+            # the buckets are copied first since the GUI thread may be
+            # adding to them, with the count taken from the same copy
+            countList = list(hist.countList)
+            cumulative = 0
+            for bound, count in zip(BUCKET_BOUNDS + (float('inf'),),
+                                    countList):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else '{:g}'.format(bound)
+                self.lineList.append(name + '_bucket' +
+                                     _labelText(dict(labelDict, le=le)) +
+                                     ' ' + str(cumulative))
+            self.lineList.append(name + '_sum' + _labelText(labelDict) +
+                                 ' ' + repr(float(hist.total)))
+            self.lineList.append(name + '_count' + _labelText(labelDict) +
+                                 ' ' + str(cumulative))
+
+    def text(self):
+        return '\n'.join(self.lineList) + '\n'
+
+
+class MetricsPublisher:
+    def __init__(self, address=None, path=None):
+        # address is a (host, port) pair for the HTTP endpoint and path the
+        # file to rewrite, either of which may be None
+        self.path = path
+        self.text = ''
+        self.lastRefresh = -REFRESH_SECONDS
+        self.fileErrorFlag = False
+        self.server = None
+
+        if address:
+            publisher = self
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split('?')[0] not in ('/', '/metrics'):
+                        self.send_error(404)
+                        return
+
+                    body = publisher.text.encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', CONTENT_TYPE)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    # scrapes would otherwise be logged to stderr
+                    pass
+
+            # raises OSError if the port can't be bound
+            self.server = HTTPServer(address, MetricsHandler)
+            threading.Thread(target=self.server.serve_forever,
+                             daemon=True).start()
+
+    def due(self):
+        return time.monotonic() - self.lastRefresh >= REFRESH_SECONDS
+
+    def update(self, text):
+        # returns an error message the first time the file can't be
+        # written after having been written, None otherwise
+        self.lastRefresh = time.monotonic()
+        self.text = text
+
+        if not self.path:
+            return None
+
+        tempPath = None
+        try:
+            fd, tempPath = tempfile.mkstemp(
+                    dir=os.path.dirname(os.path.abspath(self.path)),
+                    prefix='.metrics-')
+            with os.fdopen(fd, 'w') as tempFile:
+                tempFile.write(text)
+            # mkstemp files are only readable by their owner
+            os.chmod(tempPath, 0o644)
+            os.replace(tempPath, self.path)
+        except OSError as e:
+            if tempPath and os.path.exists(tempPath):
+                os.unlink(tempPath)
+            if self.fileErrorFlag:
+                return None
+            self.fileErrorFlag = True
+            return str(e)
+
+        self.fileErrorFlag = False
+        return None
+
+    def close(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
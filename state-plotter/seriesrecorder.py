@@ -0,0 +1,317 @@
+# ------------------------------------------------------------------------------
+# Copyright (c) 2019, Battelle Memorial Institute All rights reserved.
+# Battelle Memorial Institute (hereinafter Battelle) hereby grants permission to any person or entity
+# lawfully obtaining a copy of this software and associated documentation files (hereinafter the
+# Software) to redistribute and use the Software in source and binary forms, with or without modification.
+# Such person or entity may use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and may permit others to do so, subject to the following conditions:
+# Redistributions of source code must retain the above copyright notice, this list of conditions and the
+# following disclaimers.
+# Redistributions in binary form must reproduce the above copyright notice, this list of conditions and
+# the following disclaimer in the documentation and/or other materials provided with the distribution.
+# Other than as used herein, neither the name Battelle Memorial Institute or Battelle may be used in any
+# form whatsoever without the express written consent of Battelle.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL
+# BATTELLE OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE
+# GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED
+# AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+# General disclaimer for use with OSS licenses
+#
+# This material was prepared as an account of work sponsored by an agency of the United States Government.
+# Neither the United States Government nor the United States Department of Energy, nor Battelle, nor any
+# of their employees, nor any jurisdiction or organization that has cooperated in the development of these
+# materials, makes any warranty, express or implied, or assumes any legal liability or responsibility for
+# the accuracy, completeness, or usefulness or any information, apparatus, product, software, or process
+# disclosed, or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or service by trade name, trademark, manufacturer,
+# or otherwise does not necessarily constitute or imply its endorsement, recommendation, or favoring by the United
+# States Government or any agency thereof, or Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by BATTELLE for the
+# UNITED STATES DEPARTMENT OF ENERGY under Contract DE-AC05-76RL01830
+"""
+Headless recording of the plotted series for the state plotter.
+
+A SeriesRecorder stands in for the SeriesStores when there is no plot
+window, writing the measurement, estimate and difference values the
+callbacks would have plotted to an append-only columnar file instead of
+keeping them in memory. Each RecorderStore has the same addSeries, append,
+appendRow and appendColumn methods as a SeriesStore so the callbacks and
+the join logic are unchanged. Values are buffered per store as float32
+columns of series x timestamps and written as a chunk once CHUNK_SIZE
+timestamps are complete or FLUSH_SECONDS have passed since the last chunk.
+
+The file starts with MAGIC followed by records, each a 4-byte kind, the
+8-byte little-endian payload length and the payload:
+    INFO: JSON with the model, simulation and plot options
+    CHNK: 4-byte JSON header length, JSON header with the store name, the
+          number of series rows and timestamps and the names of series
+          added since the store's previous chunk, then the timestamps as
+          float64 and the values as float32 rows x timestamps
+    INDX: JSON with the offset, store, timestamp count and first and last
+          timestamp of every chunk along with the series names of each store
+Closing the recorder writes the INDX record and a trailer of its 8-byte
+offset and MAGIC so readRecording can seek straight to the chunks covering
+a timestamp range. A file without the trailer, from a run that was killed,
+is read by scanning the chunks instead.
+
+@author: Gary D. Black
+"""
+
+import json
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b'STPLREC1'
+
+# timestamps buffered per store before a chunk is written, along with the
+# maximum seconds a completed timestamp waits before being written
+CHUNK_SIZE = 64
+FLUSH_SECONDS = 30.0
+
+INIT_SERIES_CAPACITY = 16
+
+RECORD_HEADER = struct.Struct('<4sQ')
+TRAILER = struct.Struct('<Q8s')
+
+
+class RecorderStore:
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+        self.rowDict = {}
+        self.keyList = []
+        # number of series names already written with a chunk
+        self.namedCount = 0
+        self.tsCount = 0
+        self.tsList = []
+        self.dataArray = np.full((INIT_SERIES_CAPACITY, CHUNK_SIZE), np.nan,
+                                 dtype=np.float32)
+        self.flushTime = time.monotonic()
+
+    def __contains__(self, key):
+        return key in self.rowDict
+
+    def __iter__(self):
+        return iter(self.keyList)
+
+    def __len__(self):
+        return self.tsCount
+
+    def keys(self):
+        return self.keyList
+
+    def addSeries(self, key):
+        # returns the row for the series, creating it if needed
+        if key in self.rowDict:
+            return self.rowDict[key]
+
+        row = len(self.keyList)
+        if row == self.dataArray.shape[0]:
+            dataArray = np.full((2*row, self.dataArray.shape[1]), np.nan,
+                                dtype=np.float32)
+            dataArray[:row] = self.dataArray
+            self.dataArray = dataArray
+
+        self.rowDict[key] = row
+        self.keyList.append(key)
+        return row
+
+    def append(self, ts, key, value):
+        self.appendRow(ts, self.rowDict[key], value)
+
+    def appendRow(self, ts, row, value):
+        self.dataArray[row, self._column(ts)] = value
+
+    def appendColumn(self, ts, rows, values):
+        # values for an array of rows at one timestamp, adding nothing when
+        # there are no rows
+        if len(rows) > 0:
+            self.dataArray[rows, self._column(ts)] = values
+
+    def _column(self, ts):
+        # values for the same timestamp share a column, so a new column is
+        # only started when the timestamp differs from the latest one, which
+        # is when the columns before it are known to be complete
+        if len(self.tsList)==0 or self.tsList[-1]!=ts:
+            if len(self.tsList)==CHUNK_SIZE or (len(self.tsList)>0 and
+                    time.monotonic()-self.flushTime>=FLUSH_SECONDS):
+                self.flush()
+            self.tsList.append(ts)
+            self.tsCount += 1
+
+        return len(self.tsList) - 1
+
+    def flush(self):
+        # write the buffered timestamps as a chunk and empty the buffer
+        self.flushTime = time.monotonic()
+        count = len(self.tsList)
+        if count == 0:
+            return
+
+        rows = len(self.keyList)
+        self.recorder.writeChunk(self.name, self.keyList[self.namedCount:rows],
+                                 self.tsList, self.dataArray[:rows, :count])
+        self.namedCount = rows
+
+        self.dataArray[:, :count] = np.nan
+        self.tsList.clear()
+
+
+class SeriesRecorder:
+    def __init__(self, path, infoDict):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self._writeRecord(b'INFO', json.dumps(infoDict).encode())
+        self.file.flush()
+        self.storeDict = {}
+        self.chunkList = []
+        self.byteCount = 0
+
+    def store(self, name):
+        # the store for one plotted stream, created the first time
+        if name not in self.storeDict:
+            self.storeDict[name] = RecorderStore(self, name)
+        return self.storeDict[name]
+
+    def writeChunk(self, name, newKeys, tsList, dataBlock):
+        header = json.dumps({'store': name, 'rows': dataBlock.shape[0],
+                             'count': len(tsList), 'names': newKeys}).encode()
+        payload = b''.join([struct.pack('<I', len(header)), header,
+                            np.asarray(tsList, dtype='<f8').tobytes(),
+                            np.ascontiguousarray(dataBlock,
+                                                 dtype='<f4').tobytes()])
+        self.chunkList.append([self.file.tell(), name, len(tsList),
+                               float(tsList[0]), float(tsList[-1])])
+        self._writeRecord(b'CHNK', payload)
+        # complete chunks are on disk even if the process is killed
+        self.file.flush()
+        self.byteCount += len(payload)
+
+    def close(self, infoDict=None):
+        # write the buffered timestamps of every store then the index and
+        # trailer, with infoDict adding to the INFO written at the start
+        for store in self.storeDict.values():
+            store.flush()
+
+        offset = self.file.tell()
+        index = {'chunks': self.chunkList,
+                 'series': {name: store.keyList
+                            for name, store in self.storeDict.items()},
+                 'info': infoDict if infoDict else {}}
+        self._writeRecord(b'INDX', json.dumps(index).encode())
+        self.file.write(TRAILER.pack(offset, MAGIC))
+        self.file.close()
+
+    def _writeRecord(self, kind, payload):
+        self.file.write(RECORD_HEADER.pack(kind, len(payload)))
+        self.file.write(payload)
+
+
+def _readRecord(recFile):
+    # (kind, payload) of the record at the current position or None at the
+    # end of the file or a record truncated by a killed run
+    header = recFile.read(RECORD_HEADER.size)
+    if len(header) < RECORD_HEADER.size:
+        return None
+    kind, length = RECORD_HEADER.unpack(header)
+    payload = recFile.read(length)
+    if len(payload) < length:
+        return None
+    return kind, payload
+
+
+def _chunkArrays(payload):
+    headerLen, = struct.unpack_from('<I', payload)
+    header = json.loads(payload[4:4+headerLen])
+    rows = header['rows']
+    count = header['count']
+    offset = 4 + headerLen
+    tsArray = np.frombuffer(payload, dtype='<f8', count=count, offset=offset)
+    dataBlock = np.frombuffer(payload, dtype='<f4', count=rows*count,
+                              offset=offset+8*count).reshape(rows, count)
+    return header, tsArray, dataBlock
+
+
+def readRecording(path, tsMin=None, tsMax=None):
+    # the INFO dictionary and, for each store, the series names, the
+    # timestamps and a float32 series x timestamps array of the values with
+    # NaN where there is no value, limited to timestamps in [tsMin, tsMax]
+    # when given, reading only the chunks that overlap it
+    with open(path, 'rb') as recFile:
+        if recFile.read(len(MAGIC)) != MAGIC:
+            raise ValueError(path + ' is not a state plotter recording')
+        kind, payload = _readRecord(recFile)
+        info = json.loads(payload)
+
+        recFile.seek(0, 2)
+        size = recFile.tell()
+        index = None
+        if size >= len(MAGIC) + TRAILER.size:
+            recFile.seek(size - TRAILER.size)
+            offset, magic = TRAILER.unpack(recFile.read(TRAILER.size))
+            if magic == MAGIC:
+                recFile.seek(offset)
+                index = json.loads(_readRecord(recFile)[1])
+                info.update(index['info'])
+
+        chunkDict = {}
+        nameDict = {}
+        if index:
+            nameDict = index['series']
+            for offset, name, count, tsFirst, tsLast in index['chunks']:
+                if (tsMin is not None and tsLast < tsMin) or \
+                   (tsMax is not None and tsFirst > tsMax):
+                    continue
+                recFile.seek(offset)
+                header, tsArray, dataBlock = \
+                        _chunkArrays(_readRecord(recFile)[1])
+                chunkDict.setdefault(name, []).append((tsArray, dataBlock))
+        else:
+            recFile.seek(len(MAGIC))
+            _readRecord(recFile)
+            while True:
+                record = _readRecord(recFile)
+                if record is None or record[0] != b'CHNK':
+                    break
+                header, tsArray, dataBlock = _chunkArrays(record[1])
+                name = header['store']
+                nameDict.setdefault(name, []).extend(header['names'])
+                if (tsMin is not None and tsArray[-1] < tsMin) or \
+                   (tsMax is not None and tsArray[0] > tsMax):
+                    continue
+                chunkDict.setdefault(name, []).append((tsArray, dataBlock))
+
+    streamDict = {}
+    for name, keyList in nameDict.items():
+        chunks = chunkDict.get(name, [])
+        tsArray = np.concatenate([chunk[0] for chunk in chunks]) \
+                if chunks else np.empty(0)
+        # chunks written before later series were added have fewer rows
+        dataArray = np.full((len(keyList), len(tsArray)), np.nan,
+                            dtype=np.float32)
+        column = 0
+        for chunkTS, dataBlock in chunks:
+            dataArray[:dataBlock.shape[0], column:column+len(chunkTS)] = \
+                    dataBlock
+            column += len(chunkTS)
+
+        # chunks are selected whole so trim them to the range
+        keep = np.ones(len(tsArray), dtype=bool)
+        if tsMin is not None:
+            keep &= tsArray >= tsMin
+        if tsMax is not None:
+            keep &= tsArray <= tsMax
+        streamDict[name] = (keyList, tsArray[keep], dataArray[:, keep])
+
+    return info, streamDict
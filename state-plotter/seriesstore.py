@@ -0,0 +1,768 @@
+# ------------------------------------------------------------------------------
+# Copyright (c) 2019, Battelle Memorial Institute All rights reserved.
+# Battelle Memorial Institute (hereinafter Battelle) hereby grants permission to any person or entity
+# lawfully obtaining a copy of this software and associated documentation files (hereinafter the
+# Software) to redistribute and use the Software in source and binary forms, with or without modification.
+# Such person or entity may use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and may permit others to do so, subject to the following conditions:
+# Redistributions of source code must retain the above copyright notice, this list of conditions and the
+# following disclaimers.
+# Redistributions in binary form must reproduce the above copyright notice, this list of conditions and
+# the following disclaimer in the documentation and/or other materials provided with the distribution.
+# Other than as used herein, neither the name Battelle Memorial Institute or Battelle may be used in any
+# form whatsoever without the express written consent of Battelle.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL
+# BATTELLE OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE
+# GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED
+# AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+# General disclaimer for use with OSS licenses
+#
+# This material was prepared as an account of work sponsored by an agency of the United States Government.
+# Neither the United States Government nor the United States Department of Energy, nor Battelle, nor any
+# of their employees, nor any jurisdiction or organization that has cooperated in the development of these
+# materials, makes any warranty, express or implied, or assumes any legal liability or responsibility for
+# the accuracy, completeness, or usefulness or any information, apparatus, product, software, or process
+# disclosed, or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or service by trade name, trademark, manufacturer,
+# or otherwise does not necessarily constitute or imply its endorsement, recommendation, or favoring by the United
+# States Government or any agency thereof, or Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by BATTELLE for the
+# UNITED STATES DEPARTMENT OF ENERGY under Contract DE-AC05-76RL01830
+# ------------------------------------------------------------------------------
+"""
+Columnar time-series storage for the state plotter.
+
+Each SeriesStore holds one plotted stream (measurements, estimates, or one of
+the difference streams) as a single shared timestamp axis and a 2-D float
+array of series x timestamps. Samples that never arrive for a series at a
+given timestamp are left as NaN, which matplotlib draws as a gap and which
+the extrema calculations ignore.
+
+Pausing a store freezes a watermark on the number of timestamps that are
+visible. Appends continue past the watermark and resuming simply removes it.
+
+The minimum and maximum across all series of every completed timestamp are
+summarized in an ExtremaTree so y-axis autoscaling over any window takes
+logarithmic rather than linear time in the number of timestamps and series.
+
+Windows with more timestamps than can be resolved horizontally are decimated
+to the minimum and maximum of each series over buckets of 2^level timestamps,
+giving two to four points per pixel while keeping every peak. Buckets of 16
+or more timestamps come from a Pyramid of aggregate levels that is extended
+with each completed timestamp, so a redraw at any pan or zoom position only
+reads about as many values as there are pixels no matter how long the
+history is.
+
+By default everything is held in RAM. With a retention limit set, only the
+most recent timestamps are kept in RAM and older ones are spilled in chunks
+to a ColumnArchive in a memory-mapped temporary file, which the window
+engine reads from transparently when panning back. The ExtremaTree and
+Pyramid levels spill their buckets for the same timestamps to the same file,
+so RAM stays flat however long the run is while the file grows by about 10
+bytes per spilled value.
+
+@author: Gary D. Black
+"""
+
+import sys
+import tempfile
+from bisect import bisect_right
+
+import numpy as np
+
+# initial number of timestamps and series allocated, doubled as needed
+INIT_TS_CAPACITY = 256
+INIT_SERIES_CAPACITY = 16
+
+# finest Pyramid level, with buckets of 16 timestamps. Decimating at a finer
+# level covers fewer than 16 timestamps per pixel, few enough to reduce from
+# the raw values, and starting here keeps the levels to about a quarter of
+# the size of the values they summarize.
+PYRAMID_BASE_LEVEL = 4
+
+
+def bucketExtrema(block, level):
+    # minimum and maximum values per series over buckets of 2^level
+    # timestamps along with their offsets within each bucket, padding a
+    # partial final bucket with NaN
+    rows = block.shape[0]
+    bucketSize = 1 << level
+    pad = -block.shape[1] % bucketSize
+    if pad > 0:
+        block = np.concatenate((block, np.full((rows, pad), np.nan)), axis=1)
+    block = block.reshape(rows, -1, bucketSize)
+
+    nanMask = np.isnan(block)
+    minOff = np.argmin(np.where(nanMask, np.inf, block), axis=2)
+    maxOff = np.argmax(np.where(nanMask, -np.inf, block), axis=2)
+    minVal = np.take_along_axis(block, minOff[:, :, None], axis=2)[:, :, 0]
+    maxVal = np.take_along_axis(block, maxOff[:, :, None], axis=2)[:, :, 0]
+    return minVal, maxVal, minOff, maxOff
+
+
+class SpillFile:
+    # append-only temporary file in directory that is memory-mapped for
+    # reading, so spilled arrays can be shared by several archives without
+    # a file descriptor for each
+    def __init__(self, directory):
+        self.fp = tempfile.TemporaryFile(dir=directory)
+        self.size = 0
+        self.map = None
+
+    def write(self, array):
+        # append the array and return its byte offset, which is kept a
+        # multiple of 8 so it can be read back in place as any type
+        offset = self.size
+        data = np.ascontiguousarray(array).tobytes()
+        data += bytes(-len(data) % 8)
+        self.fp.seek(offset)
+        self.fp.write(data)
+        self.size += len(data)
+        return offset
+
+    def read(self, offset, dtype, shape):
+        # read-only view of an array written at offset, remapping the file
+        # when the array was written since it was last mapped
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if nbytes == 0:
+            return np.empty(shape, dtype)
+        if self.map is None or offset+nbytes > self.map.shape[0]:
+            self.fp.flush()
+            self.map = np.memmap(self.fp, dtype=np.uint8, mode='r',
+                                 shape=(self.size,))
+        return self.map[offset:offset+nbytes].view(dtype).reshape(shape)
+
+
+class ColumnArchive:
+    # series x timestamp (or bucket) arrays of one or more types spilled
+    # from RAM, appended in chunks to a SpillFile, along with the timestamps
+    # of each chunk in a separate SpillFile for the raw values of a store
+    def __init__(self, spillFile, dtypeList=(np.float64,), fillList=(np.nan,),
+                 tsFile=None):
+        self.spillFile = spillFile
+        self.dtypeList = dtypeList
+        self.fillList = fillList
+        self.tsFile = tsFile
+        # first timestamp index of each chunk and its (rows, byte offsets)
+        self.chunkStartList = []
+        self.chunkList = []
+        self.count = 0
+        self.tsMap = None
+
+    def append(self, blockList, tsBlock=None):
+        # blockList has one series x timestamps block for each type
+        offsetList = [self.spillFile.write(block) for block in blockList]
+        self.chunkStartList.append(self.count)
+        self.chunkList.append((blockList[0].shape[0], offsetList))
+        self.count += blockList[0].shape[1]
+
+        if tsBlock is not None:
+            self.tsFile.write(tsBlock)
+            self.tsMap = self.tsFile.read(0, np.float64, (self.count,))
+
+    def block(self, rows, start, end, index=0):
+        # values of the type at index for the first rows series over
+        # timestamp indices [start, end), filled in for series added after
+        # a chunk was written
+        dtype = self.dtypeList[index]
+        block = np.full((rows, end-start), self.fillList[index], dtype)
+        chunk = bisect_right(self.chunkStartList, start) - 1
+        while chunk<len(self.chunkList) and self.chunkStartList[chunk]<end:
+            chunkStart = self.chunkStartList[chunk]
+            chunkEnd = self.chunkStartList[chunk+1] \
+                    if chunk+1<len(self.chunkList) else self.count
+            chunkRows, offsetList = self.chunkList[chunk]
+            values = self.spillFile.read(offsetList[index], dtype,
+                                         (chunkRows, chunkEnd-chunkStart))
+            first = max(start, chunkStart)
+            last = min(end, chunkEnd)
+            shared = min(rows, chunkRows)
+            block[:shared, first-start:last-start] = \
+                    values[:shared, first-chunkStart:last-chunkStart]
+            chunk += 1
+
+        return block
+
+
+class AggregateLevel:
+    # one level of an ExtremaTree or Pyramid as series x bucket arrays of
+    # one or more types. With a SpillFile the buckets before start can be
+    # spilled to a ColumnArchive, leaving only the rest in RAM.
+    def __init__(self, dtypeList, fillList, seriesCap, capacity,
+                 spillFile=None):
+        self.dtypeList = dtypeList
+        self.fillList = fillList
+        self.spillFile = spillFile
+        self.archive = None
+        self.start = 0
+        # one past the last bucket written
+        self.end = 0
+        self.arrays = [np.full((seriesCap, capacity), fill, dtype)
+                       for dtype, fill in zip(dtypeList, fillList)]
+
+    def resize(self, seriesCap, capacity):
+        # reallocate the RAM arrays keeping the buckets written since start
+        used = self.end - self.start
+        rows = min(seriesCap, self.arrays[0].shape[0])
+        arrays = []
+        for array, dtype, fill in zip(self.arrays, self.dtypeList,
+                                      self.fillList):
+            newArray = np.full((seriesCap, capacity), fill, dtype)
+            newArray[:rows, :used] = array[:rows, :used]
+            arrays.append(newArray)
+        self.arrays = arrays
+
+    def slots(self, rows, first, last):
+        # writable arrays for buckets [first, last), none of which may have
+        # been spilled, growing RAM as needed
+        capacity = self.arrays[0].shape[1]
+        if last-self.start > capacity:
+            self.resize(self.arrays[0].shape[0],
+                        max(2*capacity, last-self.start))
+        self.end = max(self.end, last)
+        return [array[:rows, first-self.start:last-self.start]
+                for array in self.arrays]
+
+    def read(self, rows, first, last):
+        # arrays for buckets [first, last) from the archive and/or RAM
+        start = self.start
+        if first >= start:
+            return [array[:rows, first-start:last-start]
+                    for array in self.arrays]
+
+        archived = [self.archive.block(rows, first, min(last, start), index)
+                    for index in range(len(self.arrays))]
+        if last <= start:
+            return archived
+        return [np.concatenate((block, array[:rows, :last-start]), axis=1)
+                for block, array in zip(archived, self.arrays)]
+
+    def spill(self, rows, end):
+        # move the buckets before end to the archive and the remaining ones
+        # to the start of RAM
+        spilled = min(end, self.end) - self.start
+        if self.spillFile is None or spilled <= 0:
+            return
+
+        if self.archive is None:
+            self.archive = ColumnArchive(self.spillFile, self.dtypeList,
+                                         self.fillList)
+        self.archive.append([array[:rows, :spilled] for array in self.arrays])
+
+        kept = self.end - self.start - spilled
+        for array, fill in zip(self.arrays, self.fillList):
+            array[:, :kept] = array[:, spilled:spilled+kept]
+            array[:, kept:kept+spilled] = fill
+        self.start += spilled
+
+
+class ExtremaTree:
+    # per timestamp minimum and maximum values with each level above the
+    # first holding the extrema of aligned pairs from the level below,
+    # levels being added as the number of timestamps grows
+    def __init__(self, spillFile=None):
+        self.count = 0
+        self.spillFile = spillFile
+        self.levels = []
+
+    def extend(self, colMin, colMax):
+        # add the extrema of the next timestamps and update the levels above
+        start = self.count
+        end = start + len(colMin)
+        self.count = end
+
+        level = 0
+        while level==0 or self.levels[level-1].end > 1:
+            if level == len(self.levels):
+                self.levels.append(AggregateLevel(
+                        (np.float64, np.float64), (np.nan, np.nan), 1,
+                        max(INIT_TS_CAPACITY >> level, 2), self.spillFile))
+            minOut, maxOut = self.levels[level].slots(1, start, end)
+            if level == 0:
+                minOut[0] = colMin
+                maxOut[0] = colMax
+            else:
+                # a final bucket without a pair has only its left half
+                below = self.levels[level-1]
+                for out, values, func in zip(
+                        (minOut, maxOut),
+                        below.read(1, 2*start, min(2*end, below.end)),
+                        (np.fmin, np.fmax)):
+                    if values.shape[1] & 1:
+                        values = np.concatenate((values, [[np.nan]]), axis=1)
+                    func(values[:, 0::2], values[:, 1::2], out=out)
+            start >>= 1
+            end = (end+1) >> 1
+            level += 1
+
+    def query(self, start, end):
+        # extrema over timestamp indices [start, end) using at most two
+        # entries per level, NaN if there is no data in the range
+        ymin = ymax = np.nan
+        level = 0
+        while start < end:
+            if start & 1:
+                entryMin, entryMax = self.levels[level].read(1, start,
+                                                             start+1)
+                ymin = np.fmin(ymin, entryMin[0, 0])
+                ymax = np.fmax(ymax, entryMax[0, 0])
+                start += 1
+            if end & 1:
+                end -= 1
+                entryMin, entryMax = self.levels[level].read(1, end, end+1)
+                ymin = np.fmin(ymin, entryMin[0, 0])
+                ymax = np.fmax(ymax, entryMax[0, 0])
+            start >>= 1
+            end >>= 1
+            level += 1
+
+        return ymin, ymax
+
+    def spill(self, end):
+        # spill the entries covering only timestamps before end
+        for level, aggregate in enumerate(self.levels):
+            aggregate.spill(1, end >> level)
+
+
+class Pyramid:
+    # level k (PYRAMID_BASE_LEVEL <= k) holds the minimum and maximum of the
+    # values for each series over every bucket of 2^k timestamps along with
+    # the offsets of the minimum and maximum within the bucket, each level
+    # above the base being built from aligned pairs of buckets in the level
+    # below. Finer levels are reduced from the raw values when read.
+    def __init__(self, seriesCap, spillFile=None):
+        self.seriesCap = seriesCap
+        self.spillFile = spillFile
+        self.levels = []
+
+    def grow(self, seriesCap):
+        # make room for more series in each level
+        self.seriesCap = seriesCap
+        for aggregate in self.levels:
+            aggregate.resize(seriesCap, aggregate.arrays[0].shape[1])
+
+    def count(self, level):
+        # number of complete buckets available for the level
+        index = level - PYRAMID_BASE_LEVEL
+        if 0 <= index < len(self.levels):
+            return self.levels[index].end
+        return 0
+
+    def closed(self):
+        # number of timestamps summarized by the base level, which need to
+        # stay readable as raw values until then
+        return self.count(PYRAMID_BASE_LEVEL) << PYRAMID_BASE_LEVEL
+
+    def extend(self, dataArray, offset, rows, closed):
+        # add the buckets completed by the first closed timestamps where
+        # dataArray holds the values from timestamp index offset onwards,
+        # stopping at the first level without a new bucket since none above
+        # can have one
+        index = 0
+        while True:
+            level = PYRAMID_BASE_LEVEL + index
+            start = self.count(level)
+            end = closed >> level
+            if end <= start:
+                break
+
+            if index == len(self.levels):
+                # offsets in the narrowest type for the bucket size
+                offsetType = np.min_scalar_type((1 << level) - 1)
+                self.levels.append(AggregateLevel(
+                        (np.float64, np.float64, offsetType, offsetType),
+                        (np.nan, np.nan, 0, 0), self.seriesCap,
+                        max(INIT_TS_CAPACITY >> level, 2), self.spillFile))
+            out = self.levels[index].slots(rows, start, end)
+            if index == 0:
+                block = dataArray[:rows, (start << level)-offset:
+                                         (end << level)-offset]
+                for array, values in zip(out, bucketExtrema(block, level)):
+                    array[:] = values
+            else:
+                below = self.levels[index-1].read(rows, 2*start, 2*end)
+                left = [array[:, 0::2] for array in below]
+                right = [array[:, 1::2] for array in below]
+                half = 1 << (level-1)
+
+                # ties and missing values keep the earlier offset
+                takeRight = (right[0] < left[0]) | np.isnan(left[0])
+                out[2][:] = np.where(takeRight,
+                                     right[2].astype(np.int64)+half, left[2])
+                np.fmin(left[0], right[0], out=out[0])
+                takeRight = (right[1] > left[1]) | np.isnan(left[1])
+                out[3][:] = np.where(takeRight,
+                                     right[3].astype(np.int64)+half, left[3])
+                np.fmax(left[1], right[1], out=out[1])
+
+            index += 1
+
+    def extrema(self, level, firstBucket, lastBucket, rows):
+        # minimum and maximum values and their timestamp indices per series
+        minVal, maxVal, minOff, maxOff = \
+                self.levels[level-PYRAMID_BASE_LEVEL].read(rows, firstBucket,
+                                                           lastBucket)
+        bucketStart = np.arange(firstBucket, lastBucket) << level
+        return minVal, maxVal, minOff+bucketStart, maxOff+bucketStart
+
+    def spill(self, rows, end):
+        # spill the buckets covering only timestamps before end that have
+        # been combined into the level above, since the level above only
+        # reads the level below for new buckets
+        for index, aggregate in enumerate(self.levels):
+            level = PYRAMID_BASE_LEVEL + index
+            if index+1 < len(self.levels):
+                aggregate.spill(rows, min(end >> level,
+                                          2*self.levels[index+1].end))
+
+
+class SeriesStore:
+    def __init__(self, name):
+        self.name = name
+        # series key (bus,phase pair or statistic name) to row index
+        self.rowDict = {}
+        self.keyList = []
+        self.tsCount = 0
+        # number of visible timestamps while paused, None when not paused
+        self.pauseCount = None
+        self.extremaTree = ExtremaTree()
+        self.pyramid = Pyramid(INIT_SERIES_CAPACITY)
+        # retention limits, with the timestamps before index ramStart in the
+        # archive and the rest at the start of tsArray and dataArray
+        self.retainCount = None
+        self.retainBytes = None
+        self.archive = None
+        self.ramStart = 0
+        self.tsArray = np.empty(INIT_TS_CAPACITY)
+        self.dataArray = np.full((INIT_SERIES_CAPACITY, INIT_TS_CAPACITY),
+                                 np.nan)
+
+    def __contains__(self, key):
+        return key in self.rowDict
+
+    def __iter__(self):
+        return iter(self.keyList)
+
+    def __len__(self):
+        return self.tsCount
+
+    def keys(self):
+        return self.keyList
+
+    def setRetention(self, count=None, megabytes=None, directory=None):
+        # keep at most count timestamps or megabytes of values in RAM with
+        # older timestamps spilled to files in directory (by default the
+        # system temporary directory). Must be set before adding data.
+        if directory is None:
+            directory = tempfile.gettempdir()
+
+        self.retainCount = count
+        self.retainBytes = None if megabytes is None else int(megabytes*2**20)
+        spillFile = SpillFile(directory)
+        self.archive = ColumnArchive(spillFile, tsFile=SpillFile(directory))
+        self.extremaTree = ExtremaTree(spillFile)
+        self.pyramid = Pyramid(self.dataArray.shape[0], spillFile)
+
+    def addSeries(self, key):
+        # returns the row for the series, creating it if needed
+        if key in self.rowDict:
+            return self.rowDict[key]
+
+        row = len(self.keyList)
+        if row == self.dataArray.shape[0]:
+            self._grow(2*row, self.dataArray.shape[1])
+
+        self.rowDict[key] = row
+        self.keyList.append(key)
+        return row
+
+    def append(self, ts, key, value):
+        self.appendRow(ts, self.rowDict[key], value)
+
+    def appendRow(self, ts, row, value):
+        # the column is found first since adding one may replace dataArray
+        column = self._column(ts)
+        self.dataArray[row, column] = value
+
+    def appendColumn(self, ts, rows, values):
+        # values for an array of rows at one timestamp, adding nothing when
+        # there are no rows
+        if len(rows) > 0:
+            column = self._column(ts)
+            self.dataArray[rows, column] = values
+
+    def _column(self, ts):
+        # values for the same timestamp share a column, so a new column is
+        # only started when the timestamp differs from the latest one
+        if self.tsCount==0 or self.tsArray[self.tsCount-1-self.ramStart]!=ts:
+            self.appendTimestamp(ts)
+
+        return self.tsCount - 1 - self.ramStart
+
+    def appendTimestamp(self, ts):
+        limit = self._ramLimit()
+        if limit is not None and self.tsCount-self.ramStart >= limit:
+            self._spill(limit)
+
+        col = self.tsCount - self.ramStart
+        if col == self.tsArray.shape[0]:
+            tsCap = 2*col if limit is None else max(min(2*col, limit), col+1)
+            self._grow(self.dataArray.shape[0], tsCap)
+
+        self.tsArray[col] = ts
+        self.dataArray[:, col] = np.nan
+        self.tsCount += 1
+        return self.tsCount - 1
+
+    def pause(self):
+        self.pauseCount = self.tsCount
+
+    def resume(self):
+        self.pauseCount = None
+
+    def visibleLen(self):
+        return self.tsCount if self.pauseCount is None else self.pauseCount
+
+    def lastTS(self):
+        count = self.visibleLen()
+        return self._tsAt(count-1) if count>0 else None
+
+    def window(self, tsXmin, tsXmax):
+        # timestamp index range covering [tsXmin, tsXmax] by binary search
+        # on the monotonic timestamp axis, widened by a point on each side
+        # when feasible so there is no data gap at the left and right edges
+        count = self.visibleLen()
+
+        tsStartpt = 0
+        if tsXmin > 0:
+            tsStartpt = max(self._searchTS(tsXmin, 'left', count)-1, 0)
+
+        tsEndpt = min(self._searchTS(tsXmax, 'right', count)+1, count)
+
+        return tsStartpt, tsEndpt
+
+    def tsView(self, start=0, end=None):
+        if end is None:
+            end = self.visibleLen()
+        return self._tsBlock(start, end)
+
+    def seriesView(self, key, start=0, end=None):
+        if end is None:
+            end = self.visibleLen()
+        return self._dataBlock(start, end)[self.rowDict[key]]
+
+    def views(self, start, end, pixels):
+        # (key, timestamps, values) for each series over [start, end),
+        # decimated when the range has more than two timestamps per pixel
+        decimated = self.decimatedView(start, end, pixels)
+        if decimated:
+            tsBlock, dataBlock = decimated
+            for row, key in enumerate(self.keyList):
+                yield key, tsBlock[row], dataBlock[row]
+        else:
+            tsData = self._tsBlock(start, end)
+            dataBlock = self._dataBlock(start, end)
+            for row, key in enumerate(self.keyList):
+                yield key, tsData, dataBlock[row]
+
+    def decimatedView(self, start, end, pixels):
+        # timestamps and values for each series row over [start, end) reduced
+        # to the minimum and maximum per bucket, in the order they occurred,
+        # or None when there are few enough timestamps to plot them all or
+        # the axes have no width, as when the window is minimized
+        count = end - start
+        if pixels<1 or count<=2*pixels or len(self.keyList)==0:
+            return None
+
+        # coarsest level that still has at least one bucket per pixel
+        level = int(np.log2(count/pixels))
+        bucketSize = 1 << level
+        firstBucket = start >> level
+        lastBucket = (end + bucketSize - 1) >> level
+
+        # buckets entirely before the end of the range come from the pyramid
+        # and the rest, at most the final two, are reduced from the raw data
+        self._summarize()
+        rows = len(self.keyList)
+        pyramidEnd = max(min(end >> level, self.pyramid.count(level)),
+                         firstBucket)
+        parts = []
+        if pyramidEnd > firstBucket:
+            parts.append(self.pyramid.extrema(level, firstBucket, pyramidEnd,
+                                              rows))
+        if lastBucket > pyramidEnd:
+            parts.append(self._bucketExtrema(level, pyramidEnd, end))
+        minVal, maxVal, minIdx, maxIdx = [np.concatenate(arrays, axis=1)
+                                          for arrays in zip(*parts)]
+
+        # emit whichever of the minimum and maximum came first in each bucket
+        firstIsMin = minIdx <= maxIdx
+        rows, buckets = minVal.shape
+        tsIdx = np.empty((rows, 2*buckets), dtype=np.int64)
+        dataBlock = np.empty((rows, 2*buckets))
+        tsIdx[:, 0::2] = np.where(firstIsMin, minIdx, maxIdx)
+        tsIdx[:, 1::2] = np.where(firstIsMin, maxIdx, minIdx)
+        dataBlock[:, 0::2] = np.where(firstIsMin, minVal, maxVal)
+        dataBlock[:, 1::2] = np.where(firstIsMin, maxVal, minVal)
+
+        return self._tsTake(tsIdx), dataBlock
+
+    def _bucketExtrema(self, level, firstBucket, end):
+        # minimum and maximum values and their timestamp indices per series
+        # for buckets starting at firstBucket and covering through end
+        start = firstBucket << level
+        minVal, maxVal, minOff, maxOff = \
+                bucketExtrema(self._dataBlock(start, end), level)
+
+        # convert bucket offsets to timestamp indices, keeping them within
+        # the available timestamps for a padded final bucket
+        bucketStart = start + (np.arange(minVal.shape[1]) << level)
+        minIdx = np.minimum(minOff + bucketStart, end-1)
+        maxIdx = np.minimum(maxOff + bucketStart, end-1)
+
+        return minVal, maxVal, minIdx, maxIdx
+
+    def extrema(self, start=0, end=None):
+        # minimum and maximum over all series for the timestamp index range
+        # ignoring missing samples. With no data the minimum is returned
+        # greater than the maximum, which yAxisLimits treats as no data.
+        if end is None:
+            end = self.visibleLen()
+        if end<=start or len(self.keyList)==0:
+            return sys.float_info.max, -sys.float_info.max
+
+        self._summarize()
+        summaryEnd = min(end, self.extremaTree.count)
+        ymin, ymax = self.extremaTree.query(start, summaryEnd)
+
+        # the latest timestamp may still be receiving values so it isn't
+        # summarized yet and is checked directly
+        if end > max(start, summaryEnd):
+            block = self._dataBlock(max(start, summaryEnd), end)
+            ymin = np.fmin(ymin, np.fmin.reduce(block, axis=None))
+            ymax = np.fmax(ymax, np.fmax.reduce(block, axis=None))
+
+        if np.isnan(ymin):
+            return sys.float_info.max, -sys.float_info.max
+        return float(ymin), float(ymax)
+
+    def _summarize(self):
+        # add all completed timestamps to the extrema tree and pyramid
+        rows = len(self.keyList)
+        closed = self.tsCount - 1
+        if rows==0 or closed<=self.extremaTree.count:
+            return
+
+        block = self.dataArray[:rows, self.extremaTree.count-self.ramStart:
+                                      closed-self.ramStart]
+        self.extremaTree.extend(np.fmin.reduce(block, axis=0),
+                                np.fmax.reduce(block, axis=0))
+        self.pyramid.extend(self.dataArray, self.ramStart, rows, closed)
+
+    def _tsAt(self, idx):
+        if idx >= self.ramStart:
+            return self.tsArray[idx-self.ramStart]
+        return self.archive.tsMap[idx]
+
+    def _tsTake(self, idx):
+        # timestamps for an array of timestamp indices
+        if self.ramStart == 0:
+            return self.tsArray[idx]
+        return np.where(idx >= self.ramStart,
+                        self.tsArray[np.maximum(idx-self.ramStart, 0)],
+                        self.archive.tsMap[np.minimum(idx, self.ramStart-1)])
+
+    def _tsBlock(self, start, end):
+        # timestamps for the index range from the archive and/or RAM
+        ramStart = self.ramStart
+        if start >= ramStart:
+            return self.tsArray[start-ramStart:end-ramStart]
+        if end <= ramStart:
+            return self.archive.tsMap[start:end]
+        return np.concatenate((self.archive.tsMap[start:ramStart],
+                               self.tsArray[:end-ramStart]))
+
+    def _dataBlock(self, start, end):
+        # series x timestamps values for the index range
+        rows = len(self.keyList)
+        ramStart = self.ramStart
+        if start >= ramStart:
+            return self.dataArray[:rows, start-ramStart:end-ramStart]
+        if end <= ramStart:
+            return self.archive.block(rows, start, end)
+        return np.concatenate((self.archive.block(rows, start, ramStart),
+                               self.dataArray[:rows, :end-ramStart]), axis=1)
+
+    def _searchTS(self, ts, side, count):
+        # np.searchsorted over the first count timestamps, searching only the
+        # archived or the in-RAM timestamps depending on where ts falls
+        archived = min(self.ramStart, count)
+        if archived > 0:
+            if archived==count or ts<self.tsArray[0] or \
+               (side=='left' and ts==self.tsArray[0]):
+                return int(np.searchsorted(self.archive.tsMap[:archived],
+                                           ts, side))
+        return archived + int(np.searchsorted(
+                self.tsArray[:count-archived], ts, side))
+
+    def _ramLimit(self):
+        # maximum timestamps held in RAM, None without a retention limit
+        if self.archive is None:
+            return None
+
+        limit = sys.maxsize
+        if self.retainCount is not None:
+            limit = self.retainCount
+        if self.retainBytes is not None:
+            # each timestamp held has a value and about 2 bytes of Pyramid
+            # buckets per series besides its own timestamp and extrema
+            limit = min(limit,
+                        self.retainBytes // (10*self.dataArray.shape[0]+40))
+        return max(limit, 2)
+
+    def _spill(self, limit):
+        # move the oldest summarized timestamps to the archive so about half
+        # the limit remains in RAM, reallocating RAM at the limit in case
+        # series were added since the last spill
+        self._summarize()
+        spillEnd = min(self.tsCount - limit//2, self.extremaTree.count,
+                       self.pyramid.closed())
+        if spillEnd <= self.ramStart:
+            return
+
+        rows = len(self.keyList)
+        spilled = spillEnd - self.ramStart
+        kept = self.tsCount - spillEnd
+        self.archive.append([self.dataArray[:rows, :spilled]],
+                            self.tsArray[:spilled])
+        self.extremaTree.spill(spillEnd)
+        self.pyramid.spill(rows, spillEnd)
+
+        tsArray = np.empty(max(limit, kept+1))
+        dataArray = np.full((self.dataArray.shape[0], tsArray.shape[0]),
+                            np.nan)
+        tsArray[:kept] = self.tsArray[spilled:spilled+kept]
+        dataArray[:rows, :kept] = self.dataArray[:rows, spilled:spilled+kept]
+        self.tsArray = tsArray
+        self.dataArray = dataArray
+        self.ramStart = spillEnd
+
+    def _grow(self, seriesCap, tsCap):
+        ramCount = self.tsCount - self.ramStart
+        tsArray = np.empty(tsCap)
+        tsArray[:ramCount] = self.tsArray[:ramCount]
+        dataArray = np.full((seriesCap, tsCap), np.nan)
+        rows = len(self.keyList)
+        dataArray[:rows, :ramCount] = self.dataArray[:rows, :ramCount]
+        if seriesCap != self.dataArray.shape[0]:
+            self.pyramid.grow(seriesCap)
+        self.tsArray = tsArray
+        self.dataArray = dataArray
@@ -0,0 +1,136 @@
+# ------------------------------------------------------------------------------
+# Copyright (c) 2019, Battelle Memorial Institute All rights reserved.
+# Battelle Memorial Institute (hereinafter Battelle) hereby grants permission to any person or entity
+# lawfully obtaining a copy of this software and associated documentation files (hereinafter the
+# Software) to redistribute and use the Software in source and binary forms, with or without modification.
+# Such person or entity may use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and may permit others to do so, subject to the following conditions:
+# Redistributions of source code must retain the above copyright notice, this list of conditions and the
+# following disclaimers.
+# Redistributions in binary form must reproduce the above copyright notice, this list of conditions and
+# the following disclaimer in the documentation and/or other materials provided with the distribution.
+# Other than as used herein, neither the name Battelle Memorial Institute or Battelle may be used in any
+# form whatsoever without the express written consent of Battelle.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL
+# BATTELLE OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE
+# GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED
+# AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+# General disclaimer for use with OSS licenses
+#
+# This material was prepared as an account of work sponsored by an agency of the United States Government.
+# Neither the United States Government nor the United States Department of Energy, nor Battelle, nor any
+# of their employees, nor any jurisdiction or organization that has cooperated in the development of these
+# materials, makes any warranty, express or implied, or assumes any legal liability or responsibility for
+# the accuracy, completeness, or usefulness or any information, apparatus, product, software, or process
+# disclosed, or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or service by trade name, trademark, manufacturer,
+# or otherwise does not necessarily constitute or imply its endorsement, recommendation, or favoring by the United
+# States Government or any agency thereof, or Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by BATTELLE for the
+# UNITED STATES DEPARTMENT OF ENERGY under Contract DE-AC05-76RL01830
+"""
+Startup timing and size report for the state plotter.
+
+A StartupReport records a phase for each step of startup, such as a
+metadata query, loading its response into the tables or compiling the join
+plan. Each phase has its start offset and wall time in seconds and the
+process peak resident memory when it finished, along with any sizes the
+step adds: the response payload bytes or the number of entries produced.
+Phases may be recorded from the concurrent query threads. The report prints
+as a short summary, one line per phase, and can be written out as JSON.
+
+Peak memory comes from the resource module, which isn't available on
+Windows, where it is reported as None.
+
+@author: Gary D. Black
+"""
+
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peakMemoryMB():
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return round(peak/1024, 1)
+
+
+def payloadBytes(response):
+    # size of a query response as compact JSON, close to what was received,
+    # which costs a serialized copy of the response so is only measured for
+    # the -startupreport file
+    return len(json.dumps(response, separators=(',', ':')))
+
+
+class StartupReport:
+    def __init__(self):
+        self.startTime = time.perf_counter()
+        self.phaseList = []
+        self.lock = threading.Lock()
+
+    def begin(self, name):
+        # the phase record, which the caller can add sizes to before end
+        return {'name': name, 'start': time.perf_counter() - self.startTime}
+
+    def end(self, phase):
+        phase['seconds'] = round(time.perf_counter() - self.startTime -
+                                 phase['start'], 3)
+        phase['start'] = round(phase['start'], 3)
+        phase['peakMB'] = peakMemoryMB()
+        with self.lock:
+            self.phaseList.append(phase)
+
+    @contextmanager
+    def phase(self, name):
+        phase = self.begin(name)
+        try:
+            yield phase
+        finally:
+            self.end(phase)
+
+    def totalSeconds(self):
+        return round(time.perf_counter() - self.startTime, 3)
+
+    def summary(self):
+        lineList = []
+        with self.lock:
+            for phase in sorted(self.phaseList, key=lambda p: p['start']):
+                line = phase['name'] + ': ' + str(phase['seconds']) + ' s'
+                if 'bytes' in phase:
+                    line += ', ' + str(phase['bytes']) + ' bytes'
+                if 'entries' in phase:
+                    line += ', ' + str(phase['entries']) + ' entries'
+                if phase['peakMB'] is not None:
+                    line += ', peak memory ' + str(phase['peakMB']) + ' MB'
+                lineList.append(line)
+        return lineList
+
+    def write(self, path, infoDict):
+        # infoDict holds anything else to identify the run, e.g. the model
+        with self.lock:
+            reportDict = dict(infoDict, totalSeconds=self.totalSeconds(),
+                              phases=sorted(self.phaseList,
+                                            key=lambda p: p['start']))
+        with open(path, 'w') as reportFile:
+            json.dump(reportDict, reportFile, indent=1)
@@ -50,12 +50,26 @@ __version__ = '0.3.0'
 import sys
 import json
 import math
-import pprint
-import statistics
-
-# gridappsd-python module
-from gridappsd import GridAPPSD
-from gridappsd.topics import simulation_output_topic, service_output_topic
+import queue
+import signal
+import threading
+import traceback
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# gridappsd-python module, only required to connect to GridAPPS-D so its
+# GridAPPSD class is imported when that is done and -replay and -synthetic
+# use the same topic names without it
+try:
+    from gridappsd.topics import simulation_output_topic, service_output_topic
+except ImportError:
+    def simulation_output_topic(simulation_id):
+        return '/topic/goss.gridappsd.simulation.output.' + str(simulation_id)
+
+    def service_output_topic(service_id, simulation_id):
+        return '/topic/goss.gridappsd.simulation.' + service_id + '.' + \
+               str(simulation_id) + '.output'
 
 
 # requires matplotlib 3.1.0+ for vertical sliders
@@ -67,37 +81,117 @@ from matplotlib.widgets import CheckButtons
 from matplotlib.ticker import MaxNLocator
 from matplotlib import backend_bases
 
+# vectorized normalization of plotted values
+import numpy as np
+
+# columnar time-series storage for the plotted data
+from seriesstore import SeriesStore
+# headless recording of the same data to a columnar file
+from seriesrecorder import SeriesRecorder
+# pairing of measurements with estimates by timestamp
+from joinbuffer import JoinBuffer, JoinPlanEntry, SampleBatch
+
+# model metadata tables and the cache that keeps them between runs
+from metadatatables import MetadataTables, PHASE_LIST
+from metadatacache import MetadataCache
+
+# startup phase timings and sizes
+from startupreport import StartupReport, payloadBytes
+# always-on per-stage timing histograms and throughput counters
+from hotpathstats import HotPathStats
+# Prometheus text metrics over local HTTP or in a file
+from metricsexporter import PrometheusText, MetricsPublisher, residentBytes
+
+# raw message journal and broker-free replay of one
+from messagejournal import MessageJournal, JournalingGridAPPSD
+from messagejournal import ReplayGridAPPSD
+# made-up feeders of any size in place of GridAPPS-D
+from syntheticfeeder import SyntheticGridAPPSD, DEFAULT_PHASE_MIX
+
 #DEBUG_TOTAL = 0
 #DEBUG_TOTAL_MISSING = 0
 
+# model metadata from the startup queries or the metadata cache
+metadata = MetadataTables()
+
+# startup phases recorded for the summary printed once startup is done and
+# the optional -startupreport file, along with the -dumpmetadata file the
+# full metadata mappings are written to
+startupReport = StartupReport()
+hotPath = HotPathStats()
+metricsPublisher = None
+startupReportPath = None
+metadataDumpPath = None
+
 # global dictionaries and lists
-busToMeasDict = {}
-measToBusDict = {}
-busToEstDict = {}
-estToBusDict = {}
-busToVnomMagDict = {}
-busToVnomAngDict = {}
 plotBusDict = {}
-simAllDataDict = {}
-senAllDataDict = {}
-
-measDataDict = {}
-measDataPausedDict = {}
-estDataDict = {}
-estDataPausedDict = {}
-diffMeasDataDict = {}
-diffMeasDataPausedDict = {}
-diffEstDataDict = {}
-diffEstDataPausedDict = {}
-
-tsMeasDataDict = {}
-tsMeasDataPausedDict = {}
-tsEstDataDict = {}
-tsEstDataPausedDict = {}
-tsDiffMeasDataDict = {}
-tsDiffMeasDataPausedDict = {}
-tsDiffEstDataDict = {}
-tsDiffEstDataPausedDict = {}
+
+# plotted data with one shared timestamp axis per store and a row per
+# bus,phase pair or statistic
+measStore = SeriesStore('meas')
+estStore = SeriesStore('est')
+diffMeasStore = SeriesStore('diff meas')
+diffEstStore = SeriesStore('diff est')
+
+# join plan entries by estimate (ConnectivityNode, phase), by bus,phase
+# pair and by measurement mRID, compiled after the metadata queries
+estJoinPlanDict = {}
+busJoinPlanDict = {}
+measJoinPlanDict = {}
+# nominal magnitude divisor or angle offset by join plan slot, NaN for none
+planVnomArray = np.empty(0)
+
+# -stats series computed over the normalized values for a timestamp from
+# the values, their mean and population standard deviation, in the order
+# the rows are appended. Other statistics such as percentiles or RMS only
+# need an entry here along with their plot lines.
+statsFuncDict = {
+    'Min': lambda vvals, mean, stdev: vvals.min(),
+    'Max': lambda vvals, mean, stdev: vvals.max(),
+    'Mean': lambda vvals, mean, stdev: mean,
+    'Stdev Low': lambda vvals, mean, stdev: mean - stdev,
+    'Stdev High': lambda vvals, mean, stdev: mean + stdev,
+}
+# store rows of the -stats series once created
+measStatsRows = np.empty(0, dtype=int)
+estStatsRows = np.empty(0, dtype=int)
+
+# SvEstVoltages list positions by (ConnectivityNode, phase) reused across
+# estimate messages for -match
+estPositionDict = {}
+
+# simulation and sensor measurements held until the estimate for the same
+# timestamp arrives
+measJoin = JoinBuffer()
+
+# bounded queue of (callback, dirty plots, header, message) tuples filled
+# by the gridappsd listener thread and drained on the GUI thread
+msgQueue = queue.Queue(maxsize=500)
+
+# messages arriving while the startup queries run. The listener thread
+# never blocks on this buffer, which would also keep it from delivering the
+# query responses, so when it reaches startupMsgLimit the oldest message is
+# dropped and counted instead. Once the join plan is compiled the buffer is
+# handed off to replayMsgList for the GUI thread to drain, in slices of
+# replaySliceSize messages per timer tick, ahead of msgQueue.
+startupMsgList = deque()
+startupMsgLimit = 2000
+startupDropCount = 0
+startupLock = threading.Lock()
+replayMsgList = None
+replaySliceSize = 200
+replayCount = 0
+replayPhase = None
+
+# set by the startup query thread when it finishes, with startupError set
+# when it fails
+startupDoneEvent = threading.Event()
+startupError = None
+
+# plots needing a redraw at the next frame, any of 'meas', 'est', 'diff'
+plotDirtySet = set()
+# arrival times of estimates processed since the last redraw
+renderWaitList = []
 
 measLinesDict = {}
 estLinesDict = {}
@@ -108,6 +202,7 @@ measLegendLabelList = []
 estLegendLineList = []
 estLegendLabelList = []
 plotPhaseList = []
+plotBusList = []
 
 # global variables
 gapps = None
@@ -122,6 +217,7 @@ measDiffYmin = sys.float_info.max
 plotMagFlag = True
 plotCompFlag = True
 plotStatsFlag = True
+plotConfigFlag = False
 plotSimAllFlag = False
 plotPausedFlag = False
 plotShowAllFlag = False
@@ -134,6 +230,13 @@ plotMatchesFlag = True
 printDataFlag = False
 sensorSimulatorRunningFlag = False
 useSensorsForEstimatesFlag = False
+# no plot window with -record, where the stores are replaced by the stores
+# of the recorder
+headlessFlag = False
+recorder = None
+# set once every message of a -replay journal or -synthetic feeder has
+# been delivered
+feedDoneEvent = threading.Event()
 plotNumber = 0
 
 plotFig = None
@@ -157,6 +260,19 @@ uiMeasPanSldr = None
 uiDiffAx = None
 uiDiffZoomSldr = None
 uiDiffPanSldr = None
+uiDrainTimer = None
+uiRedrawTimer = None
+uiStartupText = None
+
+# milliseconds between GUI thread checks of the message queue
+drainInterval = 100
+# seconds of message processing per check, with any messages left over
+# processed by further checks as soon as the GUI has handled its events
+drainBudget = 0.05
+# maximum number of redraws per second for each plot
+plotFrameRate = 4
+# seconds between hot path timing reports in the log, 0 for none
+timingInterval = 60
 
 #stdevBlue = 'DodgerBlue'
 #minmaxBlue = 'PaleTurquoise'
@@ -165,93 +281,57 @@ minmaxBlue = '#9be6ff'
 
 def queryBusToSim():
     sensRequestText = '{"configurationType":"CIM Dictionary","parameters":{"simulation_id":"' + simID + '"}}';
-    sensResponse = gapps.get_response('goss.gridappsd.process.request.config', sensRequestText, timeout=1200)
-
-    for feeders in sensResponse['data']['feeders']:
-        for meas in feeders['measurements']:
-            if meas['measurementType'] == 'PNV':
-                buspair = meas['ConnectivityNode'] + ',' + meas['phases']
-                buspair = buspair.upper()
-
-                if buspair in busToMeasDict:
-                    measList = busToMeasDict[buspair]
-                    measList.append(meas['mRID'])
-                    busToMeasDict[buspair] = measList
-                    for measmrid in measList:
-                        measToBusDict[measmrid] = buspair
-                else:
-                    measList = [meas['mRID']]
-                    busToMeasDict[buspair] = measList
-                    measToBusDict[meas['mRID']] = buspair
+    with startupReport.phase('measurement query') as phase:
+        sensResponse = gapps.get_response('goss.gridappsd.process.request.config', sensRequestText, timeout=1200)
+        if startupReportPath:
+            phase['bytes'] = payloadBytes(sensResponse)
 
-    print(appName + ': start bus to measurement mrid query results...', flush=True)
-    pprint.pprint(busToMeasDict)
-    print(appName + ': end bus to measurement mrid query results', flush=True)
-
-
-def mapBusToVnomMag(bus, phase, magnitude):
-    if phase == 1:
-        busToVnomMagDict[bus+',A'] = magnitude
-        busToVnomMagDict[bus+',S1'] = magnitude
-    elif phase == 2:
-        busToVnomMagDict[bus+',B'] = magnitude
-        busToVnomMagDict[bus+',S2'] = magnitude
-    elif phase == 3:
-        busToVnomMagDict[bus+',C'] = magnitude
-
-
-def mapBusToVnomAngle(bus, phase, angle):
-    if phase == 1:
-        busToVnomAngDict[bus+',A'] = angle
-        busToVnomAngDict[bus+',S1'] = angle
-    elif phase == 2:
-        busToVnomAngDict[bus+',B'] = angle
-        busToVnomAngDict[bus+',S2'] = angle
-    elif phase == 3:
-        busToVnomAngDict[bus+',C'] = angle
+    with startupReport.phase('measurement load') as phase:
+        metadata.loadMeasurements(sensResponse['data']['feeders'])
+        phase['entries'] = len(metadata.measMRIDList)
 
 
 def queryVnom():
     vnomRequestText = '{"configurationType":"Vnom Export","parameters":{"simulation_id":"' + simID + '"}}';
-    vnomResponse = gapps.get_response('goss.gridappsd.process.request.config', vnomRequestText, timeout=1200)
-
-    lineCount = 0
+    with startupReport.phase('nominal voltage query') as phase:
+        vnomResponse = gapps.get_response('goss.gridappsd.process.request.config', vnomRequestText, timeout=1200)
+        if startupReportPath:
+            phase['bytes'] = payloadBytes(vnomResponse)
 
-    if plotMagFlag:
-        for line in vnomResponse['data']['vnom']:
-            lineCount += 1
-            # skip header line
-            if lineCount == 1:
-                continue
+    # both magnitudes and angles are kept so the metadata cache serves
+    # either plot type
+    with startupReport.phase('nominal voltage load') as phase:
+        metadata.loadVnom(vnomResponse['data']['vnom'])
+        phase['entries'] = len(metadata.vnomBusArray)
 
-            vnom = line.split(',')
-            bus = vnom[0].strip('"')
 
-            mapBusToVnomMag(bus, int(vnom[2]), float(vnom[3]))
-            mapBusToVnomMag(bus, int(vnom[6]), float(vnom[7]))
-            mapBusToVnomMag(bus, int(vnom[10]), float(vnom[11]))
+def dumpMetadata(path):
+    # the metadata expanded to bus,phase pair dictionaries for diagnostics
+    dumpDict = {'modelMRID': modelMRID,
+                'busToEstDict': metadata.busToEstDict(),
+                'busToMeasDict': metadata.busToMeasDict(),
+                'busToVnomMagDict': metadata.busToVnomDict(True),
+                'busToVnomAngDict': metadata.busToVnomDict(False)}
 
-        print(appName + ': start bus,phase to vnom magnitude mapping...', flush=True)
-        pprint.pprint(busToVnomMagDict)
-        print(appName + ': end bus,phase to vnom magnitude mapping', flush=True)
+    with open(path, 'w') as dumpFile:
+        json.dump(dumpDict, dumpFile, indent=1)
 
-    else:
-        for line in vnomResponse['data']['vnom']:
-            lineCount += 1
-            # skip header line
-            if lineCount == 1:
-                continue
+    print(appName + ': wrote metadata mappings to ' + path, flush=True)
 
-            vnom = line.split(',')
-            bus = vnom[0].strip('"')
 
-            mapBusToVnomAngle(bus, int(vnom[2]), float(vnom[4]))
-            mapBusToVnomAngle(bus, int(vnom[6]), float(vnom[8]))
-            mapBusToVnomAngle(bus, int(vnom[10]), float(vnom[12]))
+def reportStartup():
+    # compact summary of where startup time went
+    for line in startupReport.summary():
+        print(appName + ': startup ' + line, flush=True)
+    print(appName + ': startup total: ' + str(startupReport.totalSeconds()) + ' s', flush=True)
 
-        print(appName + ': start bus,phase to vnom angle mapping...', flush=True)
-        pprint.pprint(busToVnomAngDict)
-        print(appName + ': end bus,phase to vnom angle mapping', flush=True)
+    if startupReportPath:
+        try:
+            startupReport.write(startupReportPath,
+                                {'modelMRID': modelMRID, 'simID': simID,
+                                 'metadata': metadata.counts()})
+        except OSError as e:
+            print(appName + ': WARNING: unable to write startup report: ' + str(e), flush=True)
 
 
 def vmagPrintWithMeas(ts, buspair, estvmag, measvmag, vmagdiff):
@@ -299,23 +379,139 @@ def vangPrintWithoutMeas(ts, buspair, estvang):
         print(appName + ', NO SIM MATCH, ts: ' + str(ts) + ', buspair: ' + buspair + ', estvang: ' + str(estvang), flush=True)
 
 
-def calcBusVNom(vval, buspair):
+def normalizeVNom(vvals, vnoms):
+    # divide magnitudes by nominal values or offset angles by nominal angles
+    # over arrays of values, where a NaN vnom leaves the value as is
+    noVnom = np.isnan(vnoms)
     if plotMagFlag:
-        if plotCompFlag and buspair in busToVnomMagDict:
-            return vval / busToVnomMagDict[buspair]
-    else:
-        if plotCompFlag and buspair in busToVnomAngDict:
-            vval -= busToVnomAngDict[buspair]
-            # -165 <= vval <= 195.0
-            while vval > 195.0:
-                vval -= 360.0
-            while vval < -165.0:
-                vval += 360.0
+        return np.where(noVnom, vvals, vvals / np.where(noVnom, 1.0, vnoms))
+
+    vvals = vvals - np.where(noVnom, 0.0, vnoms)
+    # -165 <= vval <= 195.0, shifting by the needed number of turns at once
+    turns = np.where(vvals > 195.0, -np.ceil((vvals - 195.0)/360.0),
+                     np.where(vvals < -165.0, np.ceil((-165.0 - vvals)/360.0),
+                              0.0))
+    return np.where(noVnom, vvals, vvals + 360.0*turns)
+
+
+def diffValues(vvals, simvvals):
+    # angle differences or absolute percent magnitude differences from the
+    # simulation values, with a zero simulation magnitude giving zero
+    if not plotMagFlag:
+        return vvals - simvvals
+
+    zeroSim = simvvals == 0.0
+    return np.where(zeroSim, 0.0,
+                    np.abs(100.0*(vvals - simvvals) /
+                           np.where(zeroSim, 1.0, simvvals)))
+
+
+def simValue(simDataTS, measmrid, measkey):
+    # simulation value for the measurement mRID or NaN if there isn't one
+    if simDataTS:
+        sim = simDataTS.get(measmrid)
+        if sim and measkey in sim:
+            return sim[measkey]
+
+    return math.nan
 
-    return vval
+
+def normalizeBatch(batch):
+    # normalized values, measurement values and simulation values for a
+    # batch along with the value differences from simulation, each computed
+    # in a single pass over the batch
+    vnoms = planVnomArray[[entry.slot for entry in batch.entryList]]
+    vvals = normalizeVNom(np.array(batch.valueList, dtype=float), vnoms)
+    measvvals = normalizeVNom(np.array(batch.measList, dtype=float), vnoms)
+    simvvals = normalizeVNom(np.array(batch.simList, dtype=float), vnoms)
+
+    return vvals, measvvals, simvvals, diffValues(vvals, simvvals)
+
+
+def appendMeasBatch(ts, batch, measFlag):
+    # append normalized measurement values, when measFlag is set, and their
+    # differences from simulation values for one timestamp, returning the
+    # values and the differences for those with simulation values
+    start = time.perf_counter()
+    vvals, measvvals, simvvals, diffvvals = normalizeBatch(batch)
+    simMask = ~np.isnan(simvvals)
+
+    if measFlag:
+        measStore.appendColumn(ts - tsInit,
+                               [entry.measRow for entry in batch.entryList],
+                               vvals)
+
+    if not plotOverlayFlag:
+        diffRows = np.array([entry.diffMeasRow for entry in batch.entryList],
+                            dtype=int)
+        diffMask = simMask & (diffRows >= 0)
+        diffMeasStore.appendColumn(ts - tsInit, diffRows[diffMask],
+                                   diffvvals[diffMask])
+
+    hotPath.record('append', start)
+    hotPath.count('pairs', len(batch))
+
+    return vvals, diffvvals[simMask]
+
+
+def appendEstBatch(ts, batch):
+    # append normalized estimate values and their differences from
+    # simulation values for one timestamp, returning the values for those
+    # matching a measurement and the differences for those with simulation
+    # values
+    start = time.perf_counter()
+    estvvals, measvvals, simvvals, diffvvals = normalizeBatch(batch)
+    measMask = ~np.isnan(measvvals)
+    simMask = ~np.isnan(simvvals)
+
+    if not plotStatsFlag:
+        rows = np.array([entry.estRow for entry in batch.entryList], dtype=int)
+        appendMask = np.array(batch.appendList, dtype=bool)
+        estStore.appendColumn(ts - tsInit, rows[appendMask],
+                              estvvals[appendMask])
+
+        if not plotOverlayFlag:
+            diffRows = np.array([entry.diffEstRow
+                                 for entry in batch.entryList], dtype=int)
+            diffMask = simMask & (diffRows >= 0)
+            diffEstStore.appendColumn(ts - tsInit, diffRows[diffMask],
+                                      diffvvals[diffMask])
+
+    hotPath.record('append', start)
+    hotPath.count('pairs', len(batch))
+
+    if printDataFlag:
+        for ix, entry in enumerate(batch.entryList):
+            if simMask[ix]:
+                if plotMagFlag:
+                    vmagPrintWithMeas(ts, entry.buspair, estvvals[ix], measvvals[ix], diffvvals[ix])
+                else:
+                    vangPrintWithMeas(ts, entry.buspair, estvvals[ix], measvvals[ix], diffvvals[ix])
+            else:
+                if plotMagFlag:
+                    vmagPrintWithoutMeas(ts, entry.buspair, estvvals[ix])
+                else:
+                    vangPrintWithoutMeas(ts, entry.buspair, estvvals[ix])
+
+    return estvvals[measMask], diffvvals[simMask]
+
+
+def aggregateStats(vvals):
+    # statsFuncDict values for a timestamp in a single pass over the array
+    start = time.perf_counter()
+    mean = vvals.mean()
+    stdev = np.sqrt(np.mean(np.square(vvals - mean)))
+
+    statsArray = np.array([func(vvals, mean, stdev)
+                           for func in statsFuncDict.values()])
+    hotPath.record('stats', start)
+    return statsArray
 
 
 def setTSZoomSliderVals(pairCount):
+    if headlessFlag:
+        return
+
     # scale based on cube root of number of node/phase pairs
     # The multiplier is just a magic scaling factor that seems to produce
     # reasonable values for the 3 models used as test cases
@@ -336,38 +532,21 @@ def setTSZoomSliderVals(pairCount):
 
 
 def findMeasTS(ts):
-    # to account for state estimator work queue draining design, iterate over
-    # simulation and sensor dictionaries and toss all measurements until we
-    # reach the current timestamp since they won't be referenced again and
-    # will just drain memory
-    simDataTS = None
-    for tskey in list(simAllDataDict):
-        if tskey < ts:
-            del simAllDataDict[tskey]
-        elif tskey == ts:
-            simDataTS = simAllDataDict[tskey]
-            break
-        else:
-            break
+    # to account for state estimator work queue draining design, the join
+    # buffer tosses all measurements before the current timestamp since they
+    # won't be referenced again and will just drain memory
+    start = time.perf_counter()
+    simDataTS, senDataTS = measJoin.matchEstimate(ts,
+                                                  sensorSimulatorRunningFlag)
+    hotPath.record('join', start)
 
     if not simDataTS:
         print(appName + ': NOTE: No simulation measurement for timestamp: ' + str(ts) + ', disregarding estimate', flush=True)
         return None, None
 
-    senDataTS = None
-    if sensorSimulatorRunningFlag:
-        for tskey in list(senAllDataDict):
-            if tskey < ts:
-                del senAllDataDict[tskey]
-            elif tskey == ts:
-                senDataTS = senAllDataDict[tskey]
-                break
-            else:
-                break
-
-        if not senDataTS:
-            print(appName + ': NOTE: No sensor measurement for timestamp: ' + str(ts) + ', disregarding estimate', flush=True)
-            return None, None
+    if sensorSimulatorRunningFlag and not senDataTS:
+        print(appName + ': NOTE: No sensor measurement for timestamp: ' + str(ts) + ', disregarding estimate', flush=True)
+        return None, None
 
     # determine whether simulation or sensor data should be used for
     # the second plot
@@ -379,89 +558,74 @@ def findMeasTS(ts):
     return measDataTS, simDataTS
 
 
-def findSimTS(ts):
-    simDataTS = None
-    if ts in simAllDataDict:
-        simDataTS = simAllDataDict[ts]
+def indexEstimates(estVolt):
+    # position of the first SvEstVoltages item for each (ConnectivityNode,
+    # phase) pair
+    estPositionDict.clear()
+    for pos, item in enumerate(estVolt):
+        estPositionDict.setdefault((item['ConnectivityNode'],
+                                    item['phase'].upper()), pos)
+
+
+def estimateLookup(estVolt):
+    # returns a function giving the SvEstVoltages item for a (ConnectivityNode,
+    # phase) pair or None. Positions from earlier messages are reused as long
+    # as the item found there still matches, since the state estimator
+    # normally sends items in the same order, and the positions are rebuilt
+    # at most once per message when it doesn't.
+    rebuiltFlag = False
+
+    def lookup(cnid, phase):
+        nonlocal rebuiltFlag
+        pos = estPositionDict.get((cnid, phase))
+        if pos is not None and pos < len(estVolt):
+            item = estVolt[pos]
+            if item['ConnectivityNode']==cnid and item['phase'].upper()==phase:
+                return item
+
+        if rebuiltFlag:
+            return None
+
+        rebuiltFlag = True
+        indexEstimates(estVolt)
+        pos = estPositionDict.get((cnid, phase))
+        return estVolt[pos] if pos is not None else None
 
-    return simDataTS
+    return lookup
 
 
-def estimateConfigAppend(ts, buspair, item, estkey, measkey,
+def matchMeasurement(entry, measkey, measDataTS, simDataTS):
+    # measurement and simulation values for the first of the entry's
+    # measurement mRIDs present in the measurement data, NaN for each that
+    # isn't there
+    for measmrid in entry.measMRIDList:
+        meas = measDataTS.get(measmrid)
+        if meas and measkey in meas:
+            return meas[measkey], simValue(simDataTS, measmrid, measkey)
+
+    return math.nan, math.nan
+
+
+def estimateConfigAppend(batch, entry, item, estkey, measkey,
                          foundSet, foundDiffSet, measDataTS, simDataTS):
     # for estimates, there should never be more than a single match
     # for a given bus,phase pair so skip check for that
+    buspair = entry.buspair
     foundSet.add(buspair)
 
-    estvval = item[estkey]
-    estvval = calcBusVNom(estvval, buspair)
-
     #print(appName + ': estimate bus,phase pair: ' + buspair, flush=True)
-    #print(appName + ': timestamp: ' + str(ts), flush=True)
-    #print(appName + ': estvval: ' + str(estvval), flush=True)
-
-    measvval = None
-    if not plotMatchesFlag:
-        if plotPausedFlag:
-            estDataPausedDict[buspair].append(estvval)
-            tsEstDataPausedDict[buspair].append(ts - tsInit)
-        else:
-            estDataDict[buspair].append(estvval)
-            tsEstDataDict[buspair].append(ts - tsInit)
+    #print(appName + ': estvval: ' + str(item[estkey]), flush=True)
 
-    if measDataTS is not None and buspair in busToMeasDict:
-        for measmrid in busToMeasDict[buspair]:
-            if buspair in foundDiffSet:
-                break
+    measvval = simvval = math.nan
+    if measDataTS is not None and buspair not in foundDiffSet:
+        measvval, simvval = matchMeasurement(entry, measkey,
+                                             measDataTS, simDataTS)
+        if not math.isnan(measvval):
+            foundDiffSet.add(buspair)
 
-            if measmrid in measDataTS:
-                meas = measDataTS[measmrid]
-                if measkey in meas:
-                    foundDiffSet.add(buspair)
-
-                    if plotMatchesFlag:
-                        if plotPausedFlag:
-                            estDataPausedDict[buspair].append(estvval)
-                            tsEstDataPausedDict[buspair].append(ts - tsInit)
-                        else:
-                            estDataDict[buspair].append(estvval)
-                            tsEstDataDict[buspair].append(ts - tsInit)
-
-                    if measmrid in simDataTS:
-                        sim = simDataTS[measmrid]
-                        if measkey in sim:
-                            simvval = sim[measkey]
-                            simvval = calcBusVNom(simvval, buspair)
-
-                            if not plotMagFlag:
-                                diffestvval = estvval - simvval
-                            elif simvval != 0.0:
-                                diffestvval = abs(100.0*(estvval - simvval)/simvval)
-                            else:
-                                diffestvval = 0.0
-
-                            if not plotOverlayFlag:
-                                if plotPausedFlag:
-                                    diffEstDataPausedDict[buspair+' Est'].append(diffestvval)
-                                    tsDiffEstDataPausedDict[buspair+' Est'].append(ts - tsInit)
-                                else:
-                                    diffEstDataDict[buspair+' Est'].append(diffestvval)
-                                    tsDiffEstDataDict[buspair+' Est'].append(ts - tsInit)
-
-                            measvval = meas[measkey]
-                            measvval = calcBusVNom(measvval, buspair)
-
-                            if plotMagFlag:
-                                vmagPrintWithMeas(ts, buspair, estvval, measvval, diffestvval)
-                            else:
-                                vangPrintWithMeas(ts, buspair, estvval, measvval, diffestvval)
-                            break
-
-    if not measvval:
-        if plotMagFlag:
-            vmagPrintWithoutMeas(ts, buspair, estvval)
-        else:
-            vangPrintWithoutMeas(ts, buspair, estvval)
+    # with -match only estimates having a measurement are plotted
+    batch.add(entry, item[estkey], measvval, simvval,
+              not plotMatchesFlag or buspair in foundDiffSet)
 
     # no reason to keep checking more pairs if we've found all we
     # are looking for
@@ -474,8 +638,8 @@ def estimateConfigAppend(ts, buspair, item, estkey, measkey,
 
 
 def estimateConfigCallback(header, message):
-    // GDB 7/17/26: Ignore, but don't crash on status messages, which I don't
-    // need because I get this from simulation log messages
+    # GDB 7/17/26: Ignore, but don't crash on status messages, which I don't
+    # need because I get this from simulation log messages
     if 'processStatus' in message:
         return
 
@@ -491,6 +655,7 @@ def estimateConfigCallback(header, message):
 
     foundSet = set()
     foundDiffSet = set()
+    batch = SampleBatch()
 
     # set the data element keys we want to extract
     if plotMagFlag:
@@ -501,166 +666,101 @@ def estimateConfigCallback(header, message):
         measkey = 'angle'
 
     if plotMatchesFlag:
-        for buspair in measDataDict:
+        estLookup = estimateLookup(estVolt)
+        for buspair in measStore:
             if buspair in plotBusDict:
-                bus, phase = buspair.split(',')
-                #if phase!='A' and phase!='B' and phase!='C' or \
-                #   len(plotPhaseList)>0 and phase not in plotPhaseList:
-                if len(plotPhaseList)>0 and phase not in plotPhaseList:
+                entry = busJoinPlanDict.get(buspair)
+                # only consider user-specified phases
+                if not entry or not entry.plotFlag:
                     continue
 
-                cnid = busToEstDict[bus]
-                estlist = list(filter(lambda x:x['ConnectivityNode']==cnid and x['phase'].upper()==phase, estVolt))
-                if (len(estlist) == 0):
+                item = estLookup(entry.cnid, entry.phase)
+                if not item:
                     continue
 
-                item = estlist[0]
-                if estimateConfigAppend(ts, buspair, item, estkey, measkey,
+                if estimateConfigAppend(batch, entry, item, estkey, measkey,
                                  foundSet, foundDiffSet, measDataTS, simDataTS):
                     break
 
     else:
         for item in estVolt:
-            # only consider phases A, B, C and user-specified phases
-            phase = item['phase']
-            #if phase!='A' and phase!='B' and phase!='C' or \
-            #   len(plotPhaseList)>0 and phase not in plotPhaseList:
-            if len(plotPhaseList)>0 and phase not in plotPhaseList:
+            entry = estJoinPlanDict.get((item['ConnectivityNode'],
+                                         item['phase']))
+            # only consider user-specified phases
+            if not entry or not entry.plotFlag:
                 continue
 
-            buspair = estToBusDict[item['ConnectivityNode']+','+phase]
-            if buspair in plotBusDict:
-                if estimateConfigAppend(ts, buspair, item, estkey, measkey,
+            if entry.buspair in plotBusDict:
+                if estimateConfigAppend(batch, entry, item, estkey, measkey,
                                  foundSet, foundDiffSet, measDataTS, simDataTS):
                     break
 
-    #print(appName + ': ' + str(len(estVolt)) + ' state-estimator measurements, ' + str(len(foundSet)) + ' configuration file node,phase pair matches, ' + str(len(foundDiffSet)) + ' matches to measurement data', flush=True)
+    appendEstBatch(ts, batch)
 
-    # update plots with the new data
-    plotEstimateData()
+    #print(appName + ': ' + str(len(estVolt)) + ' state-estimator measurements, ' + str(len(foundSet)) + ' configuration file node,phase pair matches, ' + str(len(foundDiffSet)) + ' matches to measurement data', flush=True)
 
 
-def estimateNoConfigAppend(ts, buspair, item, estkey, measkey,
+def estimateNoConfigAppend(batch, entry, item, estkey, measkey,
                            foundSet, foundDiffSet, measDataTS, simDataTS):
     # for estimates, there should never be more than a single match
     # for a given bus,phase pair so skip check for that
+    buspair = entry.buspair
     foundSet.add(buspair)
 
-    estvval = item[estkey]
-    estvval = calcBusVNom(estvval, buspair)
-
     #print(appName + ': estimate bus,phase pair: ' + buspair, flush=True)
-    #print(appName + ': timestamp: ' + str(ts), flush=True)
-    #print(appName + ': estvval: ' + str(estvval), flush=True)
+    #print(appName + ': estvval: ' + str(item[estkey]), flush=True)
 
     # do dictionary and plot lines initialization the first time
     # the buspair is encountered
-    if buspair not in estDataDict:
-        estDataDict[buspair] = []
-        tsEstDataDict[buspair] = []
-        estDataPausedDict[buspair] = []
-        tsEstDataPausedDict[buspair] = []
+    if entry.estRow < 0:
+        entry.estRow = estStore.addSeries(buspair)
         if not plotOverlayFlag:
-            diffEstDataDict[buspair+' Est'] = []
-            tsDiffEstDataDict[buspair+' Est'] = []
-            diffEstDataPausedDict[buspair+' Est'] = []
-            tsDiffEstDataPausedDict[buspair+' Est'] = []
+            entry.diffEstRow = diffEstStore.addSeries(buspair+' Est')
 
         # create a lines dictionary entry per bus,phase pair for each plot
-        if plotOverlayFlag:
-            if buspair in measLinesDict:
-                color = measLinesDict[buspair].get_color()
-                estLinesDict[buspair], = uiEstAx.plot([], [], label=buspair, linestyle='dashed', color=color)
-            else:
-                estLinesDict[buspair], = uiEstAx.plot([], [], label=buspair, linestyle='dashed')
+        if not headlessFlag:
+            if plotOverlayFlag:
+                if buspair in measLinesDict:
+                    color = measLinesDict[buspair].get_color()
+                    estLinesDict[buspair], = uiEstAx.plot([], [], label=buspair, linestyle='dashed', color=color)
+                else:
+                    estLinesDict[buspair], = uiEstAx.plot([], [], label=buspair, linestyle='dashed')
 
-            if buspair+' Actual' in diffMeasLinesDict:
-                color = diffMeasLinesDict[buspair+' Actual'].get_color()
-                diffEstLinesDict[buspair+' Est'], = uiDiffAx.plot([], [], label=buspair+' Est.', linestyle='dashed', color=color)
-            else:
-                color = estLinesDict[buspair].get_color()
-                diffEstLinesDict[buspair+' Est'], = uiDiffAx.plot([], [], label=buspair+' Est.', color=color)
+                if buspair+' Actual' in diffMeasLinesDict:
+                    color = diffMeasLinesDict[buspair+' Actual'].get_color()
+                    diffEstLinesDict[buspair+' Est'], = uiDiffAx.plot([], [], label=buspair+' Est.', linestyle='dashed', color=color)
+                else:
+                    color = estLinesDict[buspair].get_color()
+                    diffEstLinesDict[buspair+' Est'], = uiDiffAx.plot([], [], label=buspair+' Est.', color=color)
 
-        else:
-            if buspair in measLinesDict:
-                color = measLinesDict[buspair].get_color()
-                estLinesDict[buspair], = uiEstAx.plot([], [], label=buspair, color=color)
             else:
-                estLinesDict[buspair], = uiEstAx.plot([], [], label=buspair)
-
-            linestyle = 'solid'
-            if sensorSimulatorRunningFlag:
-                linestyle = 'dashed'
+                if buspair in measLinesDict:
+                    color = measLinesDict[buspair].get_color()
+                    estLinesDict[buspair], = uiEstAx.plot([], [], label=buspair, color=color)
+                else:
+                    estLinesDict[buspair], = uiEstAx.plot([], [], label=buspair)
 
-            if buspair+' Meas' in diffMeasLinesDict:
-                color = diffMeasLinesDict[buspair+' Meas'].get_color()
-                diffEstLinesDict[buspair+' Est'], = uiDiffAx.plot([], [], label=buspair+' Est.', linestyle=linestyle, color=color)
-            else:
-                color = estLinesDict[buspair].get_color()
-                diffEstLinesDict[buspair+' Est'], = uiDiffAx.plot([], [], label=buspair+' Est.', color=color)
+                linestyle = 'solid'
+                if sensorSimulatorRunningFlag:
+                    linestyle = 'dashed'
 
-    measvval = None
-    if not plotMatchesFlag:
-        if plotPausedFlag:
-            estDataPausedDict[buspair].append(estvval)
-            tsEstDataPausedDict[buspair].append(ts - tsInit)
-        else:
-            estDataDict[buspair].append(estvval)
-            tsEstDataDict[buspair].append(ts - tsInit)
+                if buspair+' Meas' in diffMeasLinesDict:
+                    color = diffMeasLinesDict[buspair+' Meas'].get_color()
+                    diffEstLinesDict[buspair+' Est'], = uiDiffAx.plot([], [], label=buspair+' Est.', linestyle=linestyle, color=color)
+                else:
+                    color = estLinesDict[buspair].get_color()
+                    diffEstLinesDict[buspair+' Est'], = uiDiffAx.plot([], [], label=buspair+' Est.', color=color)
 
-    if measDataTS is not None and buspair in busToMeasDict:
-        for measmrid in busToMeasDict[buspair]:
-            if buspair in foundDiffSet:
-                break
+    measvval = simvval = math.nan
+    if measDataTS is not None and buspair not in foundDiffSet:
+        measvval, simvval = matchMeasurement(entry, measkey,
+                                             measDataTS, simDataTS)
+        if not math.isnan(measvval):
+            foundDiffSet.add(buspair)
 
-            if measmrid in measDataTS:
-                meas = measDataTS[measmrid]
-                if measkey in meas:
-                    foundDiffSet.add(buspair)
-
-                    if plotMatchesFlag:
-                        if plotPausedFlag:
-                            estDataPausedDict[buspair].append(estvval)
-                            tsEstDataPausedDict[buspair].append(ts - tsInit)
-                        else:
-                            estDataDict[buspair].append(estvval)
-                            tsEstDataDict[buspair].append(ts - tsInit)
-
-                    if measmrid in simDataTS:
-                        sim = simDataTS[measmrid]
-                        if measkey in sim:
-                            simvval = sim[measkey]
-                            simvval = calcBusVNom(simvval, buspair)
-
-                            if not plotMagFlag:
-                                diffestvval = estvval - simvval
-                            elif simvval != 0.0:
-                                diffestvval = abs(100.0*(estvval - simvval)/simvval)
-                            else:
-                                diffestvval = 0.0
-
-                            if not plotOverlayFlag:
-                                if plotPausedFlag:
-                                    diffEstDataPausedDict[buspair+' Est'].append(diffestvval)
-                                    tsDiffEstDataPausedDict[buspair+' Est'].append(ts - tsInit)
-                                else:
-                                    diffEstDataDict[buspair+' Est'].append(diffestvval)
-                                    tsDiffEstDataDict[buspair+' Est'].append(ts - tsInit)
-
-                            measvval = meas[measkey]
-                            measvval = calcBusVNom(measvval, buspair)
-
-                            if plotMagFlag:
-                                vmagPrintWithMeas(ts, buspair, estvval, measvval, diffestvval)
-                            else:
-                                vangPrintWithMeas(ts, buspair, estvval, measvval, diffestvval)
-                            break
-
-    if not measvval:
-        if plotMagFlag:
-            vmagPrintWithoutMeas(ts, buspair, estvval)
-        else:
-            vangPrintWithoutMeas(ts, buspair, estvval)
+    # with -match only estimates having a measurement are plotted
+    batch.add(entry, item[estkey], measvval, simvval,
+              not plotMatchesFlag or buspair in foundDiffSet)
 
     # no reason to keep checking more pairs if we've found all we
     # are looking for
@@ -673,8 +773,8 @@ def estimateNoConfigAppend(ts, buspair, item, estkey, measkey,
 
 
 def estimateNoConfigCallback(header, message):
-    // GDB 7/17/26: Ignore, but don't crash on status messages, which I don't
-    // need because I get this from simulation log messages
+    # GDB 7/17/26: Ignore, but don't crash on status messages, which I don't
+    # need because I get this from simulation log messages
     if 'processStatus' in message:
         return
 
@@ -690,6 +790,7 @@ def estimateNoConfigCallback(header, message):
 
     foundSet = set()
     foundDiffSet = set()
+    batch = SampleBatch()
 
     # set the data element keys we want to extract
     if plotMagFlag:
@@ -700,51 +801,46 @@ def estimateNoConfigCallback(header, message):
         measkey = 'angle'
 
     if plotMatchesFlag:
-        for buspair in measDataDict:
-            bus, phase = buspair.split(',')
-            #if phase!='A' and phase!='B' and phase!='C' or \
-            #   len(plotPhaseList)>0 and phase not in plotPhaseList:
-            if len(plotPhaseList)>0 and phase not in plotPhaseList:
+        estLookup = estimateLookup(estVolt)
+        for buspair in measStore:
+            entry = busJoinPlanDict.get(buspair)
+            # only consider user-specified phases
+            if not entry or not entry.plotFlag:
                 continue
 
-            cnid = busToEstDict[bus]
-            estlist = list(filter(lambda x:x['ConnectivityNode']==cnid and x['phase'].upper()==phase, estVolt))
-            if (len(estlist) == 0):
+            item = estLookup(entry.cnid, entry.phase)
+            if not item:
                 continue
 
-            item = estlist[0]
-            if estimateNoConfigAppend(ts, buspair, item, estkey, measkey,
+            if estimateNoConfigAppend(batch, entry, item, estkey, measkey,
                                  foundSet, foundDiffSet, measDataTS, simDataTS):
                 break
 
     else:
         for item in estVolt:
-            # only consider phases A, B, C and user-specified phases
-            phase = item['phase']
-            #if phase!='A' and phase!='B' and phase!='C' or \
-            #   len(plotPhaseList)>0 and phase not in plotPhaseList:
-            if len(plotPhaseList)>0 and phase not in plotPhaseList:
+            entry = estJoinPlanDict.get((item['ConnectivityNode'],
+                                         item['phase']))
+            # only consider user-specified phases
+            if not entry or not entry.plotFlag:
                 continue
 
-            buspair = estToBusDict[item['ConnectivityNode']+','+phase]
-            if estimateNoConfigAppend(ts, buspair, item, estkey, measkey,
+            if estimateNoConfigAppend(batch, entry, item, estkey, measkey,
                                  foundSet, foundDiffSet, measDataTS, simDataTS):
                 break
 
+    appendEstBatch(ts, batch)
+
     #if plotNumber > 0:
     #    print(appName + ': ' + str(len(estVolt)) + ' state-estimator measurements, ' + str(len(foundSet)) + ' node,phase pair matches (matching first ' + str(plotNumber) + '), ' + str(len(foundDiffSet)) + ' matches to measurement data', flush=True)
     #else:
     #    print(appName + ': ' + str(len(estVolt)) + ' state-estimator measurements, ' + str(len(foundSet)) + ' node,phase pair matches (matching all), ' + str(len(foundDiffSet)) + ' matches to measurement data', flush=True)
 
-    # update plots with the new data
-    plotEstimateData()
-
 
 def estimateStatsCallback(header, message):
-    global firstEstimatePassFlag
+    global firstEstimatePassFlag, estStatsRows
 
-    // GDB 7/17/26: Ignore, but don't crash on status messages, which I don't
-    // need because I get this from simulation log messages
+    # GDB 7/17/26: Ignore, but don't crash on status messages, which I don't
+    # need because I get this from simulation log messages
     if 'processStatus' in message:
         return
 
@@ -759,61 +855,40 @@ def estimateStatsCallback(header, message):
     if firstEstimatePassFlag:
         firstEstimatePassFlag = False
 
-        estDataDict['Min'] = []
-        tsEstDataDict['Min'] = []
-        estDataDict['Max'] = []
-        tsEstDataDict['Max'] = []
-        estDataDict['Mean'] = []
-        tsEstDataDict['Mean'] = []
-        estDataDict['Stdev Low'] = []
-        tsEstDataDict['Stdev Low'] = []
-        estDataDict['Stdev High'] = []
-        tsEstDataDict['Stdev High'] = []
-        estDataPausedDict['Min'] = []
-        tsEstDataPausedDict['Min'] = []
-        estDataPausedDict['Max'] = []
-        tsEstDataPausedDict['Max'] = []
-        estDataPausedDict['Mean'] = []
-        tsEstDataPausedDict['Mean'] = []
-        estDataPausedDict['Stdev Low'] = []
-        tsEstDataPausedDict['Stdev Low'] = []
-        estDataPausedDict['Stdev High'] = []
-        tsEstDataPausedDict['Stdev High'] = []
-
-        # create a lines dictionary entry for each plot line
-        if plotOverlayFlag:
-            estLinesDict['Min'], = uiEstAx.plot([], [], label='Minimum', linestyle='dashed', color='cyan')
-            estLinesDict['Max'], = uiEstAx.plot([], [], label='Maximum', linestyle='dashed', color='cyan')
-            estLinesDict['Stdev Low'], = uiEstAx.plot([], [], label='Std. Dev. Low', linestyle='dashed', color='blue')
-            estLinesDict['Stdev High'], = uiEstAx.plot([], [], label='Std. Dev. High', linestyle='dashed', color='blue')
-            estLinesDict['Mean'], = uiEstAx.plot([], [], label='Mean', linestyle='dashed', color='red')
-
-            diffEstLinesDict['Min Est'], = uiDiffAx.plot([], [], label='Minimum Est.', linestyle='dashed', color='cyan')
-            diffEstLinesDict['Max Est'], = uiDiffAx.plot([], [], label='Maximum Est.', linestyle='dashed', color='cyan')
-            diffEstLinesDict['Stdev Low Est'], = uiDiffAx.plot([], [], label='Std. Dev. Low Est.', linestyle='dashed', color='blue')
-            diffEstLinesDict['Stdev High Est'], = uiDiffAx.plot([], [], label='Std. Dev. High Est.', linestyle='dashed', color='blue')
-            diffEstLinesDict['Mean Est'], = uiDiffAx.plot([], [], label='Mean Est.', linestyle='dashed', color='red')
+        estStatsRows = np.array([estStore.addSeries(stat)
+                                 for stat in statsFuncDict], dtype=int)
 
-        else:
-            estLinesDict['Min'], = uiEstAx.plot([], [], label='Minimum', color='cyan')
-            estLinesDict['Max'], = uiEstAx.plot([], [], label='Maximum', color='cyan')
-            estLinesDict['Stdev Low'], = uiEstAx.plot([], [], label='Std. Dev. Low', color='blue')
-            estLinesDict['Stdev High'], = uiEstAx.plot([], [], label='Std. Dev. High', color='blue')
-            estLinesDict['Mean'], = uiEstAx.plot([], [], label='Mean', color='red')
+        if not plotOverlayFlag:
+            diffEstStore.addSeries('Mean Est')
 
-            diffEstDataDict['Mean Est'] = []
-            tsDiffEstDataDict['Mean Est'] = []
-            diffEstDataPausedDict['Mean Est'] = []
-            tsDiffEstDataPausedDict['Mean Est'] = []
+        # create a lines dictionary entry for each plot line
+        if not headlessFlag:
+            if plotOverlayFlag:
+                estLinesDict['Min'], = uiEstAx.plot([], [], label='Minimum', linestyle='dashed', color='cyan')
+                estLinesDict['Max'], = uiEstAx.plot([], [], label='Maximum', linestyle='dashed', color='cyan')
+                estLinesDict['Stdev Low'], = uiEstAx.plot([], [], label='Std. Dev. Low', linestyle='dashed', color='blue')
+                estLinesDict['Stdev High'], = uiEstAx.plot([], [], label='Std. Dev. High', linestyle='dashed', color='blue')
+                estLinesDict['Mean'], = uiEstAx.plot([], [], label='Mean', linestyle='dashed', color='red')
+
+                diffEstLinesDict['Min Est'], = uiDiffAx.plot([], [], label='Minimum Est.', linestyle='dashed', color='cyan')
+                diffEstLinesDict['Max Est'], = uiDiffAx.plot([], [], label='Maximum Est.', linestyle='dashed', color='cyan')
+                diffEstLinesDict['Stdev Low Est'], = uiDiffAx.plot([], [], label='Std. Dev. Low Est.', linestyle='dashed', color='blue')
+                diffEstLinesDict['Stdev High Est'], = uiDiffAx.plot([], [], label='Std. Dev. High Est.', linestyle='dashed', color='blue')
+                diffEstLinesDict['Mean Est'], = uiDiffAx.plot([], [], label='Mean Est.', linestyle='dashed', color='red')
 
-            # hardwire color to magenta specifically for this plot
-            diffEstLinesDict['Mean Est'], = uiDiffAx.plot([], [], label='Mean Estimate Error', color='magenta')
+            else:
+                estLinesDict['Min'], = uiEstAx.plot([], [], label='Minimum', color='cyan')
+                estLinesDict['Max'], = uiEstAx.plot([], [], label='Maximum', color='cyan')
+                estLinesDict['Stdev Low'], = uiEstAx.plot([], [], label='Std. Dev. Low', color='blue')
+                estLinesDict['Stdev High'], = uiEstAx.plot([], [], label='Std. Dev. High', color='blue')
+                estLinesDict['Mean'], = uiEstAx.plot([], [], label='Mean', color='red')
 
-    estlist = []
-    diffestlist = []
+                # hardwire color to magenta specifically for this plot
+                diffEstLinesDict['Mean Est'], = uiDiffAx.plot([], [], label='Mean Estimate Error', color='magenta')
 
     estVolt = msgdict['Estimate']['SvEstVoltages']
     foundDiffSet = set()
+    batch = SampleBatch()
 
     # set the data element keys we want to extract
     if plotMagFlag:
@@ -824,110 +899,41 @@ def estimateStatsCallback(header, message):
         measkey = 'angle'
 
     for item in estVolt:
-        # only consider phases A, B, C and user-specified phases
-        phase = item['phase']
-        #if phase!='A' and phase!='B' and phase!='C' or \
-        #   len(plotPhaseList)>0 and phase not in plotPhaseList:
-        if len(plotPhaseList)>0 and phase not in plotPhaseList:
+        entry = estJoinPlanDict.get((item['ConnectivityNode'], item['phase']))
+        # only consider user-specified phases
+        if not entry or not entry.plotFlag:
             continue
 
-        buspair = estToBusDict[item['ConnectivityNode']+','+phase]
-
-        estvval = item[estkey]
-        estvval = calcBusVNom(estvval, buspair)
+        buspair = entry.buspair
 
         #print(appName + ': estimate bus,phase pair: ' + buspair, flush=True)
-        #print(appName + ': timestamp: ' + str(ts), flush=True)
-        #print(appName + ': estvval: ' + str(estvval), flush=True)
+        #print(appName + ': estvval: ' + str(item[estkey]), flush=True)
 
-        measvval = None
-        if measDataTS is not None and buspair in busToMeasDict:
-            for measmrid in busToMeasDict[buspair]:
-                if buspair in foundDiffSet:
-                    break
+        measvval = simvval = math.nan
+        if measDataTS is not None and buspair not in foundDiffSet:
+            measvval, simvval = matchMeasurement(entry, measkey,
+                                                 measDataTS, simDataTS)
+            if not math.isnan(measvval):
+                foundDiffSet.add(buspair)
 
-                if measmrid in measDataTS:
-                    meas = measDataTS[measmrid]
-                    if measkey in meas:
-                        foundDiffSet.add(buspair)
-                        estlist.append(estvval)
-
-                        if measmrid in simDataTS:
-                            sim = simDataTS[measmrid]
-                            if measkey in sim:
-                                simvval = sim[measkey]
-                                simvval = calcBusVNom(simvval, buspair)
-
-                                if not plotMagFlag:
-                                    diffestvval = estvval - simvval
-                                elif simvval != 0.0:
-                                    diffestvval = abs(100.0*(estvval - simvval)/simvval)
-                                else:
-                                    diffestvval = 0.0
-
-                                if not plotOverlayFlag:
-                                    diffestlist.append(diffestvval)
-
-                                measvval = meas[measkey]
-                                measvval = calcBusVNom(measvval, buspair)
-
-                                if plotMagFlag:
-                                    vmagPrintWithMeas(ts, buspair, estvval, measvval, diffestvval)
-                                else:
-                                    vangPrintWithMeas(ts, buspair, estvval, measvval, diffestvval)
-                                break
-
-        if not measvval:
-            if plotMagFlag:
-                vmagPrintWithoutMeas(ts, buspair, estvval)
-            else:
-                vangPrintWithoutMeas(ts, buspair, estvval)
-
-    estmin = min(estlist)
-    estmax = max(estlist)
-    estmean = statistics.mean(estlist)
-    eststdev = statistics.pstdev(estlist, estmean)
-    if plotPausedFlag:
-        estDataPausedDict['Min'].append(estmin)
-        tsEstDataPausedDict['Min'].append(ts - tsInit)
-        estDataPausedDict['Max'].append(estmax)
-        tsEstDataPausedDict['Max'].append(ts - tsInit)
-        estDataPausedDict['Mean'].append(estmean)
-        tsEstDataPausedDict['Mean'].append(ts - tsInit)
-        estDataPausedDict['Stdev Low'].append(estmean-eststdev)
-        tsEstDataPausedDict['Stdev Low'].append(ts - tsInit)
-        estDataPausedDict['Stdev High'].append(estmean+eststdev)
-        tsEstDataPausedDict['Stdev High'].append(ts - tsInit)
-    else:
-        estDataDict['Min'].append(estmin)
-        tsEstDataDict['Min'].append(ts - tsInit)
-        estDataDict['Max'].append(estmax)
-        tsEstDataDict['Max'].append(ts - tsInit)
-        estDataDict['Mean'].append(estmean)
-        tsEstDataDict['Mean'].append(ts - tsInit)
-        estDataDict['Stdev Low'].append(estmean-eststdev)
-        tsEstDataDict['Stdev Low'].append(ts - tsInit)
-        estDataDict['Stdev High'].append(estmean+eststdev)
-        tsEstDataDict['Stdev High'].append(ts - tsInit)
+        batch.add(entry, item[estkey], measvval, simvval)
+
+    estvvals, diffestvvals = appendEstBatch(ts, batch)
+
+    if len(estvvals) > 0:
+        estStore.appendColumn(ts - tsInit, estStatsRows,
+                              aggregateStats(estvvals))
 
     if not plotOverlayFlag:
-        if len(diffestlist) > 0:
-            diffestmean = statistics.mean(diffestlist)
-            if plotPausedFlag:
-                diffEstDataPausedDict['Mean Est'].append(diffestmean)
-                tsDiffEstDataPausedDict['Mean Est'].append(ts - tsInit)
-            else:
-                diffEstDataDict['Mean Est'].append(diffestmean)
-                tsDiffEstDataDict['Mean Est'].append(ts - tsInit)
+        if len(diffestvvals) > 0:
+            diffestmean = diffestvvals.mean()
+            diffEstStore.append(ts - tsInit, 'Mean Est', diffestmean)
 
             if plotMagFlag:
                 print(appName + ': mean magnitude % diff estimate: ' + str(diffestmean), flush=True)
             else:
                 print(appName + ': mean angle diff estimate: ' + str(diffestmean), flush=True)
 
-    # update plots with the new data
-    plotEstimateData()
-
 
 def measurementConfigCallback(header, message):
     global firstMeasurementPassFlag, tsInit
@@ -944,11 +950,7 @@ def measurementConfigCallback(header, message):
         #print('('+str(ts)+')', end='', flush=True)
         #pprint.pprint(msgdict)
 
-        # because we require Python 3.6, we can count on insertion ordered
-        # dictionaries
-        # otherwise a list should be used, but then I have to make it a list
-        # of tuples to store the timestamp as well
-        senAllDataDict[ts] = measVolt
+        measJoin.putSen(ts, measVolt)
 
     else:
         #print('<', end='', flush=True)
@@ -956,17 +958,13 @@ def measurementConfigCallback(header, message):
         #print('('+str(ts)+')', end='', flush=True)
         #pprint.pprint(msgdict)
 
-        # because we require Python 3.6, we can count on insertion ordered
-        # dictionaries
-        # otherwise a list should be used, but then I have to make it a list
-        # of tuples to store the timestamp as well
-        simAllDataDict[ts] = measVolt
+        measJoin.putSim(ts, measVolt)
 
     simDataTS = None
     if useSensorsForEstimatesFlag:
         # this must be a sensor measurement triggering this callback so
         # get the corresponding simulation measurement that was sent
-        simDataTS = findSimTS(ts)
+        simDataTS = measJoin.sim(ts)
 
     if firstMeasurementPassFlag:
         firstMeasurementPassFlag = False
@@ -981,19 +979,15 @@ def measurementConfigCallback(header, message):
         measkey = 'angle'
 
     foundSet = set()
+    batch = SampleBatch()
 
     for measmrid in measVolt:
-        if measmrid not in measToBusDict:
+        entry = measJoinPlanDict.get(measmrid)
+        # only consider user-specified phases
+        if not entry or not entry.plotFlag:
             continue
 
-        buspair = measToBusDict[measmrid]
-        bus, phase = buspair.split(',')
-
-        # only consider phases A, B, C and user-specified phases
-        #if phase!='A' and phase!='B' and phase!='C' or \
-        #   len(plotPhaseList)>0 and phase not in plotPhaseList:
-        if len(plotPhaseList)>0 and phase not in plotPhaseList:
-            continue
+        buspair = entry.buspair
 
         # skip if this is a buspair that's not in the plot configuration
         # or if the buspair was previously processed (multiple mrids for
@@ -1006,49 +1000,20 @@ def measurementConfigCallback(header, message):
 
             foundSet.add(buspair)
 
-            measvval = meas[measkey]
-            measvval = calcBusVNom(measvval, buspair)
-
             #print(appName + ': measurement bus,phase pair: ' + buspair, flush=True)
-            #print(appName + ': timestamp: ' + str(ts), flush=True)
-            #print(appName + ': measvval: ' + str(measvval), flush=True)
-
-            if plotPausedFlag:
-                measDataPausedDict[buspair].append(measvval)
-                tsMeasDataPausedDict[buspair].append(ts - tsInit)
-            else:
-                measDataDict[buspair].append(measvval)
-                tsMeasDataDict[buspair].append(ts - tsInit)
-
-            if not plotOverlayFlag and simDataTS and measmrid in simDataTS:
-                sim = simDataTS[measmrid]
-                if measkey in sim:
-                    simvval = sim[measkey]
-                    simvval = calcBusVNom(simvval, buspair)
-
-                    if not plotMagFlag:
-                        diffmeasvval = measvval - simvval
-                    elif simvval != 0.0:
-                        diffmeasvval = abs(100.0*(measvval - simvval)/simvval)
-                    else:
-                        diffmeasvval = 0.0
+            #print(appName + ': measvval: ' + str(meas[measkey]), flush=True)
 
-                    if plotPausedFlag:
-                        diffMeasDataPausedDict[buspair+' Meas'].append(diffmeasvval)
-                        tsDiffMeasDataPausedDict[buspair+' Meas'].append(ts - tsInit)
-                    else:
-                        diffMeasDataDict[buspair+' Meas'].append(diffmeasvval)
-                        tsDiffMeasDataDict[buspair+' Meas'].append(ts - tsInit)
+            batch.add(entry, meas[measkey],
+                      simValue=simValue(simDataTS, measmrid, measkey))
 
             # no reason to keep checking more pairs if we've found all we
             # are looking for
             if len(foundSet) == len(plotBusDict):
                 break
 
-    #print(appName + ': ' + str(len(measVolt)) + ' measurements, ' + str(measCount) + ' configuration file bus,phase pair matches, ' + str(len(plotBusDict)) + ' configuration file bus,phase total pairs', flush=True)
+    appendMeasBatch(ts, batch, True)
 
-    # update measurement plot with the new data
-    plotMeasurementData()
+    #print(appName + ': ' + str(len(measVolt)) + ' measurements, ' + str(measCount) + ' configuration file bus,phase pair matches, ' + str(len(plotBusDict)) + ' configuration file bus,phase total pairs', flush=True)
 
 
 def measurementNoConfigCallback(header, message):
@@ -1066,28 +1031,20 @@ def measurementNoConfigCallback(header, message):
         #print('('+str(ts)+')', end='', flush=True)
         #pprint.pprint(msgdict)
 
-        # because we require Python 3.6, we can count on insertion ordered
-        # dictionaries
-        # otherwise a list should be used, but then I have to make it a list
-        # of tuples to store the timestamp as well
-        senAllDataDict[ts] = measVolt
+        measJoin.putSen(ts, measVolt)
     else:
         #print('<', end='', flush=True)
         print('[sim]', end='', flush=True)
         #print('('+str(ts)+')', end='', flush=True)
         #pprint.pprint(msgdict)
 
-        # because we require Python 3.6, we can count on insertion ordered
-        # dictionaries
-        # otherwise a list should be used, but then I have to make it a list
-        # of tuples to store the timestamp as well
-        simAllDataDict[ts] = measVolt
+        measJoin.putSim(ts, measVolt)
 
     simDataTS = None
     if useSensorsForEstimatesFlag:
         # this must be a sensor measurement triggering this callback so
         # get the corresponding simulation measurement that was sent
-        simDataTS = findSimTS(ts)
+        simDataTS = measJoin.sim(ts)
 
     if firstMeasurementPassFlag:
         firstMeasurementPassFlag = False
@@ -1102,20 +1059,18 @@ def measurementNoConfigCallback(header, message):
         measkey = 'angle'
 
     foundSet = set()
+    batch = SampleBatch()
     #DEBUG_MISSING = 0
     #global DEBUG_TOTAL, DEBUG_TOTAL_MISSING
 
     for measmrid in measVolt:
-        if measmrid not in measToBusDict:
-            continue
-
-        buspair = measToBusDict[measmrid]
-        bus, phase = buspair.split(',')
-
+        entry = measJoinPlanDict.get(measmrid)
         # check user-specified phases
-        if len(plotPhaseList)>0 and phase not in plotPhaseList:
+        if not entry or not entry.plotFlag:
             continue
 
+        buspair = entry.buspair
+
         # skip if this is a buspair that was previously processed
         # (multiple mrids for bus,phase pairs are possible where we
         # just take the first)
@@ -1136,67 +1091,36 @@ def measurementNoConfigCallback(header, message):
         foundSet.add(buspair)
         #print('(' + buspair + ')', end='', flush=True) # DEBUG
 
-        measvval = meas[measkey]
-        measvval = calcBusVNom(measvval, buspair)
-
         #print(appName + ': measurement bus,phase pair: ' + buspair, flush=True)
-        #print(appName + ': timestamp: ' + str(ts), flush=True)
-        #print(appName + ': measvval: ' + str(measvval), flush=True)
+        #print(appName + ': measvval: ' + str(meas[measkey]), flush=True)
 
         # do dictionary and plot lines initialization the first time
         # the buspair is encountered
-        if buspair not in measDataDict:
-            measDataDict[buspair] = []
-            tsMeasDataDict[buspair] = []
-            measDataPausedDict[buspair] = []
-            tsMeasDataPausedDict[buspair] = []
+        if entry.measRow < 0:
+            entry.measRow = measStore.addSeries(buspair)
             if not plotOverlayFlag and sensorSimulatorRunningFlag:
-                diffMeasDataDict[buspair+' Meas'] = []
-                tsDiffMeasDataDict[buspair+' Meas'] = []
-                diffMeasDataPausedDict[buspair+' Meas'] = []
-                tsDiffMeasDataPausedDict[buspair+' Meas'] = []
+                entry.diffMeasRow = diffMeasStore.addSeries(buspair+' Meas')
 
             # create a lines dictionary entry per node/phase pair
-            measLinesDict[buspair], = uiMeasAx.plot([], [], label=buspair)
-            color = measLinesDict[buspair].get_color()
-
-            if plotOverlayFlag:
-                diffMeasLinesDict[buspair+' Actual'], = uiDiffAx.plot([], [], label=buspair+' Actual', color=color)
-            else:
-                diffMeasLinesDict[buspair+' Meas'], = uiDiffAx.plot([], [], label=buspair+' Meas.', color=color)
+            if not headlessFlag:
+                measLinesDict[buspair], = uiMeasAx.plot([], [], label=buspair)
+                color = measLinesDict[buspair].get_color()
 
-        if plotPausedFlag:
-            measDataPausedDict[buspair].append(measvval)
-            tsMeasDataPausedDict[buspair].append(ts - tsInit)
-        else:
-            measDataDict[buspair].append(measvval)
-            tsMeasDataDict[buspair].append(ts - tsInit)
-
-        if not plotOverlayFlag and simDataTS and measmrid in simDataTS:
-            sim = simDataTS[measmrid]
-            if measkey in sim:
-                simvval = sim[measkey]
-                simvval = calcBusVNom(simvval, buspair)
-
-                if not plotMagFlag:
-                    diffmeasvval = measvval - simvval
-                elif simvval != 0.0:
-                    diffmeasvval = abs(100.0*(measvval - simvval)/simvval)
+                if plotOverlayFlag:
+                    diffMeasLinesDict[buspair+' Actual'], = uiDiffAx.plot([], [], label=buspair+' Actual', color=color)
                 else:
-                    diffmeasvval = 0.0
+                    diffMeasLinesDict[buspair+' Meas'], = uiDiffAx.plot([], [], label=buspair+' Meas.', color=color)
 
-                if plotPausedFlag:
-                    diffMeasDataPausedDict[buspair+' Meas'].append(diffmeasvval)
-                    tsDiffMeasDataPausedDict[buspair+' Meas'].append(ts - tsInit)
-                else:
-                    diffMeasDataDict[buspair+' Meas'].append(diffmeasvval)
-                    tsDiffMeasDataDict[buspair+' Meas'].append(ts - tsInit)
+        batch.add(entry, meas[measkey],
+                  simValue=simValue(simDataTS, measmrid, measkey))
 
         # no reason to keep checking more pairs if we've found all we
         # are looking for
         if plotNumber>0 and len(foundSet)==plotNumber:
             break
 
+    appendMeasBatch(ts, batch, True)
+
     #if plotNumber > 0:
     #    print(appName + ': ' + str(len(measVolt)) + ' measurements, ' + str(len(foundSet)) + ' node,phase pair matches (matching first ' + str(plotNumber) + ')', flush=True)
     #else:
@@ -1205,15 +1129,12 @@ def measurementNoConfigCallback(header, message):
     #print('\nDEBUG: # of pairs found: ' + str(len(foundSet)) + ', # of missing values: ' + str(DEBUG_MISSING), flush=True)
     #if ts - tsInit >= 180:
     #    print('DEBUG MISSING: ' + str(DEBUG_TOTAL_MISSING) + ' out of ' + str(DEBUG_TOTAL) + ' or ' + str(100.0*float(DEBUG_TOTAL_MISSING)/float(DEBUG_TOTAL)) + '%', flush=True)
-    #    for buspair in tsMeasDataDict:
-    #        print(buspair + ': ' + str(tsMeasDataDict[buspair]), flush=True)
+    #    for buspair in measStore:
+    #        print(buspair + ': ' + str(measStore.seriesView(buspair)), flush=True)
     #    exit()
-    # update measurement plot with the new data
-    plotMeasurementData()
-
 
 def measurementStatsCallback(header, message):
-    global firstMeasurementPassFlag, tsInit
+    global firstMeasurementPassFlag, tsInit, measStatsRows
 
     msgdict = message['message']
     ts = msgdict['timestamp']
@@ -1227,28 +1148,20 @@ def measurementStatsCallback(header, message):
         #print('('+str(ts)+')', end='', flush=True)
         #pprint.pprint(msgdict)
 
-        # because we require Python 3.6, we can count on insertion ordered
-        # dictionaries
-        # otherwise a list should be used, but then I have to make it a list
-        # of tuples to store the timestamp as well
-        senAllDataDict[ts] = measVolt
+        measJoin.putSen(ts, measVolt)
     else:
         #print('<', end='', flush=True)
         print('[sim]', end='', flush=True)
         #print('('+str(ts)+')', end='', flush=True)
         #pprint.pprint(msgdict)
 
-        # because we require Python 3.6, we can count on insertion ordered
-        # dictionaries
-        # otherwise a list should be used, but then I have to make it a list
-        # of tuples to store the timestamp as well
-        simAllDataDict[ts] = measVolt
+        measJoin.putSim(ts, measVolt)
 
     simDataTS = None
     if useSensorsForEstimatesFlag:
         # this must be a sensor measurement triggering this callback so
         # get the corresponding simulation measurement that was sent
-        simDataTS = findSimTS(ts)
+        simDataTS = measJoin.sim(ts)
 
     if firstMeasurementPassFlag:
         firstMeasurementPassFlag = False
@@ -1256,57 +1169,35 @@ def measurementStatsCallback(header, message):
         tsInit = ts
         setTSZoomSliderVals(len(measVolt))
 
-        measDataDict['Min'] = []
-        tsMeasDataDict['Min'] = []
-        measDataDict['Max'] = []
-        tsMeasDataDict['Max'] = []
-        measDataDict['Mean'] = []
-        tsMeasDataDict['Mean'] = []
-        measDataDict['Stdev Low'] = []
-        tsMeasDataDict['Stdev Low'] = []
-        measDataDict['Stdev High'] = []
-        tsMeasDataDict['Stdev High'] = []
-        measDataPausedDict['Min'] = []
-        tsMeasDataPausedDict['Min'] = []
-        measDataPausedDict['Max'] = []
-        tsMeasDataPausedDict['Max'] = []
-        measDataPausedDict['Mean'] = []
-        tsMeasDataPausedDict['Mean'] = []
-        measDataPausedDict['Stdev Low'] = []
-        tsMeasDataPausedDict['Stdev Low'] = []
-        measDataPausedDict['Stdev High'] = []
-        tsMeasDataPausedDict['Stdev High'] = []
-
-        # create a lines dictionary entry for each measurement plot line
-        measLinesDict['Min'], = uiMeasAx.plot([], [], label='Minimum', color='cyan')
-        measLinesDict['Max'], = uiMeasAx.plot([], [], label='Maximum', color='cyan')
-        measLinesDict['Stdev Low'], = uiMeasAx.plot([], [], label='Std. Dev. Low', color='blue')
-        measLinesDict['Stdev High'], = uiMeasAx.plot([], [], label='Std. Dev. High', color='blue')
-        measLinesDict['Mean'], = uiMeasAx.plot([], [], label='Mean', color='red')
-
-        # create a lines dictionary entry for each plot line
-        if plotOverlayFlag:
-            diffMeasLinesDict['Min Actual'], = uiDiffAx.plot([], [], label='Minimum Actual', color='cyan')
-            diffMeasLinesDict['Max Actual'], = uiDiffAx.plot([], [], label='Maximum Actual', color='cyan')
-            diffMeasLinesDict['Stdev Low Actual'], = uiDiffAx.plot([], [], label='Std. Dev. Low Actual', color='blue')
-            diffMeasLinesDict['Stdev High Actual'], = uiDiffAx.plot([], [], label='Std. Dev. High Actual', color='blue')
-            diffMeasLinesDict['Mean Actual'], = uiDiffAx.plot([], [], label='Mean Actual', color='red')
+        measStatsRows = np.array([measStore.addSeries(stat)
+                                  for stat in statsFuncDict], dtype=int)
 
-        else:
-            if sensorSimulatorRunningFlag:
-                diffMeasDataDict['Mean Meas'] = []
-                tsDiffMeasDataDict['Mean Meas'] = []
-                diffMeasDataPausedDict['Mean Meas'] = []
-                tsDiffMeasDataPausedDict['Mean Meas'] = []
+        if not plotOverlayFlag and sensorSimulatorRunningFlag:
+            diffMeasStore.addSeries('Mean Meas')
 
-                # hardwire color to green specifically for this plot
-                diffMeasLinesDict['Mean Meas'], = uiDiffAx.plot([], [], label='Mean Measurement Error', color='green')
+        # create a lines dictionary entry for each measurement plot line
+        if not headlessFlag:
+            measLinesDict['Min'], = uiMeasAx.plot([], [], label='Minimum', color='cyan')
+            measLinesDict['Max'], = uiMeasAx.plot([], [], label='Maximum', color='cyan')
+            measLinesDict['Stdev Low'], = uiMeasAx.plot([], [], label='Std. Dev. Low', color='blue')
+            measLinesDict['Stdev High'], = uiMeasAx.plot([], [], label='Std. Dev. High', color='blue')
+            measLinesDict['Mean'], = uiMeasAx.plot([], [], label='Mean', color='red')
+
+            # create a lines dictionary entry for each plot line
+            if plotOverlayFlag:
+                diffMeasLinesDict['Min Actual'], = uiDiffAx.plot([], [], label='Minimum Actual', color='cyan')
+                diffMeasLinesDict['Max Actual'], = uiDiffAx.plot([], [], label='Maximum Actual', color='cyan')
+                diffMeasLinesDict['Stdev Low Actual'], = uiDiffAx.plot([], [], label='Std. Dev. Low Actual', color='blue')
+                diffMeasLinesDict['Stdev High Actual'], = uiDiffAx.plot([], [], label='Std. Dev. High Actual', color='blue')
+                diffMeasLinesDict['Mean Actual'], = uiDiffAx.plot([], [], label='Mean Actual', color='red')
 
-    measlist = []
-    if sensorSimulatorRunningFlag:
-        diffmeaslist = []
+            else:
+                if sensorSimulatorRunningFlag:
+                    # hardwire color to green specifically for this plot
+                    diffMeasLinesDict['Mean Meas'], = uiDiffAx.plot([], [], label='Mean Measurement Error', color='green')
 
     foundSet = set()
+    batch = SampleBatch()
 
     # set the data element keys we want to extract
     if plotMagFlag:
@@ -1315,17 +1206,12 @@ def measurementStatsCallback(header, message):
         measkey = 'angle'
 
     for measmrid in measVolt:
-        if measmrid not in measToBusDict:
+        entry = measJoinPlanDict.get(measmrid)
+        # only consider user-specified phases
+        if not entry or not entry.plotFlag:
             continue
 
-        buspair = measToBusDict[measmrid]
-        bus, phase = buspair.split(',')
-
-        # only consider phases A, B, C and user-specified phases
-        #if phase!='A' and phase!='B' and phase!='C' or \
-        #   len(plotPhaseList)>0 and phase not in plotPhaseList:
-        if len(plotPhaseList)>0 and phase not in plotPhaseList:
-            continue
+        buspair = entry.buspair
 
         if buspair in foundSet:
             continue
@@ -1337,75 +1223,31 @@ def measurementStatsCallback(header, message):
 
         foundSet.add(buspair)
 
-        measvval = meas[measkey]
-        measvval = calcBusVNom(measvval, buspair)
-
         #print(appName + ': measurement bus,phase pair: ' + buspair, flush=True)
-        #print(appName + ': timestamp: ' + str(ts), flush=True)
-        #print(appName + ': measvval: ' + str(measvval), flush=True)
-
-        measlist.append(measvval)
+        #print(appName + ': measvval: ' + str(meas[measkey]), flush=True)
 
-        if not plotOverlayFlag and simDataTS and measmrid in simDataTS:
-            sim = simDataTS[measmrid]
-            if measkey in sim:
-                simvval = sim[measkey]
-                simvval = calcBusVNom(simvval, buspair)
+        batch.add(entry, meas[measkey],
+                  simValue=simValue(simDataTS, measmrid, measkey))
 
-                if not plotMagFlag:
-                    diffmeasvval = measvval - simvval
-                elif simvval != 0.0:
-                    diffmeasvval = abs(100.0*(measvval - simvval)/simvval)
-                else:
-                    diffmeasvval = 0.0
+    start = time.perf_counter()
+    measvvals, _, simvvals, diffmeasvvals = normalizeBatch(batch)
+    diffmeasvvals = diffmeasvvals[~np.isnan(simvvals)]
+    hotPath.record('append', start)
+    hotPath.count('pairs', len(batch))
 
-                diffmeaslist.append(diffmeasvval)
+    if len(measvvals) > 0:
+        measStore.appendColumn(ts - tsInit, measStatsRows,
+                               aggregateStats(measvvals))
 
-    if len(measlist) > 0:
-        measmin = min(measlist)
-        measmax = max(measlist)
-        measmean = statistics.mean(measlist)
-        measstdev = statistics.pstdev(measlist, measmean)
-        if plotPausedFlag:
-            measDataPausedDict['Min'].append(measmin)
-            tsMeasDataPausedDict['Min'].append(ts - tsInit)
-            measDataPausedDict['Max'].append(measmax)
-            tsMeasDataPausedDict['Max'].append(ts - tsInit)
-            measDataPausedDict['Mean'].append(measmean)
-            tsMeasDataPausedDict['Mean'].append(ts - tsInit)
-            measDataPausedDict['Stdev Low'].append(measmean-measstdev)
-            tsMeasDataPausedDict['Stdev Low'].append(ts - tsInit)
-            measDataPausedDict['Stdev High'].append(measmean+measstdev)
-            tsMeasDataPausedDict['Stdev High'].append(ts - tsInit)
-        else:
-            measDataDict['Min'].append(measmin)
-            tsMeasDataDict['Min'].append(ts - tsInit)
-            measDataDict['Max'].append(measmax)
-            tsMeasDataDict['Max'].append(ts - tsInit)
-            measDataDict['Mean'].append(measmean)
-            tsMeasDataDict['Mean'].append(ts - tsInit)
-            measDataDict['Stdev Low'].append(measmean-measstdev)
-            tsMeasDataDict['Stdev Low'].append(ts - tsInit)
-            measDataDict['Stdev High'].append(measmean+measstdev)
-            tsMeasDataDict['Stdev High'].append(ts - tsInit)
-
-    if not plotOverlayFlag and sensorSimulatorRunningFlag and len(diffmeaslist)>0:
-        diffmeasmean = statistics.mean(diffmeaslist)
-        if plotPausedFlag:
-            diffMeasDataPausedDict['Mean Meas'].append(diffmeasmean)
-            tsDiffMeasDataPausedDict['Mean Meas'].append(ts - tsInit)
-        else:
-            diffMeasDataDict['Mean Meas'].append(diffmeasmean)
-            tsDiffMeasDataDict['Mean Meas'].append(ts - tsInit)
+    if not plotOverlayFlag and sensorSimulatorRunningFlag and len(diffmeasvvals)>0:
+        diffmeasmean = diffmeasvvals.mean()
+        diffMeasStore.append(ts - tsInit, 'Mean Meas', diffmeasmean)
 
         if plotMagFlag:
             print(appName + ': mean magnitude % diff measurement: ' + str(diffmeasmean), flush=True)
         else:
             print(appName + ': mean angle diff measurement: ' + str(diffmeasmean), flush=True)
 
-    # update measurement plot with the new data
-    plotMeasurementData()
-
 
 def simulationCallback(header, message):
     msgdict = message['message']
@@ -1417,11 +1259,7 @@ def simulationCallback(header, message):
     #print('('+str(ts)+')', end='', flush=True)
     #pprint.pprint(msgdict)
 
-    # because we require Python 3.6, we can count on insertion ordered
-    # dictionaries
-    # otherwise a list should be used, but then I have to make it a list
-    # of tuples to store the timestamp as well
-    simAllDataDict[ts] = msgdict['measurements']
+    measJoin.putSim(ts, msgdict['measurements'])
 
 
 def sensorConfigCallback(header, message):
@@ -1434,19 +1272,15 @@ def sensorConfigCallback(header, message):
     #print('('+str(ts)+')', end='', flush=True)
     #pprint.pprint(msgdict)
 
-    # because we require Python 3.6, we can count on insertion ordered
-    # dictionaries
-    # otherwise a list should be used, but then I have to make it a list
-    # of tuples to store the timestamp as well
     measVolt = msgdict['measurements']
-    senAllDataDict[ts] = measVolt
+    measJoin.putSen(ts, measVolt)
 
     # don't need to update bottom plot if it is an overlay
     if plotOverlayFlag:
         return
 
     # get the corresponding simulation measurement that was sent
-    simDataTS = findSimTS(ts)
+    simDataTS = measJoin.sim(ts)
 
     # can't update bottom plot without corresponding simulation data
     if not simDataTS:
@@ -1459,19 +1293,15 @@ def sensorConfigCallback(header, message):
         measkey = 'angle'
 
     foundSet = set()
+    batch = SampleBatch()
 
     for measmrid in measVolt:
-        if measmrid not in measToBusDict:
+        entry = measJoinPlanDict.get(measmrid)
+        # only consider user-specified phases
+        if not entry or not entry.plotFlag:
             continue
 
-        buspair = measToBusDict[measmrid]
-        bus, phase = buspair.split(',')
-
-        # only consider phases A, B, C and user-specified phases
-        #if phase!='A' and phase!='B' and phase!='C' or \
-        #   len(plotPhaseList)>0 and phase not in plotPhaseList:
-        if len(plotPhaseList)>0 and phase not in plotPhaseList:
-            continue
+        buspair = entry.buspair
 
         # skip if this is a buspair that's not in the plot configuration
         # or if the buspair was previously processed (multiple mrids for
@@ -1484,42 +1314,20 @@ def sensorConfigCallback(header, message):
 
             foundSet.add(buspair)
 
-            measvval = meas[measkey]
-            measvval = calcBusVNom(measvval, buspair)
-
             #print(appName + ': bus,phase pair: ' + buspair, flush=True)
-            #print(appName + ': timestamp: ' + str(ts), flush=True)
-            #print(appName + ': measvval: ' + str(measvval), flush=True)
-
-            if measmrid in simDataTS:
-                sim = simDataTS[measmrid]
-                if measkey in sim:
-                    simvval = sim[measkey]
-                    simvval = calcBusVNom(simvval, buspair)
-
-                    if not plotMagFlag:
-                        diffmeasvval = measvval - simvval
-                    elif simvval != 0.0:
-                        diffmeasvval = abs(100.0*(measvval - simvval)/simvval)
-                    else:
-                        diffmeasvval = 0.0
+            #print(appName + ': measvval: ' + str(meas[measkey]), flush=True)
 
-                    if plotPausedFlag:
-                        diffMeasDataPausedDict[buspair+' Meas'].append(diffmeasvval)
-                        tsDiffMeasDataPausedDict[buspair+' Meas'].append(ts - tsInit)
-                    else:
-                        diffMeasDataDict[buspair+' Meas'].append(diffmeasvval)
-                        tsDiffMeasDataDict[buspair+' Meas'].append(ts - tsInit)
+            batch.add(entry, meas[measkey],
+                      simValue=simValue(simDataTS, measmrid, measkey))
 
             # no reason to keep checking more pairs if we've found all we
             # are looking for
             if len(foundSet) == len(plotBusDict):
                 break
 
-    #print(appName + ': ' + str(len(measVolt)) + ' measurements, ' + str(measCount) + ' configuration file bus,phase pair matches, ' + str(len(plotBusDict)) + ' configuration file bus,phase total pairs', flush=True)
+    appendMeasBatch(ts, batch, False)
 
-    # update measurement plot with the new data
-    plotMeasurementData()
+    #print(appName + ': ' + str(len(measVolt)) + ' measurements, ' + str(measCount) + ' configuration file bus,phase pair matches, ' + str(len(plotBusDict)) + ' configuration file bus,phase total pairs', flush=True)
 
 
 def sensorNoConfigCallback(header, message):
@@ -1532,15 +1340,11 @@ def sensorNoConfigCallback(header, message):
     #print('('+str(ts)+')', end='', flush=True)
     #pprint.pprint(msgdict)
 
-    # because we require Python 3.6, we can count on insertion ordered
-    # dictionaries
-    # otherwise a list should be used, but then I have to make it a list
-    # of tuples to store the timestamp as well
     measVolt = msgdict['measurements']
-    senAllDataDict[ts] = measVolt
+    measJoin.putSen(ts, measVolt)
 
     # get the corresponding simulation measurement that was sent
-    simDataTS = findSimTS(ts)
+    simDataTS = measJoin.sim(ts)
 
     # set the data element keys we want to extract
     if plotMagFlag:
@@ -1549,18 +1353,16 @@ def sensorNoConfigCallback(header, message):
         measkey = 'angle'
 
     foundSet = set()
+    batch = SampleBatch()
 
     for measmrid in measVolt:
-        if measmrid not in measToBusDict:
-            continue
-
-        buspair = measToBusDict[measmrid]
-        bus, phase = buspair.split(',')
-
+        entry = measJoinPlanDict.get(measmrid)
         # consider user-specified phases
-        if len(plotPhaseList)>0 and phase not in plotPhaseList:
+        if not entry or not entry.plotFlag:
             continue
 
+        buspair = entry.buspair
+
         # skip if this is a buspair that was previously processed
         # (multiple mrids for bus,phase pairs are possible where we
         # just take the first)
@@ -1574,58 +1376,36 @@ def sensorNoConfigCallback(header, message):
 
         foundSet.add(buspair)
 
-        measvval = meas[measkey]
-        measvval = calcBusVNom(measvval, buspair)
-
         #print(appName + ': bus,phase pair: ' + buspair, flush=True)
-        #print(appName + ': timestamp: ' + str(ts), flush=True)
-        #print(appName + ': measvval: ' + str(measvval), flush=True)
+        #print(appName + ': measvval: ' + str(meas[measkey]), flush=True)
 
         # do dictionary and plot lines initialization the first time
         # the buspair is encountered
-        if buspair+' Meas' not in diffMeasDataDict:
-            diffMeasDataDict[buspair+' Meas'] = []
-            diffMeasDataPausedDict[buspair+' Meas'] = []
+        if entry.diffMeasRow < 0:
+            entry.diffMeasRow = diffMeasStore.addSeries(buspair+' Meas')
 
             # create a lines dictionary entry per node/phase pair for each plot
-            if plotOverlayFlag:
-                diffMeasLinesDict[buspair+' Actual'], = uiDiffAx.plot([], [], label=buspair+' Actual')
-            else:
-                diffMeasLinesDict[buspair+' Meas'], = uiDiffAx.plot([], [], label=buspair+' Meas.')
-
-        if not plotOverlayFlag and simDataTS and measmrid in simDataTS:
-            sim = simDataTS[measmrid]
-            if measkey in sim:
-                simvval = sim[measkey]
-                simvval = calcBusVNom(simvval, buspair)
-
-                if not plotMagFlag:
-                    diffmeasvval = measvval - simvval
-                elif simvval != 0.0:
-                    diffmeasvval = abs(100.0*(measvval - simvval)/simvval)
+            if not headlessFlag:
+                if plotOverlayFlag:
+                    diffMeasLinesDict[buspair+' Actual'], = uiDiffAx.plot([], [], label=buspair+' Actual')
                 else:
-                    diffmeasvval = 0.0
+                    diffMeasLinesDict[buspair+' Meas'], = uiDiffAx.plot([], [], label=buspair+' Meas.')
 
-                if plotPausedFlag:
-                    diffMeasDataPausedDict[buspair+' Meas'].append(diffmeasvval)
-                    tsDiffMeasDataPausedDict[buspair+' Meas'].append(ts - tsInit)
-                else:
-                    diffMeasDataDict[buspair+' Meas'].append(diffmeasvval)
-                    tsDiffMeasDataDict[buspair+' Meas'].append(ts - tsInit)
+        batch.add(entry, meas[measkey],
+                  simValue=simValue(simDataTS, measmrid, measkey))
 
         # no reason to keep checking more pairs if we've found all we
         # are looking for
         if plotNumber>0 and len(foundSet)==plotNumber:
             break
 
+    appendMeasBatch(ts, batch, False)
+
     #if plotNumber > 0:
     #    print(appName + ': ' + str(len(measVolt)) + ' measurements, ' + str(len(foundSet)) + ' node,phase pair matches (matching first ' + str(plotNumber) + ')', flush=True)
     #else:
     #    print(appName + ': ' + str(len(len(measVolt))) + ' measurements, ' + str(len(foundSet)) + ' node,phase pair matches (matching all)', flush=True)
 
-    # update measurement plot with the new data
-    plotMeasurementData()
-
 
 def sensorStatsCallback(header, message):
     global firstSensorPassFlag
@@ -1639,37 +1419,33 @@ def sensorStatsCallback(header, message):
     #print('('+str(ts)+')', end='', flush=True)
     #pprint.pprint(msgdict)
 
-    # because we require Python 3.6, we can count on insertion ordered
-    # dictionaries
-    # otherwise a list should be used, but then I have to make it a list
-    # of tuples to store the timestamp as well
     measVolt = msgdict['measurements']
-    senAllDataDict[ts] = measVolt
+    measJoin.putSen(ts, measVolt)
 
     # get the corresponding simulation measurement that was sent
-    simDataTS = findSimTS(ts)
+    simDataTS = measJoin.sim(ts)
 
     if firstSensorPassFlag:
         firstSensorPassFlag = False
 
-        # create a lines dictionary entry for each plot line
-        if plotOverlayFlag:
-            diffMeasLinesDict['Min Actual'], = uiDiffAx.plot([], [], label='Minimum Actual', color='cyan')
-            diffMeasLinesDict['Max Actual'], = uiDiffAx.plot([], [], label='Maximum Actual', color='cyan')
-            diffMeasLinesDict['Stdev Low Actual'], = uiDiffAx.plot([], [], label='Std. Dev. Low Actual', color='blue')
-            diffMeasLinesDict['Stdev High Actual'], = uiDiffAx.plot([], [], label='Std. Dev. High Actual', color='blue')
-            diffMeasLinesDict['Mean Actual'], = uiDiffAx.plot([], [], label='Mean Actual', color='red')
-
-        else:
-            diffMeasDataDict['Mean Meas'] = []
-            diffMeasDataPausedDict['Mean Meas'] = []
+        if not plotOverlayFlag:
+            diffMeasStore.addSeries('Mean Meas')
 
-            # hardwire color to green specifically for this plot
-            diffMeasLinesDict['Mean Meas'], = uiDiffAx.plot([], [], label='Mean Measurement Error', color='green')
+        # create a lines dictionary entry for each plot line
+        if not headlessFlag:
+            if plotOverlayFlag:
+                diffMeasLinesDict['Min Actual'], = uiDiffAx.plot([], [], label='Minimum Actual', color='cyan')
+                diffMeasLinesDict['Max Actual'], = uiDiffAx.plot([], [], label='Maximum Actual', color='cyan')
+                diffMeasLinesDict['Stdev Low Actual'], = uiDiffAx.plot([], [], label='Std. Dev. Low Actual', color='blue')
+                diffMeasLinesDict['Stdev High Actual'], = uiDiffAx.plot([], [], label='Std. Dev. High Actual', color='blue')
+                diffMeasLinesDict['Mean Actual'], = uiDiffAx.plot([], [], label='Mean Actual', color='red')
 
-    diffmeaslist = []
+            else:
+                # hardwire color to green specifically for this plot
+                diffMeasLinesDict['Mean Meas'], = uiDiffAx.plot([], [], label='Mean Measurement Error', color='green')
 
     foundSet = set()
+    batch = SampleBatch()
 
     # set the data element keys we want to extract
     if plotMagFlag:
@@ -1678,68 +1454,271 @@ def sensorStatsCallback(header, message):
         measkey = 'angle'
 
     for measmrid in measVolt:
-        if measmrid not in measToBusDict:
+        entry = measJoinPlanDict.get(measmrid)
+        # only consider user-specified phases
+        if not entry or not entry.plotFlag:
             continue
 
-        buspair = measToBusDict[measmrid]
-        bus, phase = buspair.split(',')
-
-        # only consider phases A, B, C and user-specified phases
-        #if phase!='A' and phase!='B' and phase!='C' or \
-        #   len(plotPhaseList)>0 and phase not in plotPhaseList:
-        if len(plotPhaseList)>0 and phase not in plotPhaseList:
-            continue
+        buspair = entry.buspair
 
         if buspair in foundSet:
             continue
 
         meas = measVolt[measmrid]
 
-        if measkey not in measvval:
+        if measkey not in meas:
             continue
 
         foundSet.add(buspair)
 
-        measvval = meas[measkey]
-        measvval = calcBusVNom(measvval, buspair)
-
         #print(appName + ': measmrid: ' + measmrid, flush=True)
-        #print(appName + ': timestamp: ' + str(ts), flush=True)
-        #print(appName + ': measvval: ' + str(measvval), flush=True)
+        #print(appName + ': measvval: ' + str(meas[measkey]), flush=True)
 
-        measlist.append(measvval)
+        batch.add(entry, meas[measkey],
+                  simValue=simValue(simDataTS, measmrid, measkey))
 
-        if not plotOverlayFlag and simDataTS and measmrid in simDataTS:
-            sim = simDataTS[measmrid]
-            if measkey in sim:
-                simvval = sim[measkey]
-                simvval = calcBusVNom(simvval, buspair)
+    start = time.perf_counter()
+    measvvals, _, simvvals, diffmeasvvals = normalizeBatch(batch)
+    diffmeasvvals = diffmeasvvals[~np.isnan(simvvals)]
+    hotPath.record('append', start)
+    hotPath.count('pairs', len(batch))
 
-                if not plotMagFlag:
-                    diffmeasvval = measvval - simvval
-                elif simvval != 0.0:
-                    diffmeasvval = abs(100.0*(measvval - simvval)/simvval)
-                else:
-                    diffmeasvval = 0.0
-
-                diffmeaslist.append(diffmeasvval)
-
-    if not plotOverlayFlag and len(diffmeaslist)>0:
-        diffmeasmean = statistics.mean(diffmeaslist)
-        if plotPausedFlag:
-            diffMeasDataPausedDict['Mean Meas'].append(diffmeasmean)
-            tsDiffMeasDataPausedDict['Mean Meas'].append(ts - tsInit)
-        else:
-            diffMeasDataDict['Mean Meas'].append(diffmeasmean)
-            tsDiffMeasDataDict['Mean Meas'].append(ts - tsInit)
+    if not plotOverlayFlag and len(diffmeasvvals)>0:
+        diffmeasmean = diffmeasvvals.mean()
+        diffMeasStore.append(ts - tsInit, 'Mean Meas', diffmeasmean)
 
         if plotMagFlag:
             print(appName + ': mean magnitude % diff measurement: ' + str(diffmeasmean), flush=True)
         else:
             print(appName + ': mean angle diff measurement: ' + str(diffmeasmean), flush=True)
 
-    # update measurement plot with the new data
-    plotMeasurementData()
+
+def queueCallback(callback, dirtyPlots, topicName):
+    # the gridappsd listener thread only decodes the timestamp and queues the
+    # message so broker consumption never waits on matplotlib, which also
+    # must not be touched from any thread other than the GUI thread
+    def enqueue(header, message):
+        global startupDropCount
+
+        if 'processStatus' in message:
+            return
+
+        hotPath.count('messages ' + topicName)
+        arrival = time.perf_counter()
+
+        with startupLock:
+            if startupMsgList is not None:
+                if len(startupMsgList) >= startupMsgLimit:
+                    startupMsgList.popleft()
+                    startupDropCount += 1
+                startupMsgList.append((callback, dirtyPlots, header, message,
+                                       arrival))
+                return
+
+        # block when the queue is full so the broker applies backpressure
+        # rather than letting memory grow without bound
+        msgQueue.put((callback, dirtyPlots, header, message, arrival))
+
+    return enqueue
+
+
+def drainQueueCallback():
+    global replayMsgList, replayCount
+
+    # nothing can be processed until the join plan is compiled
+    if startupMsgList is not None:
+        if not startupDoneEvent.is_set():
+            return
+        finishStartup()
+        if startupError:
+            return
+
+    # apply the messages that have arrived since the last timer tick, up to
+    # drainBudget seconds of them, and flag the affected plots so the next
+    # frame redraws each of them once, after those buffered during startup,
+    # which are replayed a slice at a time so the GUI stays responsive
+    if replayMsgList is not None:
+        for callback, dirtyPlots, header, message, arrival in \
+                replayMsgList[replayCount:replayCount+replaySliceSize]:
+            applyMessage(callback, dirtyPlots, header, message, arrival)
+        replayCount = min(replayCount+replaySliceSize, len(replayMsgList))
+
+        if replayCount < len(replayMsgList):
+            scheduleDrain(True)
+            return
+
+        print(appName + ': replayed ' + str(replayCount) + ' messages received during startup', flush=True)
+        replayPhase['entries'] = replayCount
+        startupReport.end(replayPhase)
+        replayMsgList = None
+        replayCount = 0
+
+        reportStartup()
+
+    deadline = time.perf_counter() + drainBudget
+    while True:
+        try:
+            callback, dirtyPlots, header, message, arrival = \
+                    msgQueue.get_nowait()
+        except queue.Empty:
+            break
+
+        applyMessage(callback, dirtyPlots, header, message, arrival)
+        if time.perf_counter() >= deadline:
+            break
+
+    if timingInterval>0 and hotPath.secondsSinceReport()>=timingInterval:
+        reportHotPath()
+
+    if metricsPublisher and metricsPublisher.due():
+        publishMetrics()
+
+    scheduleDrain(not msgQueue.empty())
+
+
+def scheduleDrain(backlogFlag):
+    # while messages are left over the next check runs as soon as Tk has
+    # handled pending events and redraws rather than a full interval later
+    if uiDrainTimer is not None:
+        uiDrainTimer.interval = 0 if backlogFlag else drainInterval
+
+
+def applyMessage(callback, dirtyPlots, header, message, arrival):
+    start = time.perf_counter()
+    callback(header, message)
+    hotPath.endMessage(start)
+
+    markPlotsDirty(*dirtyPlots)
+    if 'est' in dirtyPlots and not headlessFlag:
+        renderWaitList.append(arrival)
+
+
+def publishMetrics():
+    # snapshot of the ingest and render telemetry for the metrics endpoint
+    # or file, taken on the GUI thread that changes it
+    prom = PrometheusText('state_plotter_')
+    with hotPath.lock:
+        counterDict = dict(hotPath.counterDict)
+
+    prom.metric('messages_total', 'counter',
+                'Messages received from each topic.',
+                [({'topic': name[len('messages '):]}, value)
+                 for name, value in sorted(counterDict.items())
+                 if name.startswith('messages ')])
+    prom.metric('pairs_total', 'counter',
+                'Bus,phase pair values appended to the plotted data.',
+                [({}, counterDict.get('pairs', 0))])
+    prom.metric('queue_depth', 'gauge',
+                'Messages waiting to be processed, including those held '
+                'during startup.',
+                [({}, msgQueue.qsize() + len(startupMsgList or ()) +
+                      len(replayMsgList or ()) - replayCount)])
+    prom.metric('unmatched_estimates_total', 'counter',
+                'Estimates disregarded for missing measurements.',
+                [({}, measJoin.unmatchedEstCount)])
+    prom.metric('unmatched_measurements_total', 'counter',
+                'Measurements discarded without a matching estimate.',
+                [({'stream': 'simulation'}, measJoin.unmatchedSimCount),
+                 ({'stream': 'sensor'}, measJoin.unmatchedSenCount)])
+    prom.metric('late_measurements_total', 'counter',
+                'Measurements arriving after their timestamp was passed.',
+                [({}, measJoin.lateCount)])
+    prom.metric('startup_dropped_total', 'counter',
+                'Messages dropped from the startup buffer.',
+                [({}, startupDropCount)])
+    prom.metric('join_buffer_timestamps', 'gauge',
+                'Measurement timestamps held waiting for estimates.',
+                [({'stream': 'simulation'}, len(measJoin.simRing)),
+                 ({'stream': 'sensor'}, len(measJoin.senRing))])
+    prom.metric('series', 'gauge', 'Plotted series in each store.',
+                [({'store': store.name}, len(store.keys()))
+                 for store in (measStore, estStore, diffMeasStore,
+                               diffEstStore)])
+    prom.metric('stored_timestamps', 'gauge',
+                'Timestamps of plotted data in each store.',
+                [({'store': store.name}, len(store))
+                 for store in (measStore, estStore, diffMeasStore,
+                               diffEstStore)])
+    prom.metric('resident_memory_bytes', 'gauge',
+                'Process resident set size.', [({}, residentBytes())])
+    prom.histogram('stage_seconds',
+                   'Wall time of each message and redraw stage, with '
+                   'est_to_render from an estimate arriving until it has '
+                   'been drawn.',
+                   [({'stage': stage}, hist)
+                    for stage, hist in hotPath.histDict.items()])
+    prom.metric('metrics_timestamp_seconds', 'gauge',
+                'Time these metrics were taken.', [({}, time.time())])
+
+    error = metricsPublisher.update(prom.text())
+    if error:
+        print(appName + ': WARNING: unable to write metrics file: ' + error, flush=True)
+
+
+def reportHotPath():
+    # rates and stage timings since the last report along with the join
+    # buffer and startup totals
+    for line in hotPath.report({
+            'queued': msgQueue.qsize(),
+            'unmatched estimates': measJoin.unmatchedEstCount,
+            'unmatched measurements': measJoin.unmatchedSimCount +
+                                      measJoin.unmatchedSenCount,
+            'late measurements': measJoin.lateCount,
+            'dropped at startup': startupDropCount}):
+        print(appName + ': timing ' + line, flush=True)
+
+
+def recordLoop():
+    # with -record the main thread drains the queue in place of the GUI
+    # timer until interrupted, the metadata queries fail or everything from
+    # a -replay journal or -synthetic feeder has been processed
+    while True:
+        feedDoneFlag = feedDoneEvent.is_set()
+        drainQueueCallback()
+        if startupError and startupMsgList is None:
+            return
+        if feedDoneFlag and startupMsgList is None and \
+           replayMsgList is None and msgQueue.empty():
+            return
+        if replayMsgList is None and msgQueue.empty():
+            time.sleep(drainInterval/1000)
+
+
+def markPlotsDirty(*plots):
+    plotDirtySet.update(plots)
+
+
+def redrawPlotsCallback():
+    # runs at most plotFrameRate times per second so any number of messages
+    # and slider changes since the last frame result in a single redraw
+    if len(plotDirtySet) == 0:
+        return
+
+    start = time.perf_counter()
+
+    if 'meas' in plotDirtySet:
+        # also updates the measurement lines of the difference plot
+        plotMeasurementData()
+
+    if 'est' in plotDirtySet:
+        # also updates the estimate lines of the difference plot
+        plotEstimateData()
+
+    elif 'diff' in plotDirtySet and 'meas' not in plotDirtySet:
+        # only the difference plot zoom or pan changed
+        autoscaleStart = time.perf_counter()
+        setDiffYLimits()
+        hotPath.record('autoscale', autoscaleStart)
+
+    plotDirtySet.clear()
+
+    # flush all the plot changes
+    updatePlots()
+
+    hotPath.endFrame(start)
+    for arrival in renderWaitList:
+        hotPath.recordLatency(arrival)
+    renderWaitList.clear()
 
 
 def yAxisLimits(yMin, yMax, zoomVal, panVal):
@@ -1791,9 +1770,29 @@ def yAxisLimits(yMin, yMax, zoomVal, panVal):
     return newYmin, newYmax
 
 
+def setDiffYLimits():
+    # compare estimate with measurement min/max to get overall min/max
+    diffYmin = min(estDiffYmin, measDiffYmin)
+    diffYmax = max(estDiffYmax, measDiffYmax)
+
+    newDiffYmin, newDiffYmax = yAxisLimits(diffYmin, diffYmax, uiDiffZoomSldr.val, uiDiffPanSldr.val)
+
+    if not plotOverlayFlag and plotMagFlag:
+        # always show 0% lower limit for magnitude % difference plots
+        # when the upper limit drops below 1%, force it to 1%
+        if newDiffYmax < 1.0:
+            newDiffYmin, newDiffYmax = yAxisLimits(0.0, 1.0, uiDiffZoomSldr.val, uiDiffPanSldr.val)
+        else:
+            newDiffYmin, newDiffYmax = yAxisLimits(0.0, diffYmax, uiDiffZoomSldr.val, uiDiffPanSldr.val)
+
+    uiDiffAx.set_ylim(newDiffYmin, newDiffYmax)
+
+
 def updatePlots():
     # now just do this to cause a redraw
+    start = time.perf_counter()
     plotFig.canvas.draw_idle()
+    hotPath.record('draw', start)
 
     # but I used to do all of these instead, but it doesn't seem to
     # make a difference and the draw_idle() call seems more CPU friendly
@@ -1806,209 +1805,131 @@ def updatePlots():
     # plotFig.canvas.flush_events()
 
 
-def tsSlice(tsDataList, tsXmin, tsXmax):
-    tsStartpt = 0
-    if tsXmin > 0:
-        # don't assume 3 timesteps between points, calculate startpt
-        #tsStartpt = int(tsXmin/3.0)
-        for ix in range(len(tsDataList)):
-            #print(appName + ': tsStartpt ix: ' + str(ix) + ', tsDataList: ' + str(tsDataList[ix]), flush=True)
-            if tsDataList[ix] >= tsXmin:
-                # if it's feasible, set starting point to 1 before the
-                # calculated point so there is no data gap at the left edge
-                if ix > 1:
-                    tsStartpt = ix - 1
-                #print(appName + ': tsStartpt break ix: ' + str(ix) + ', tsDataList: ' + str(tsDataList[ix]), flush=True)
-                break
-
-    # don't assume 3 timesteps between points, calculate endpt
-    #tsEndpt = int(tsXmax/3.0) + 1
-    tsEndpt = 0
-    if tsXmax > 0:
-        tsEndpt = len(tsDataList)-1
-        for ix in range(tsEndpt,-1,-1):
-            #print(appName + ': tsEndpt ix: ' + str(ix) + ', tsDataList: ' + str(tsDataList[ix]), flush=True)
-            if tsDataList[ix] <= tsXmax:
-                # if it's feasible, set ending point to 1 after the calculated
-                # point so there is no data gap at the right edge
-                if ix < tsEndpt:
-                    tsEndpt = ix + 1
-                #print(appName + ': tsEndpt break ix: ' + str(ix) + ', tsDataList: ' + str(tsDataList[ix]), flush=True)
-                break
-
-    # always add 1 to endpt because array slice uses -1 for upper bound
-    tsEndpt += 1
-    #print(appName + ': tsStartpt: ' + str(tsStartpt), flush=True)
-    #print(appName + ': tsEndpt: ' + str(tsEndpt) + '\n', flush=True)
+def tsWindowLimits(xMax):
+    # determine the time range to display from the zoom and pan sliders
+    # given the latest timestamp available
+    tsZoom = int(uiTSZoomSldr.val)
+    tsPan = int(uiTSPanSldr.val)
+    if tsPan == 100:
+        # this fills data from the right
+        tsXmax = xMax
+        tsXmin = tsXmax - tsZoom
+
+        # uncomment this code if filling from the left is preferred
+        #if tsXmin < 0:
+        #    tsXmin = 0
+        #    tsXmax = tsZoom
+    elif tsPan == 0:
+        tsXmin = 0
+        tsXmax = tsZoom
+    else:
+        tsMid = int(xMax*tsPan/100.0)
+        tsXmin = int(tsMid - tsZoom/2.0)
+        tsXmax = tsXmin + tsZoom
+        # this fills data from the right
+        if tsXmax > xMax:
+            tsXmax = xMax
+            tsXmin = tsXmax - tsZoom
+        elif tsXmin < 0:
+            tsXmin = 0
+            tsXmax = tsZoom
+        # if filling from the left is preferred uncomment the lines
+        # below and comment out the block if/elif block above
+        #if tsXmin < 0:
+        #    tsXmax = xMax
+        #    tsXmin = tsXmax - tsZoom
+        #elif tsXmax > xMax:
+        #    tsXmin = 0
+        #    tsXmax = tsZoom
 
-    return tsStartpt, tsEndpt
+    #print(appName + ': tsXmin: ' + str(tsXmin), flush=True)
+    #print(appName + ': tsXmax: ' + str(tsXmax), flush=True)
+    return tsXmin, tsXmax
 
 
 def plotMeasurementData():
     global measDiffYmin, measDiffYmax
 
-    measDataFlag = False
     diffMeasDataFlag = False
 
-    if plotShowAllFlag:
-        measXmax = -sys.float_info.max
-        measYmax = -sys.float_info.max
-        measYmin = sys.float_info.max
-        for pair in measDataDict:
-            if len(measDataDict[pair]) > 0:
-                measDataFlag = True
-                measLinesDict[pair].set_data(tsMeasDataDict[pair], measDataDict[pair])
-                measXmax = max(measXmax, int(tsMeasDataDict[pair][-1]))
-                measYmin = min(measYmin, min(measDataDict[pair]))
-                measYmax = max(measYmax, max(measDataDict[pair]))
-
-                if pair in plotBusDict and \
-                   plotBusDict[pair] not in measLegendLabelList:
-                    measLegendLabelList.append(plotBusDict[pair])
-                    measLegendLineList.append(measLinesDict[pair])
-
-        #print(appName + ': measYmin: ' + str(measYmin) + ', measYmax: ' + str(measYmax), flush=True)
-
-        #if plotStatsFlag:
-        #    plt.sca(uiMeasAx)
-        #    if len(measDataDict['Mean']) > 0:
-                # disable filling between lines because it's too much work
-                # for big models and causes matplotlib to freeze
-                #plt.fill_between(x=tsMeasDataDict['Mean'], y1=measDataDict['Mean'], y2=measDataDict['Stdev Low'], color=stdevBlue)
-                #plt.fill_between(x=tsMeasDataDict['Mean'], y1=measDataDict['Mean'], y2=measDataDict['Stdev High'], color=stdevBlue)
-                #plt.fill_between(x=tsMeasDataDict['Stdev Low'], y1=measDataDict['Stdev Low'], y2=measDataDict['Min'], color=minmaxBlue)
-                #plt.fill_between(x=tsMeasDataDict['Stdev High'], y1=measDataDict['Stdev High'], y2=measDataDict['Max'], color=minmaxBlue)
-
-        if measDataFlag:
-            uiMeasAx.set_xlim(0, measXmax)
-        else:
-            return;
-
-        if plotOverlayFlag:
-            measDiffYmin = measYmin
-            measDiffYmax = measYmax
+    # nothing to plot until the first timestamp has been stored
+    if measStore.visibleLen() == 0:
+        return
 
-            for pair in measDataDict:
-                if len(measDataDict[pair]) > 0:
-                    diffMeasDataFlag = True
-                    diffMeasLinesDict[pair+' Actual'].set_data(tsMeasDataDict[pair], measDataDict[pair])
+    measXmax = int(measStore.lastTS())
 
-        else:
-            measDiffYmin = sys.float_info.max
-            measDiffYmax = -sys.float_info.max
+    if plotShowAllFlag:
+        tsMeasStartpt = 0
+        tsMeasEndpt = measStore.visibleLen()
+        diffTSMeasStartpt = 0
+        diffTSMeasEndpt = diffMeasStore.visibleLen()
 
-            for pair in diffMeasDataDict:
-                if len(diffMeasDataDict[pair]) > 0:
-                    diffMeasDataFlag = True
-                    diffMeasLinesDict[pair].set_data(tsDiffMeasDataDict[pair], diffMeasDataDict[pair])
-                    measDiffYmin = min(measDiffYmin, min(diffMeasDataDict[pair]))
-                    measDiffYmax = max(measDiffYmax, max(diffMeasDataDict[pair]))
-        #print(appName + ': measDiffYmin: ' + str(measDiffYmin) + ', measDiffYmax: ' + str(measDiffYmax), flush=True)
+        uiMeasAx.set_xlim(0, measXmax)
 
     else:
-        measXmax = -sys.float_info.max
-        for pair in measDataDict:
-            if len(measDataDict[pair]) > 0:
-                measDataFlag = True
-                measXmax = max(measXmax, int(tsMeasDataDict[pair][-1]))
-
-        if not measDataFlag:
-            return
+        tsXmin, tsXmax = tsWindowLimits(measXmax)
+        uiMeasAx.set_xlim(tsXmin, tsXmax)
 
-        tsZoom = int(uiTSZoomSldr.val)
-        tsPan = int(uiTSPanSldr.val)
-        if tsPan == 100:
-            # this fills data from the right
-            tsXmax = measXmax
-            tsXmin = tsXmax - tsZoom
+        # the timestamp axis is shared by all series in a store so the
+        # window only needs to be determined once per store
+        tsMeasStartpt, tsMeasEndpt = measStore.window(tsXmin, tsXmax)
+        diffTSMeasStartpt, diffTSMeasEndpt = diffMeasStore.window(tsXmin, tsXmax)
 
-            # uncomment this code if filling from the left is preferred
-            #if tsXmin < 0:
-            #    tsXmin = 0
-            #    tsXmax = tsZoom
-        elif tsPan == 0:
-            tsXmin = 0
-            tsXmax = tsZoom
-        else:
-            tsMid = int(measXmax*tsPan/100.0)
-            tsXmin = int(tsMid - tsZoom/2.0)
-            tsXmax = tsXmin + tsZoom
-            # this fills data from the right
-            if tsXmax > measXmax:
-                tsXmax = measXmax
-                tsXmin = tsXmax - tsZoom
-            elif tsXmin < 0:
-                tsXmin = 0
-                tsXmax = tsZoom
-            # if filling from the left is preferred uncomment the lines
-            # below and comment out the block if/elif block above
-            #if tsXmin < 0:
-            #    tsXmax = measXmax
-            #    tsXmin = tsXmax - tsZoom
-            #elif tsXmax > measXmax:
-            #    tsXmin = 0
-            #    tsXmax = tsZoom
+    # long time ranges are decimated to about two points per pixel
+    pixels = int(uiMeasAx.bbox.width)
 
-        uiMeasAx.set_xlim(tsXmin, tsXmax)
-        #print(appName + ': tsXmin: ' + str(tsXmin), flush=True)
-        #print(appName + ': tsXmax: ' + str(tsXmax), flush=True)
-
-        measYmax = -sys.float_info.max
-        measYmin = sys.float_info.max
-        for pair in measDataDict:
-            tsStartpt, tsEndpt = tsSlice(tsMeasDataDict[pair], tsXmin, tsXmax)
-
-            if len(measDataDict[pair][tsStartpt:tsEndpt]) > 0:
-                measDataFlag = True
-                measLinesDict[pair].set_data(tsMeasDataDict[pair][tsStartpt:tsEndpt], measDataDict[pair][tsStartpt:tsEndpt])
-                measYmin = min(measYmin, min(measDataDict[pair][tsStartpt:tsEndpt]))
-                measYmax = max(measYmax, max(measDataDict[pair][tsStartpt:tsEndpt]))
-
-                if pair in plotBusDict and \
-                   plotBusDict[pair] not in measLegendLabelList:
-                    measLegendLineList.append(measLinesDict[pair])
-                    measLegendLabelList.append(plotBusDict[pair])
-        #print(appName + ': measYmin: ' + str(measYmin) + ', measYmax: ' + str(measYmax), flush=True)
-
-        #if plotStatsFlag:
-        #    plt.sca(uiMeasAx)
-        #    if len(measDataDict['Mean'][tsStartpt:tsEndpt]) > 0:
-                # disable filling between lines because it's too much work
-                # for big models and causes matplotlib to freeze
-                #plt.fill_between(x=tsMeasDataDict['Mean'][tsStartpt:tsEndpt], y1=measDataDict['Mean'][tsStartpt:tsEndpt], y2=measDataDict['Stdev Low'][tsStartpt:tsEndpt], color=stdevBlue)
-                #plt.fill_between(x=tsMeasDataDict['Mean'][tsStartpt:tsEndpt], y1=measDataDict['Mean'][tsStartpt:tsEndpt], y2=measDataDict['Stdev High'][tsStartpt:tsEndpt], color=stdevBlue)
-                #plt.fill_between(x=tsMeasDataDict['Stdev Low'][tsStartpt:tsEndpt], y1=measDataDict['Stdev Low'][tsStartpt:tsEndpt], y2=measDataDict['Min'][tsStartpt:tsEndpt], color=minmaxBlue)
-                #plt.fill_between(x=tsMeasDataDict['Stdev High'][tsStartpt:tsEndpt], y1=measDataDict['Stdev High'][tsStartpt:tsEndpt], y2=measDataDict['Max'][tsStartpt:tsEndpt], color=minmaxBlue)
-
-        measDiffYmax = -sys.float_info.max
-        measDiffYmin = sys.float_info.max
+    start = time.perf_counter()
+    for pair, tsPairData, pairData in measStore.views(tsMeasStartpt, tsMeasEndpt,
+                                                    pixels):
+        # the same view is shared by the lines of both plots for the pair
+        measLinesDict[pair].set_data(tsPairData, pairData)
         if plotOverlayFlag:
-            for pair in measDataDict:
-                tsStartpt, tsEndpt = tsSlice(tsMeasDataDict[pair],
-                                             tsXmin, tsXmax)
+            diffMeasLinesDict[pair+' Actual'].set_data(tsPairData, pairData)
+
+        if pair in plotBusDict and \
+           plotBusDict[pair] not in measLegendLabelList:
+            measLegendLineList.append(measLinesDict[pair])
+            measLegendLabelList.append(plotBusDict[pair])
+    hotPath.record('set_data', start)
+
+    start = time.perf_counter()
+    measYmin, measYmax = measStore.extrema(tsMeasStartpt, tsMeasEndpt)
+    #print(appName + ': measYmin: ' + str(measYmin) + ', measYmax: ' + str(measYmax), flush=True)
+
+    #if plotStatsFlag:
+    #    plt.sca(uiMeasAx)
+    #    if tsMeasEndpt > tsMeasStartpt:
+            # disable filling between lines because it's too much work
+            # for big models and causes matplotlib to freeze
+            #plt.fill_between(x=measStore.tsView(tsMeasStartpt, tsMeasEndpt), y1=measStore.seriesView('Mean', tsMeasStartpt, tsMeasEndpt), y2=measStore.seriesView('Stdev Low', tsMeasStartpt, tsMeasEndpt), color=stdevBlue)
+            #plt.fill_between(x=measStore.tsView(tsMeasStartpt, tsMeasEndpt), y1=measStore.seriesView('Mean', tsMeasStartpt, tsMeasEndpt), y2=measStore.seriesView('Stdev High', tsMeasStartpt, tsMeasEndpt), color=stdevBlue)
+            #plt.fill_between(x=measStore.tsView(tsMeasStartpt, tsMeasEndpt), y1=measStore.seriesView('Stdev Low', tsMeasStartpt, tsMeasEndpt), y2=measStore.seriesView('Min', tsMeasStartpt, tsMeasEndpt), color=minmaxBlue)
+            #plt.fill_between(x=measStore.tsView(tsMeasStartpt, tsMeasEndpt), y1=measStore.seriesView('Stdev High', tsMeasStartpt, tsMeasEndpt), y2=measStore.seriesView('Max', tsMeasStartpt, tsMeasEndpt), color=minmaxBlue)
+
+    if plotOverlayFlag:
+        measDiffYmin = measYmin
+        measDiffYmax = measYmax
 
-                if len(measDataDict[pair][tsStartpt:tsEndpt]) > 0:
-                    diffMeasDataFlag = True
-                    diffMeasLinesDict[pair+' Actual'].set_data(tsMeasDataDict[pair][tsStartpt:tsEndpt], measDataDict[pair][tsStartpt:tsEndpt])
-                    measDiffYmin = min(measDiffYmin, min(measDataDict[pair][tsStartpt:tsEndpt]))
-                    measDiffYmax = max(measDiffYmax, max(measDataDict[pair][tsStartpt:tsEndpt]))
+        if tsMeasEndpt > tsMeasStartpt:
+            diffMeasDataFlag = True
 
-        else:
-            for pair in diffMeasDataDict:
-                tsStartpt, tsEndpt = tsSlice(tsDiffMeasDataDict[pair],
-                                             tsXmin, tsXmax)
+    else:
+        measDiffYmin, measDiffYmax = diffMeasStore.extrema(diffTSMeasStartpt,
+                                                     diffTSMeasEndpt)
+        hotPath.record('autoscale', start)
 
-                if len(diffMeasDataDict[pair][tsStartpt:tsEndpt]) > 0:
-                    diffMeasDataFlag = True
-                    diffMeasLinesDict[pair].set_data(tsDiffMeasDataDict[pair][tsStartpt:tsEndpt], diffMeasDataDict[pair][tsStartpt:tsEndpt])
-                    measDiffYmin = min(measDiffYmin, min(diffMeasDataDict[pair][tsStartpt:tsEndpt]))
-                    measDiffYmax = max(measDiffYmax, max(diffMeasDataDict[pair][tsStartpt:tsEndpt]))
+        if diffTSMeasEndpt > diffTSMeasStartpt:
+            diffMeasDataFlag = True
+            start = time.perf_counter()
+            for pair, tsPairData, pairData in diffMeasStore.views(
+                    diffTSMeasStartpt, diffTSMeasEndpt, pixels):
+                diffMeasLinesDict[pair].set_data(tsPairData, pairData)
+            hotPath.record('set_data', start)
 
-        #print(appName + ': measDiffYmin: ' + str(measDiffYmin) + ', measDiffYmax: ' + str(measDiffYmax), flush=True)
+        start = time.perf_counter()
+    #print(appName + ': measDiffYmin: ' + str(measDiffYmin) + ', measDiffYmax: ' + str(measDiffYmax), flush=True)
 
     # measurement voltage value plot y-axis zoom and pan calculation
-    if not measDataFlag:
-        print(appName + ': NOTE: no measurement voltage value data to plot yet\n', flush=True)
     #print(appName + ': measurement voltage value y-axis limits...', flush=True)
     newMeasYmin, newMeasYmax = yAxisLimits(measYmin, measYmax, uiMeasZoomSldr.val, uiMeasPanSldr.val)
     uiMeasAx.set_ylim(newMeasYmin, newMeasYmax)
@@ -2017,22 +1938,8 @@ def plotMeasurementData():
 
     if diffMeasDataFlag:
         # voltage value difference plot y-axis zoom and pan calculation
-
-        # compare estimate with measurement min/max to get overall min/max
-        diffYmin = min(estDiffYmin, measDiffYmin)
-        diffYmax = max(estDiffYmax, measDiffYmax)
-
-        newDiffYmin, newDiffYmax = yAxisLimits(diffYmin, diffYmax, uiDiffZoomSldr.val, uiDiffPanSldr.val)
-
-        if not plotOverlayFlag and plotMagFlag:
-            # always show 0% lower limit for magnitude % difference plots
-            # when the upper limit drops below 1%, force it to 1%
-            if newDiffYmax < 1.0:
-                newDiffYmin, newDiffYmax = yAxisLimits(0.0, 1.0, uiDiffZoomSldr.val, uiDiffPanSldr.val)
-            else:
-                newDiffYmin, newDiffYmax = yAxisLimits(0.0, diffYmax, uiDiffZoomSldr.val, uiDiffPanSldr.val)
-
-        uiDiffAx.set_ylim(newDiffYmin, newDiffYmax)
+        setDiffYLimits()
+    hotPath.record('autoscale', start)
 
     # even though we aren't updating the estimate plot and may not be updating
     # the difference plot, the formatter and grid calls will make the plot
@@ -2061,169 +1968,88 @@ def plotMeasurementData():
                 cols = math.ceil((len(diffMeasLinesDict) + len(diffEstLinesDict))/8)
                 uiDiffAx.legend(ncol=cols)
 
-    # flush all the plot changes
-    updatePlots()
-
 
 def plotEstimateData():
     global estDiffYmin, estDiffYmax
 
-    estDataFlag = False
     diffEstDataFlag = False
 
-    if plotShowAllFlag:
-        estXmax = -sys.float_info.max
-        estYmax = -sys.float_info.max
-        estYmin = sys.float_info.max
-        for pair in estDataDict:
-            if len(estDataDict[pair]) > 0:
-                estDataFlag = True
-                estLinesDict[pair].set_data(tsEstDataDict[pair], estDataDict[pair])
-                estXmax = max(estXmax, int(tsEstDataDict[pair][-1]))
-                estYmin = min(estYmin, min(estDataDict[pair]))
-                estYmax = max(estYmax, max(estDataDict[pair]))
-
-                if pair in plotBusDict and \
-                   plotBusDict[pair] not in estLegendLabelList:
-                    estLegendLabelList.append(plotBusDict[pair])
-                    estLegendLineList.append(estLinesDict[pair])
-        #print(appName + ': estYmin: ' + str(estYmin) + ', estYmax: ' + str(estYmax), flush=True)
-
-        #if plotStatsFlag:
-        #    plt.sca(uiEstAx)
-        #    if len(estDataDict['Mean']) > 0:
-                # disable filling between lines because it's too much work
-                # for big models and causes matplotlib to freeze
-                #plt.fill_between(x=tsEstDataDict['Mean'], y1=estDataDict['Mean'], y2=estDataDict['Stdev Low'], color=stdevBlue)
-                #plt.fill_between(x=tsEstDataDict['Mean'], y1=estDataDict['Mean'], y2=estDataDict['Stdev High'], color=stdevBlue)
-                #plt.fill_between(x=tsEstDataDict['Stdev Low'], y1=estDataDict['Stdev Low'], y2=estDataDict['Min'], color=minmaxBlue)
-                #plt.fill_between(x=tsEstDataDict['Stdev High'], y1=estDataDict['Stdev High'], y2=estDataDict['Max'], color=minmaxBlue)
-
-        if estDataFlag:
-            uiEstAx.set_xlim(0, estXmax)
-        else:
-            return;
-
-        if plotOverlayFlag:
-            estDiffYmin = estYmin
-            estDiffYmax = estYmax
+    # nothing to plot until the first timestamp has been stored
+    if estStore.visibleLen() == 0:
+        return
 
-            for pair in estDataDict:
-                if len(estDataDict[pair]) > 0:
-                    diffEstDataFlag = True
-                    diffEstLinesDict[pair+' Est'].set_data(tsEstDataDict[pair], estDataDict[pair])
+    estXmax = int(estStore.lastTS())
 
-        else:
-            estDiffYmin = sys.float_info.max
-            estDiffYmax = -sys.float_info.max
+    if plotShowAllFlag:
+        tsEstStartpt = 0
+        tsEstEndpt = estStore.visibleLen()
+        diffTSEstStartpt = 0
+        diffTSEstEndpt = diffEstStore.visibleLen()
 
-            for pair in diffEstDataDict:
-                if len(diffEstDataDict[pair]) > 0:
-                    diffEstDataFlag = True
-                    diffEstLinesDict[pair].set_data(tsDiffEstDataDict[pair], diffEstDataDict[pair])
-                    estDiffYmin = min(estDiffYmin, min(diffEstDataDict[pair]))
-                    estDiffYmax = max(estDiffYmax, max(diffEstDataDict[pair]))
-        #print(appName + ': estDiffYmin: ' + str(estDiffYmin) + ', estDiffYmax: ' + str(estDiffYmax), flush=True)
+        uiEstAx.set_xlim(0, estXmax)
 
     else:
-        estXmax = -sys.float_info.max
-        for pair in estDataDict:
-            if len(estDataDict[pair]) > 0:
-                estDataFlag = True
-                estXmax = max(estXmax, int(tsEstDataDict[pair][-1]))
-
-        if not estDataFlag:
-            return
+        tsXmin, tsXmax = tsWindowLimits(estXmax)
+        uiEstAx.set_xlim(tsXmin, tsXmax)
 
-        tsZoom = int(uiTSZoomSldr.val)
-        tsPan = int(uiTSPanSldr.val)
-        if tsPan == 100:
-            # this fills data from the right
-            tsXmax = estXmax
-            tsXmin = tsXmax - tsZoom
+        # the timestamp axis is shared by all series in a store so the
+        # window only needs to be determined once per store
+        tsEstStartpt, tsEstEndpt = estStore.window(tsXmin, tsXmax)
+        diffTSEstStartpt, diffTSEstEndpt = diffEstStore.window(tsXmin, tsXmax)
 
-            # uncomment this code if filling from the left is preferred
-            #if tsXmin < 0:
-            #    tsXmin = 0
-            #    tsXmax = tsZoom
-        elif tsPan == 0:
-            tsXmin = 0
-            tsXmax = tsZoom
-        else:
-            tsMid = int(estXmax*tsPan/100.0)
-            tsXmin = int(tsMid - tsZoom/2.0)
-            tsXmax = tsXmin + tsZoom
-            # this fills data from the right
-            if tsXmax > estXmax:
-                tsXmax = estXmax
-                tsXmin = tsXmax - tsZoom
-            elif tsXmin < 0:
-                tsXmin = 0
-                tsXmax = tsZoom
-            # if filling from the left is preferred uncomment the lines
-            # below and comment out the block if/elif block above
-            #if tsXmin < 0:
-            #    tsXmax = estXmax
-            #    tsXmin = tsXmax - tsZoom
-            #elif tsXmax > estXmax:
-            #    tsXmin = 0
-            #    tsXmax = tsZoom
+    # long time ranges are decimated to about two points per pixel
+    pixels = int(uiEstAx.bbox.width)
 
-        uiEstAx.set_xlim(tsXmin, tsXmax)
-        #print(appName + ': tsXmin: ' + str(tsXmin), flush=True)
-        #print(appName + ': tsXmax: ' + str(tsXmax), flush=True)
-
-        estYmax = -sys.float_info.max
-        estYmin = sys.float_info.max
-        for pair in estDataDict:
-            tsStartpt, tsEndpt = tsSlice(tsEstDataDict[pair], tsXmin, tsXmax)
-
-            if len(estDataDict[pair][tsStartpt:tsEndpt]) > 0:
-                estLinesDict[pair].set_data(tsEstDataDict[pair][tsStartpt:tsEndpt], estDataDict[pair][tsStartpt:tsEndpt])
-                estYmin = min(estYmin, min(estDataDict[pair][tsStartpt:tsEndpt]))
-                estYmax = max(estYmax, max(estDataDict[pair][tsStartpt:tsEndpt]))
-
-                if pair in plotBusDict and \
-                   plotBusDict[pair] not in estLegendLabelList:
-                    estLegendLineList.append(estLinesDict[pair])
-                    estLegendLabelList.append(plotBusDict[pair])
-        #print(appName + ': estYmin: ' + str(estYmin) + ', estYmax: ' + str(estYmax), flush=True)
-
-        #if plotStatsFlag:
-        #    plt.sca(uiEstAx)
-        #    if len(estDataDict['Mean'][tsStartpt:tsEndpt]) > 0:
-                # disable filling between lines because it's too much work
-                # for big models and causes matplotlib to freeze
-                #plt.fill_between(x=tsEstDataDict['Mean'][tsStartpt:tsEndpt], y1=estDataDict['Mean'][tsStartpt:tsEndpt], y2=estDataDict['Stdev Low'][tsStartpt:tsEndpt], color=stdevBlue)
-                #plt.fill_between(x=tsEstDataDict['Mean'][tsStartpt:tsEndpt], y1=estDataDict['Mean'][tsStartpt:tsEndpt], y2=estDataDict['Stdev High'][tsStartpt:tsEndpt], color=stdevBlue)
-                #plt.fill_between(x=tsEstDataDict['Stdev Low'][tsStartpt:tsEndpt], y1=estDataDict['Stdev Low'][tsStartpt:tsEndpt], y2=estDataDict['Min'][tsStartpt:tsEndpt], color=minmaxBlue)
-                #plt.fill_between(x=tsEstDataDict['Stdev High'][tsStartpt:tsEndpt], y1=estDataDict['Stdev High'][tsStartpt:tsEndpt], y2=estDataDict['Max'][tsStartpt:tsEndpt], color=minmaxBlue)
-
-        estDiffYmax = -sys.float_info.max
-        estDiffYmin = sys.float_info.max
+    start = time.perf_counter()
+    for pair, tsPairData, pairData in estStore.views(tsEstStartpt, tsEstEndpt,
+                                                    pixels):
+        # the same view is shared by the lines of both plots for the pair
+        estLinesDict[pair].set_data(tsPairData, pairData)
         if plotOverlayFlag:
-            for pair in estDataDict:
-                tsStartpt, tsEndpt = tsSlice(tsEstDataDict[pair],
-                                             tsXmin, tsXmax)
+            diffEstLinesDict[pair+' Est'].set_data(tsPairData, pairData)
+
+        if pair in plotBusDict and \
+           plotBusDict[pair] not in estLegendLabelList:
+            estLegendLineList.append(estLinesDict[pair])
+            estLegendLabelList.append(plotBusDict[pair])
+    hotPath.record('set_data', start)
+
+    start = time.perf_counter()
+    estYmin, estYmax = estStore.extrema(tsEstStartpt, tsEstEndpt)
+    #print(appName + ': estYmin: ' + str(estYmin) + ', estYmax: ' + str(estYmax), flush=True)
+
+    #if plotStatsFlag:
+    #    plt.sca(uiEstAx)
+    #    if tsEstEndpt > tsEstStartpt:
+            # disable filling between lines because it's too much work
+            # for big models and causes matplotlib to freeze
+            #plt.fill_between(x=estStore.tsView(tsEstStartpt, tsEstEndpt), y1=estStore.seriesView('Mean', tsEstStartpt, tsEstEndpt), y2=estStore.seriesView('Stdev Low', tsEstStartpt, tsEstEndpt), color=stdevBlue)
+            #plt.fill_between(x=estStore.tsView(tsEstStartpt, tsEstEndpt), y1=estStore.seriesView('Mean', tsEstStartpt, tsEstEndpt), y2=estStore.seriesView('Stdev High', tsEstStartpt, tsEstEndpt), color=stdevBlue)
+            #plt.fill_between(x=estStore.tsView(tsEstStartpt, tsEstEndpt), y1=estStore.seriesView('Stdev Low', tsEstStartpt, tsEstEndpt), y2=estStore.seriesView('Min', tsEstStartpt, tsEstEndpt), color=minmaxBlue)
+            #plt.fill_between(x=estStore.tsView(tsEstStartpt, tsEstEndpt), y1=estStore.seriesView('Stdev High', tsEstStartpt, tsEstEndpt), y2=estStore.seriesView('Max', tsEstStartpt, tsEstEndpt), color=minmaxBlue)
+
+    if plotOverlayFlag:
+        estDiffYmin = estYmin
+        estDiffYmax = estYmax
 
-                if len(estDataDict[pair][tsStartpt:tsEndpt]) > 0:
-                    diffEstDataFlag = True
-                    diffEstLinesDict[pair+' Est'].set_data(tsEstDataDict[pair][tsStartpt:tsEndpt], estDataDict[pair][tsStartpt:tsEndpt])
-                    estDiffYmin = min(estDiffYmin, min(estDataDict[pair][tsStartpt:tsEndpt]))
-                    estDiffYmax = max(estDiffYmax, max(estDataDict[pair][tsStartpt:tsEndpt]))
+        if tsEstEndpt > tsEstStartpt:
+            diffEstDataFlag = True
 
-        else:
-            for pair in diffEstDataDict:
-                tsStartpt, tsEndpt = tsSlice(tsDiffEstDataDict[pair],
-                                             tsXmin, tsXmax)
+    else:
+        estDiffYmin, estDiffYmax = diffEstStore.extrema(diffTSEstStartpt,
+                                                     diffTSEstEndpt)
+        hotPath.record('autoscale', start)
 
-                if len(diffEstDataDict[pair][tsStartpt:tsEndpt]) > 0:
-                    diffEstDataFlag = True
-                    diffEstLinesDict[pair].set_data(tsDiffEstDataDict[pair][tsStartpt:tsEndpt], diffEstDataDict[pair][tsStartpt:tsEndpt])
-                    estDiffYmin = min(estDiffYmin, min(diffEstDataDict[pair][tsStartpt:tsEndpt]))
-                    estDiffYmax = max(estDiffYmax, max(diffEstDataDict[pair][tsStartpt:tsEndpt]))
+        if diffTSEstEndpt > diffTSEstStartpt:
+            diffEstDataFlag = True
+            start = time.perf_counter()
+            for pair, tsPairData, pairData in diffEstStore.views(
+                    diffTSEstStartpt, diffTSEstEndpt, pixels):
+                diffEstLinesDict[pair].set_data(tsPairData, pairData)
+            hotPath.record('set_data', start)
 
-        #print(appName + ': estDiffYmin: ' + str(estDiffYmin) + ', estDiffYmax: ' + str(estDiffYmax), flush=True)
+        start = time.perf_counter()
+    #print(appName + ': estDiffYmin: ' + str(estDiffYmin) + ', estDiffYmax: ' + str(estDiffYmax), flush=True)
 
     # state-estimator voltage magnitude plot y-axis zoom and pan calculation
     #print(appName + ': state-estimator voltage value y-axis limits...', flush=True)
@@ -2237,21 +2063,8 @@ def plotEstimateData():
         print(appName + ': NOTE: no voltage value difference data to plot yet\n', flush=True)
     #print(appName + ': voltage value difference y-axis limits...', flush=True)
 
-    # compare estimate with measurement min/max to get overall min/max
-    diffYmin = min(estDiffYmin, measDiffYmin)
-    diffYmax = max(estDiffYmax, measDiffYmax)
-
-    newDiffYmin, newDiffYmax = yAxisLimits(diffYmin, diffYmax, uiDiffZoomSldr.val, uiDiffPanSldr.val)
-
-    if not plotOverlayFlag and plotMagFlag:
-        # always show 0% lower limit for magnitude % difference plots
-        # when the upper limit drops below 1%, force it to 1%
-        if newDiffYmax < 1.0:
-            newDiffYmin, newDiffYmax = yAxisLimits(0.0, 1.0, uiDiffZoomSldr.val, uiDiffPanSldr.val)
-        else:
-            newDiffYmin, newDiffYmax = yAxisLimits(0.0, diffYmax, uiDiffZoomSldr.val, uiDiffPanSldr.val)
-
-    uiDiffAx.set_ylim(newDiffYmin, newDiffYmax)
+    setDiffYLimits()
+    hotPath.record('autoscale', start)
 
     uiDiffAx.xaxis.set_major_formatter(ticker.ScalarFormatter())
     uiDiffAx.yaxis.set_major_formatter(ticker.ScalarFormatter())
@@ -2273,9 +2086,6 @@ def plotEstimateData():
                 cols = math.ceil((len(diffMeasLinesDict) + len(diffEstLinesDict))/8)
                 uiDiffAx.legend(ncol=cols)
 
-    # flush all the plot changes
-    updatePlots()
-
 
 def plotPauseCallback(event):
     global plotPausedFlag
@@ -2285,36 +2095,15 @@ def plotPauseCallback(event):
     # update the button icon
     uiPauseAx.images[0].set_data(playIcon if plotPausedFlag else pauseIcon)
 
-    if not plotPausedFlag:
-        for pair in measDataDict:
-            # add all the data that came in since the pause button was hit
-            measDataDict[pair].extend(measDataPausedDict[pair])
-            # clear the "paused" data so we build from scratch with the next pause
-            measDataPausedDict[pair].clear()
-            # now do the same extend/clear for timestamp data
-            tsMeasDataDict[pair].extend(tsMeasDataPausedDict[pair])
-            tsMeasDataPausedDict[pair].clear()
-
-        for pair in estDataDict:
-            estDataDict[pair].extend(estDataPausedDict[pair])
-            estDataPausedDict[pair].clear()
-            tsEstDataDict[pair].extend(tsEstDataPausedDict[pair])
-            tsEstDataPausedDict[pair].clear()
-
-        if not plotOverlayFlag:
-            for pair in diffMeasDataDict:
-                diffMeasDataDict[pair].extend(diffMeasDataPausedDict[pair])
-                diffMeasDataPausedDict[pair].clear()
-                tsDiffMeasDataDict[pair].extend(tsDiffMeasDataPausedDict[pair])
-                tsDiffMeasDataPausedDict[pair].clear()
-
-            for pair in diffEstDataDict:
-                diffEstDataDict[pair].extend(diffEstDataPausedDict[pair])
-                diffEstDataPausedDict[pair].clear()
-                tsDiffEstDataDict[pair].extend(tsDiffEstDataPausedDict[pair])
-                tsDiffEstDataPausedDict[pair].clear()
+    # data keeps being stored while paused, pausing just freezes how much
+    # of each store is displayed and resuming displays everything again
+    for store in [measStore, estStore, diffMeasStore, diffEstStore]:
+        if plotPausedFlag:
+            store.pause()
+        else:
+            store.resume()
 
-    plotDataCallback(None)
+    markPlotsDirty('meas', 'est', 'diff')
 
 
 def plotShowAllCallback(event):
@@ -2324,12 +2113,24 @@ def plotShowAllCallback(event):
 
     # update the button icon
     uiShowAx.images[0].set_data(checkedIcon if plotShowAllFlag else uncheckedIcon)
-    plotDataCallback(None)
+    markPlotsDirty('meas', 'est', 'diff')
 
 
 def plotDataCallback(event):
-    plotMeasurementData()
-    plotEstimateData()
+    # slider changes are coalesced until the next frame
+    markPlotsDirty('meas', 'est', 'diff')
+
+
+def plotMeasDataCallback(event):
+    markPlotsDirty('meas')
+
+
+def plotEstDataCallback(event):
+    markPlotsDirty('est')
+
+
+def plotDiffDataCallback(event):
+    markPlotsDirty('diff')
 
 
 def plotButtonPressCallback(event):
@@ -2354,6 +2155,12 @@ def plotButtonPressCallback(event):
         # separate clicks with a blank line
         print('', flush=True)
 
+def plotKeyPressCallback(event):
+    # t reports the hot path timing on demand
+    if event.key == 't':
+        reportHotPath()
+
+
 #def closeWindowCallback(event):
 #    gapps.disconnect()
 #    exit()
@@ -2381,24 +2188,190 @@ def queryBusToEst():
             "queryString": connectivity_names_query
             }
 
-    connectivity_names_response = gapps.get_response('goss.gridappsd.process.request.data.powergridmodel', connectivity_names_request, timeout=1200)
+    with startupReport.phase('estimate node query') as phase:
+        connectivity_names_response = gapps.get_response('goss.gridappsd.process.request.data.powergridmodel', connectivity_names_request, timeout=1200)
+        if startupReportPath:
+            phase['bytes'] = payloadBytes(connectivity_names_response)
+
+    with startupReport.phase('estimate node load') as phase:
+        metadata.loadEstimateNodes(connectivity_names_response['data']['results']['bindings'])
+        phase['entries'] = len(metadata.estimateNodes())
 
-    results = connectivity_names_response['data']['results']['bindings']
 
-    for node in results:
-        cnname = node['cnname']['value']
-        cnname = cnname.upper()
-        cnid = node['cnid']['value']
-        busToEstDict[cnname] = cnid
-        # add all possible pairs, which is fine even if some don't exist
-        estToBusDict[cnid+',A'] = cnname+',A'
-        estToBusDict[cnid+',B'] = cnname+',B'
-        estToBusDict[cnid+',C'] = cnname+',C'
-        estToBusDict[cnid+',S1'] = cnname+',S1'
-        estToBusDict[cnid+',S2'] = cnname+',S2'
-    print(appName + ': start bus to estimate mrid query results...', flush=True)
-    pprint.pprint(busToEstDict)
-    print(appName + ': end bus to estimate mrid query results', flush=True)
+def runStartupQueries(metadataCache):
+    global metadata
+
+    # use the tables cached by an earlier run for the model when there are
+    # any, skipping the queries altogether
+    if metadataCache:
+        with startupReport.phase('metadata cache load') as phase:
+            cachedMetadata = metadataCache.load(modelMRID)
+            if cachedMetadata:
+                phase['entries'] = sum(cachedMetadata.counts().values())
+
+        if cachedMetadata:
+            metadata = cachedMetadata
+            print(appName + ': loaded metadata from cache file ' + metadataCache.path(modelMRID) + ' in ' + str(phase['seconds']) + ' seconds', flush=True)
+            return
+
+    # the metadata queries are independent of each other so issue them at
+    # once rather than waiting on each in turn, reporting as each completes
+    queryList = [('bus to estimate mrid', queryBusToEst),
+                 ('bus to measurement mrid', queryBusToSim),
+                 ('nominal voltage', queryVnom)]
+
+    def timedQuery(query):
+        start = time.perf_counter()
+        query()
+        return time.perf_counter() - start
+
+    print(appName + ': starting ' + str(len(queryList)) + ' metadata queries', flush=True)
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=len(queryList)) as executor:
+        futureDict = {executor.submit(timedQuery, query): name
+                      for name, query in queryList}
+        doneCount = 0
+        for future in as_completed(futureDict):
+            # raises here if the query failed
+            elapsed = future.result()
+            doneCount += 1
+            print(appName + ': ' + futureDict[future] + ' query finished in ' + '{:.2f}'.format(elapsed) + ' seconds (' + str(doneCount) + ' of ' + str(len(queryList)) + ')', flush=True)
+
+    with startupReport.phase('metadata finalize'):
+        metadata.finalize()
+    print(appName + ': metadata queries finished in ' + '{:.2f}'.format(time.perf_counter() - start) + ' seconds', flush=True)
+
+    if metadataCache:
+        try:
+            with startupReport.phase('metadata cache save'):
+                metadataCache.save(modelMRID, metadata)
+            print(appName + ': saved metadata to cache file ' + metadataCache.path(modelMRID), flush=True)
+        except OSError as e:
+            # not being able to cache only costs the queries next time
+            print(appName + ': WARNING: unable to save metadata cache: ' + str(e), flush=True)
+
+
+def startupQueriesThread(metadataCache):
+    global startupError
+
+    # runs the metadata queries off the GUI thread so the plot window is
+    # shown and stays responsive while they run
+    try:
+        runStartupQueries(metadataCache)
+        if metadataDumpPath:
+            with startupReport.phase('metadata dump'):
+                dumpMetadata(metadataDumpPath)
+    except Exception as e:
+        traceback.print_exc()
+        startupError = e
+    startupDoneEvent.set()
+
+
+def replayOrder(item):
+    # buffered messages by timestamp with estimates after the measurements
+    # they are joined with, however they were interleaved on arrival
+    callback, dirtyPlots, header, message, arrival = item
+    return message['message']['timestamp'], 'est' in dirtyPlots
+
+
+def releaseStartupMessages():
+    global startupMsgList, replayMsgList, replayPhase
+
+    # hand messages buffered during startup to the GUI thread, after which
+    # the listener thread queues directly to msgQueue
+    replayPhase = startupReport.begin('message replay')
+    with startupLock:
+        replayMsgList = sorted(startupMsgList, key=replayOrder)
+        startupMsgList = None
+
+    if startupDropCount > 0:
+        print(appName + ': WARNING: dropped the oldest ' + str(startupDropCount) + ' messages received during startup, increase -startupbuffer to keep them', flush=True)
+    print(appName + ': replaying ' + str(len(replayMsgList)) + ' messages received during startup', flush=True)
+
+
+def finishStartup():
+    global startupMsgList
+
+    # run on the GUI thread once the startup queries are done to complete
+    # the plot setup that depends on the metadata
+    if startupError:
+        print(appName + ': exiting because the metadata queries failed', flush=True)
+        with startupLock:
+            startupMsgList = None
+        if not headlessFlag:
+            plt.close(plotFig)
+        return
+
+    with startupReport.phase('join plan') as phase:
+        if plotConfigFlag or len(plotBusList)>0:
+            # determine what to plot based on the state-plotter-config file
+            # and finish plot initialization
+            configPlot(plotBusList)
+
+        # resolve estimate to measurement joins now that the metadata and
+        # plot configuration are known
+        compileJoinPlan()
+        phase['entries'] = len(busJoinPlanDict)
+
+    if not headlessFlag:
+        uiStartupText.remove()
+        markPlotsDirty('meas', 'est', 'diff')
+
+    releaseStartupMessages()
+
+
+def compileJoinPlan():
+    global planVnomArray
+
+    # resolve the bus,phase pair, measurement mRIDs, nominal voltage and
+    # store rows for each estimate (ConnectivityNode, phase) and each
+    # measured bus,phase pair once so messages don't need to look them up
+    # for every timestamp
+    pairEntryDict = {}
+    vnomList = []
+
+    def addEntry(cnid, key):
+        buspair = metadata.pairName(*key)
+        phase = metadata.phaseList[key[1]]
+        vnom = metadata.vnom(*key, plotMagFlag) if plotCompFlag else None
+        plotFlag = len(plotPhaseList)==0 or phase in plotPhaseList
+        entry = JoinPlanEntry(cnid, phase, buspair, len(vnomList),
+                              tuple(metadata.measMRIDs(key)), vnom, plotFlag)
+        vnomList.append(math.nan if vnom is None else vnom)
+
+        # series already created by configPlot
+        if buspair in measStore:
+            entry.measRow = measStore.addSeries(buspair)
+        if buspair+' Meas' in diffMeasStore:
+            entry.diffMeasRow = diffMeasStore.addSeries(buspair+' Meas')
+        if buspair in estStore:
+            entry.estRow = estStore.addSeries(buspair)
+        if buspair+' Est' in diffEstStore:
+            entry.diffEstRow = diffEstStore.addSeries(buspair+' Est')
+
+        pairEntryDict[key] = entry
+        busJoinPlanDict[buspair] = entry
+        return entry
+
+    for busId, cnid in metadata.estimateNodes():
+        # all possible phases, which is fine even if some don't exist
+        for code, phase in enumerate(PHASE_LIST):
+            estJoinPlanDict[(cnid, phase)] = addEntry(cnid, (busId, code))
+
+    # measured bus,phase pairs without a state estimate node
+    for key in metadata.pairMeasDict:
+        if key not in pairEntryDict:
+            addEntry(None, key)
+
+    for measmrid, busId, code in zip(metadata.measMRIDList,
+                                     metadata.measBusArray,
+                                     metadata.measPhaseArray):
+        measJoinPlanDict[measmrid] = pairEntryDict[(busId, code)]
+
+    planVnomArray = np.array(vnomList, dtype=float)
+
+    print(appName + ': compiled join plan for ' + str(len(estJoinPlanDict)) + ' estimate node,phase pairs and ' + str(len(measJoinPlanDict)) + ' measurements', flush=True)
 
 
 def initPlot(configFlag):
@@ -2409,6 +2382,7 @@ def initPlot(configFlag):
     global uiDiffAx, uiDiffZoomSldr, uiDiffPanSldr
     global uiPauseBtn, uiPauseAx, pauseIcon, playIcon
     global uiShowBtn, uiShowAx, checkedIcon, uncheckedIcon
+    global uiDrainTimer, uiRedrawTimer, uiStartupText
 
     # customize navigation toolbar
     # get rid of the toolbar buttons completely
@@ -2534,31 +2508,46 @@ def initPlot(configFlag):
     # measurement voltage value slice zoom and pan sliders
     uiMeasZoomAx = plt.axes([0.97, 0.87, 0.012, 0.09])
     uiMeasZoomSldr = Slider(uiMeasZoomAx, '  zoom', 1, 100, valinit=100, valfmt='%d', valstep=1.0, orientation='vertical')
-    uiMeasZoomSldr.on_changed(plotDataCallback)
+    uiMeasZoomSldr.on_changed(plotMeasDataCallback)
 
     uiMeasPanAx = plt.axes([0.97, 0.72, 0.012, 0.09])
     uiMeasPanSldr = Slider(uiMeasPanAx, 'pan', 0, 100, valinit=50, valfmt='%d', valstep=1.0, orientation='vertical')
-    uiMeasPanSldr.on_changed(plotDataCallback)
+    uiMeasPanSldr.on_changed(plotMeasDataCallback)
 
     # state-estimator voltage value slice zoom and pan sliders
     uiEstZoomAx = plt.axes([0.97, 0.56, 0.012, 0.09])
     uiEstZoomSldr = Slider(uiEstZoomAx, '  zoom', 1, 100, valinit=100, valfmt='%d', valstep=1.0, orientation='vertical')
-    uiEstZoomSldr.on_changed(plotDataCallback)
+    uiEstZoomSldr.on_changed(plotEstDataCallback)
 
     uiEstPanAx = plt.axes([0.97, 0.41, 0.012, 0.09])
     uiEstPanSldr = Slider(uiEstPanAx, 'pan', 0, 100, valinit=50, valfmt='%d', valstep=1.0, orientation='vertical')
-    uiEstPanSldr.on_changed(plotDataCallback)
+    uiEstPanSldr.on_changed(plotEstDataCallback)
 
     # voltage value difference slice zoom and pan sliders
     uiDiffZoomAx = plt.axes([0.97, 0.26, 0.012, 0.09])
     uiDiffZoomSldr = Slider(uiDiffZoomAx, '  zoom', 1, 100, valinit=100, valfmt='%d', valstep=1.0, orientation='vertical')
-    uiDiffZoomSldr.on_changed(plotDataCallback)
+    uiDiffZoomSldr.on_changed(plotDiffDataCallback)
 
     uiDiffPanAx = plt.axes([0.97, 0.11, 0.012, 0.09])
     uiDiffPanSldr = Slider(uiDiffPanAx, 'pan', 0, 100, valinit=50, valfmt='%d', valstep=1.0, orientation='vertical')
-    uiDiffPanSldr.on_changed(plotDataCallback)
+    uiDiffPanSldr.on_changed(plotDiffDataCallback)
 
     plotFig.canvas.mpl_connect('button_press_event', plotButtonPressCallback)
+    plotFig.canvas.mpl_connect('key_press_event', plotKeyPressCallback)
+
+    # shown until the metadata queries finish and plotting starts
+    uiStartupText = uiMeasAx.text(0.5, 0.5, 'Querying model metadata...', horizontalalignment='center', verticalalignment='center', transform=uiMeasAx.transAxes)
+
+    # message processing and plot updates are driven from the GUI thread
+    # by this timer that drains the queue filled by the subscriptions
+    uiDrainTimer = plotFig.canvas.new_timer(interval=drainInterval)
+    uiDrainTimer.add_callback(drainQueueCallback)
+    uiDrainTimer.start()
+
+    # redraws of plots flagged as dirty are capped at plotFrameRate
+    uiRedrawTimer = plotFig.canvas.new_timer(interval=int(1000/plotFrameRate))
+    uiRedrawTimer.add_callback(redrawPlotsCallback)
+    uiRedrawTimer.start()
 
 
 def configPlot(busList):
@@ -2566,18 +2555,18 @@ def configPlot(busList):
         for buspair in busList:
             buspair = buspair.upper()
             if ',' in buspair:
-                if buspair in busToMeasDict:
+                if metadata.measured(buspair):
                     plotBusDict[buspair] = buspair
             else:
-                if buspair+',A' in busToMeasDict:
+                if metadata.measured(buspair+',A'):
                     plotBusDict[buspair+',A'] = buspair+',A'
-                if buspair+',B' in busToMeasDict:
+                if metadata.measured(buspair+',B'):
                     plotBusDict[buspair+',B'] = buspair+',B'
-                if buspair+',C' in busToMeasDict:
+                if metadata.measured(buspair+',C'):
                     plotBusDict[buspair+',C'] = buspair+',C'
-                if buspair+',S1' in busToMeasDict:
+                if metadata.measured(buspair+',S1'):
                     plotBusDict[buspair+',S1'] = buspair+',S1'
-                if buspair+',S2' in busToMeasDict:
+                if metadata.measured(buspair+',S2'):
                     plotBusDict[buspair+',S2'] = buspair+',S2'
     else:
         # match connectivity node,phase pairs with the config file for determining
@@ -2593,18 +2582,18 @@ def configPlot(busList):
 
                     buspair = buspair.upper()
                     if ',' in buspair:
-                        if buspair in busToMeasDict:
+                        if metadata.measured(buspair):
                             plotBusDict[buspair] = buspair
                     else:
-                        if buspair+',A' in busToMeasDict:
+                        if metadata.measured(buspair+',A'):
                             plotBusDict[buspair+',A'] = buspair+',A'
-                        if buspair+',B' in busToMeasDict:
+                        if metadata.measured(buspair+',B'):
                             plotBusDict[buspair+',B'] = buspair+',B'
-                        if buspair+',C' in busToMeasDict:
+                        if metadata.measured(buspair+',C'):
                             plotBusDict[buspair+',C'] = buspair+',C'
-                        if buspair+',S1' in busToMeasDict:
+                        if metadata.measured(buspair+',S1'):
                             plotBusDict[buspair+',S1'] = buspair+',S1'
-                        if buspair+',S2' in busToMeasDict:
+                        if metadata.measured(buspair+',S2'):
                             plotBusDict[buspair+',S2'] = buspair+',S2'
             #print(appName + ': ' + str(plotBusDict), flush=True)
         except:
@@ -2612,27 +2601,19 @@ def configPlot(busList):
             exit()
 
     for pair in plotBusDict:
-        # create empty lists for the per pair data for each plot so we can
+        # create the per pair series in the stores for each plot so we can
         # just do append calls when data to plot arrives
-        estDataDict[pair] = []
-        tsEstDataDict[pair] = []
-        estDataPausedDict[pair] = []
-        tsEstDataPausedDict[pair] = []
-        measDataDict[pair] = []
-        tsMeasDataDict[pair] = []
-        measDataPausedDict[pair] = []
-        tsMeasDataPausedDict[pair] = []
+        estStore.addSeries(pair)
+        measStore.addSeries(pair)
 
         if not plotOverlayFlag:
-            diffEstDataDict[pair+' Est'] = []
-            tsDiffEstDataDict[pair+' Est'] = []
-            diffEstDataPausedDict[pair+' Est'] = []
-            tsDiffEstDataPausedDict[pair+' Est'] = []
+            diffEstStore.addSeries(pair+' Est')
             if sensorSimulatorRunningFlag:
-                diffMeasDataDict[pair+' Meas'] = []
-                tsDiffMeasDataDict[pair+' Meas'] = []
-                diffMeasDataPausedDict[pair+' Meas'] = []
-                tsDiffMeasDataPausedDict[pair+' Meas'] = []
+                diffMeasStore.addSeries(pair+' Meas')
+
+        # there are no plot lines without a plot window
+        if headlessFlag:
+            continue
 
         # create a lines dictionary entry per node/phase pair for each plot
         measLinesDict[pair], = uiMeasAx.plot([], [], label=plotBusDict[pair])
@@ -2654,13 +2635,19 @@ def configPlot(busList):
 
 
 def _main():
-    global appName, simID, modelMRID, gapps
+    global appName, simID, modelMRID, gapps, plotFrameRate, timingInterval
     global plotTitle, plotNumber, plotMagFlag, plotCompFlag, printDataFlag
     global plotStatsFlag, plotOverlayFlag, plotLegendFlag, plotMatchesFlag
     global sensorSimulatorRunningFlag, useSensorsForEstimatesFlag
+    global plotConfigFlag, startupMsgLimit
+    global startupReportPath, metadataDumpPath
+    global headlessFlag, recorder, metricsPublisher
+    global measStore, estStore, diffMeasStore, diffEstStore
 
     if len(sys.argv)<2 or '-help' in sys.argv:
         usestr =  '\nUsage: ' + sys.argv[0] + ' simID simReq\n'
+        usestr += '       ' + sys.argv[0] + ' -replay journalFile\n'
+        usestr += '       ' + sys.argv[0] + ' -synthetic buses\n'
         usestr += '''
 Optional command line arguments:
         -mag[nitude]: voltage magnitude plots should be created (default)
@@ -2723,6 +2710,103 @@ Optional command line arguments:
         -title: appends argument that follows to the standard title to allow
          plot windows to be distinguished from each other. The argument can be
          quoted to allow spaces.
+        -fps: maximum number of times per second each plot is redrawn given
+         as the argument that follows (default 4). Messages and slider changes
+         arriving between redraws are combined into a single redraw.
+        -maxlag: maximum seconds measurements are held waiting for the state
+         estimate with the same timestamp given as the argument that follows
+         (default 600). Measurements older than this relative to the latest
+         measurement are discarded.
+        -retain: maximum number of timestamps of plotted data for each plot
+         kept in memory given as the argument that follows. Older data is
+         moved to memory-mapped temporary files and is still plotted when
+         panning or zooming out. By default all data is kept in memory.
+         Memory use stays flat, but the temporary files grow with the whole
+         run by about 10 bytes per plotted value, 8 for the value itself and
+         the rest for the min/max summaries used when zoomed out.
+        -retainmb: maximum megabytes of plotted data kept in memory given as
+         the argument that follows, split evenly across the plotted data
+         streams. Can be combined with -retain.
+        -archive: directory for the temporary files used by -retain and
+         -retainmb given as the argument that follows (default is the system
+         temporary directory)
+        -nocache: always query the model metadata rather than using or
+         saving the local metadata cache, which is never used with -replay
+         or -synthetic
+        -recache: discard any cached metadata for the model and query it
+         again, saving the results to the cache
+        -cachedir: directory for the metadata cache files given as the
+         argument that follows (default ~/.cache/state-plotter)
+        -startupbuffer: maximum number of messages held while the model
+         metadata is queried at startup given as the argument that follows
+         (default 2000). The plot window is shown right away and held
+         messages are plotted once the queries finish. If more arrive the
+         oldest are dropped.
+        -startupreport: JSON file the startup report is written to given as
+         the argument that follows. The report has the wall time, payload
+         bytes, entry counts and peak memory for each startup phase, which
+         are also summarized in the log output. Payload bytes are only
+         measured with this option since each query response is serialized
+         again to measure it.
+        -dumpmetadata: JSON file the full bus,phase pair to estimate node,
+         measurement mRID and nominal voltage mappings are written to given
+         as the argument that follows
+        -record: runs without a plot window, writing the values that would be
+         plotted to the file given as the argument that follows until
+         interrupted with Ctrl-C or SIGTERM. The estimate, measurement and
+         difference values for the selected bus,phase pairs or statistics
+         are written in chunks of float32 columns with a timestamp index.
+         readRecording in seriesrecorder.py loads the file.
+        -journal: appends every simulation, sensor and state estimator
+         message received along with the metadata query responses to the
+         compressed, indexed journal file given as the argument that
+         follows. The metadata cache isn't used so the queries are made.
+        -replay: replays the journal file given as the argument that follows
+         in place of GridAPPS-D, answering the metadata queries and feeding
+         the messages through the same callbacks without a broker. The
+         simID and simReq arguments default to those of the journaled run.
+        -speed: multiple of real time the -replay or -synthetic messages
+         are fed at given as the argument that follows (default 1), where 0
+         feeds them as fast as they are processed. With -record the plotter
+         exits once they all have been processed.
+        -synthetic: generates a feeder with the number of buses given as
+         the argument that follows in place of GridAPPS-D, answering the
+         metadata queries and feeding simulation, sensor and state
+         estimator messages every 3 simulated seconds through the same
+         callbacks without a broker. The simID and simReq arguments default
+         to a simulation with the sensor simulator running.
+        -phasemix: proportions of three-phase, single-phase and split-phase
+         -synthetic buses given as the comma-separated argument that
+         follows (default 0.6,0.3,0.1)
+        -droprate: fraction of -synthetic sensor measurements dropped given
+         as the argument that follows (default 0.01)
+        -noise: standard deviation of the -synthetic sensor noise relative
+         to the voltage magnitude given as the argument that follows
+         (default 0.005), with estimates having half as much
+        -timestamps: number of -synthetic timestamps given as the argument
+         that follows (default 100)
+        -seed: seed for the -synthetic feeder and messages given as the
+         argument that follows (default 0)
+        -timing: seconds between hot path timing reports in the log given
+         as the argument that follows (default 60), where 0 turns them
+         off. Each report has the messages per second for each topic, the
+         bus,phase pairs appended and frames drawn per second, the
+         unmatched, late and dropped message totals, and the mean, 95th
+         percentile and maximum milliseconds for message decode, the
+         measurement join, appending pairs, statistics, set_data,
+         autoscale, draw_idle and whole messages and redraws since the
+         previous report. Pressing t in the plot window reports right away.
+        -metricsport: serves Prometheus text format metrics at /metrics on
+         the port given as the argument that follows, which may be given as
+         host:port to listen on other than 127.0.0.1. The metrics are the
+         messages received per topic, queue depth, join buffer sizes,
+         series and timestamps in each store, unmatched, late and dropped
+         message totals, resident memory and histograms of the hot path
+         stages including the estimate to render latency, refreshed each
+         second from the GUI thread.
+        -metricsfile: rewrites the file given as the argument that follows
+         with the same metrics each second, replacing it atomically so it
+         can be read by the node exporter textfile collector
         -print: print diagnostic bus,phase pair data for each timestamp
         -help: show this usage message
         '''
@@ -2730,15 +2814,57 @@ Optional command line arguments:
         exit()
 
     appName = sys.argv[0]
-    simID = sys.argv[1]
-    simReq = sys.argv[2]
+    # the simulation ID and request come from the journal with -replay or
+    # the generated feeder with -synthetic when they aren't given
+    simReq = None
+    if not sys.argv[1].startswith('-'):
+        simID = sys.argv[1]
+        simReq = sys.argv[2]
 
-    plotConfigFlag = False
     plotBusFlag = False
     plotPhaseFlag = False
     plotTitleFlag = False
+    plotFrameRateFlag = False
+    maxLagFlag = False
+    retainCountFlag = False
+    retainMegabytesFlag = False
+    archiveDirFlag = False
+    cacheDirFlag = False
+    cacheFlag = True
+    recacheFlag = False
     plotMatchesForceFlag = False
-    plotBusList = []
+    retainCount = None
+    retainMegabytes = None
+    archiveDir = None
+    cacheDir = None
+    startupBufferFlag = False
+    startupReportFlag = False
+    metadataDumpFlag = False
+    recordFlag = False
+    recordPath = None
+    journalFlag = False
+    journalPath = None
+    replayFlag = False
+    replayPath = None
+    feedSpeedFlag = False
+    feedSpeed = 1.0
+    syntheticFlag = False
+    syntheticBuses = None
+    phaseMixFlag = False
+    phaseMix = DEFAULT_PHASE_MIX
+    dropRateFlag = False
+    dropRate = 0.01
+    noiseFlag = False
+    noise = 0.005
+    timestampsFlag = False
+    timestamps = 100
+    seedFlag = False
+    seed = 0
+    timingFlag = False
+    metricsPortFlag = False
+    metricsAddress = None
+    metricsFileFlag = False
+    metricsPath = None
     for arg in sys.argv:
         if plotBusFlag:
             plotBusList.append(arg)
@@ -2749,6 +2875,74 @@ Optional command line arguments:
         elif plotTitleFlag:
             plotTitle = arg
             plotTitleFlag = False
+        elif plotFrameRateFlag:
+            plotFrameRate = max(float(arg), 0.1)
+            plotFrameRateFlag = False
+        elif maxLagFlag:
+            measJoin.maxLag = float(arg)
+            maxLagFlag = False
+        elif retainCountFlag:
+            retainCount = max(int(arg), 2)
+            retainCountFlag = False
+        elif retainMegabytesFlag:
+            retainMegabytes = float(arg)
+            retainMegabytesFlag = False
+        elif archiveDirFlag:
+            archiveDir = arg
+            archiveDirFlag = False
+        elif cacheDirFlag:
+            cacheDir = arg
+            cacheDirFlag = False
+        elif startupBufferFlag:
+            startupMsgLimit = max(int(arg), 1)
+            startupBufferFlag = False
+        elif startupReportFlag:
+            startupReportPath = arg
+            startupReportFlag = False
+        elif metadataDumpFlag:
+            metadataDumpPath = arg
+            metadataDumpFlag = False
+        elif recordFlag:
+            recordPath = arg
+            headlessFlag = True
+            recordFlag = False
+        elif journalFlag:
+            journalPath = arg
+            journalFlag = False
+        elif replayFlag:
+            replayPath = arg
+            replayFlag = False
+        elif feedSpeedFlag:
+            feedSpeed = max(float(arg), 0.0)
+            feedSpeedFlag = False
+        elif syntheticFlag:
+            syntheticBuses = max(int(arg), 1)
+            syntheticFlag = False
+        elif phaseMixFlag:
+            phaseMix = [max(float(share), 0.0) for share in arg.split(',')]
+            phaseMixFlag = False
+        elif dropRateFlag:
+            dropRate = min(max(float(arg), 0.0), 1.0)
+            dropRateFlag = False
+        elif noiseFlag:
+            noise = max(float(arg), 0.0)
+            noiseFlag = False
+        elif timestampsFlag:
+            timestamps = max(int(arg), 1)
+            timestampsFlag = False
+        elif seedFlag:
+            seed = int(arg)
+            seedFlag = False
+        elif timingFlag:
+            timingInterval = max(float(arg), 0.0)
+            timingFlag = False
+        elif metricsPortFlag:
+            host, _, port = arg.rpartition(':')
+            metricsAddress = (host or '127.0.0.1', int(port))
+            metricsPortFlag = False
+        elif metricsFileFlag:
+            metricsPath = arg
+            metricsFileFlag = False
         elif arg == '-legend':
             plotLegendFlag = True
         elif arg == '-all':
@@ -2790,10 +2984,137 @@ Optional command line arguments:
             plotPhaseFlag = True
         elif arg == '-title':
             plotTitleFlag = True
+        elif arg == '-fps':
+            plotFrameRateFlag = True
+        elif arg == '-maxlag':
+            maxLagFlag = True
+        elif arg == '-retain':
+            retainCountFlag = True
+        elif arg == '-retainmb':
+            retainMegabytesFlag = True
+        elif arg == '-archive':
+            archiveDirFlag = True
+        elif arg == '-nocache':
+            cacheFlag = False
+        elif arg == '-recache':
+            recacheFlag = True
+        elif arg == '-cachedir':
+            cacheDirFlag = True
+        elif arg == '-startupbuffer':
+            startupBufferFlag = True
+        elif arg == '-startupreport':
+            startupReportFlag = True
+        elif arg == '-dumpmetadata':
+            metadataDumpFlag = True
+        elif arg == '-record':
+            recordFlag = True
+        elif arg == '-journal':
+            journalFlag = True
+        elif arg == '-replay':
+            replayFlag = True
+        elif arg == '-speed':
+            feedSpeedFlag = True
+        elif arg == '-synthetic':
+            syntheticFlag = True
+        elif arg == '-phasemix':
+            phaseMixFlag = True
+        elif arg == '-droprate':
+            dropRateFlag = True
+        elif arg == '-noise':
+            noiseFlag = True
+        elif arg == '-timestamps':
+            timestampsFlag = True
+        elif arg == '-seed':
+            seedFlag = True
+        elif arg == '-timing':
+            timingFlag = True
+        elif arg == '-metricsport':
+            metricsPortFlag = True
+        elif arg == '-metricsfile':
+            metricsFileFlag = True
         elif arg == '-print':
             printDataFlag = True
 
-    gapps = GridAPPSD()
+    if not headlessFlag and \
+       (retainCount is not None or retainMegabytes is not None):
+        # bound the plotted data kept in memory, spilling the rest to disk
+        storeMegabytes = None
+        if retainMegabytes is not None:
+            storeMegabytes = retainMegabytes/4
+        for store in [measStore, estStore, diffMeasStore, diffEstStore]:
+            store.setRetention(retainCount, storeMegabytes, archiveDir)
+
+    # stand-ins for GridAPPS-D that feed messages from a thread once the
+    # subscriptions are made
+    feedClient = None
+    if replayPath:
+        try:
+            feedClient = ReplayGridAPPSD(replayPath, feedSpeed)
+        except (OSError, ValueError) as e:
+            print(appName + ': ERROR: unable to read journal file: ' + str(e), flush=True)
+            exit(1)
+
+        if simReq is None:
+            simID = feedClient.info['simID']
+            simReq = feedClient.info['simReq']
+        print(appName + ': replaying ' + str(len(feedClient.reader)) + ' journaled messages from ' + replayPath, flush=True)
+        gapps = feedClient
+    elif syntheticBuses:
+        if len(phaseMix)!=3 or sum(phaseMix)<=0.0:
+            print(appName + ': ERROR: -phasemix needs three comma-separated proportions that are not all zero', flush=True)
+            exit(1)
+
+        feedClient = SyntheticGridAPPSD(syntheticBuses, phaseMix, dropRate,
+                                        noise, timestamps, feedSpeed, seed)
+        if simReq is None:
+            simID = feedClient.simID
+            simReq = feedClient.simRequest
+        print(appName + ': generated synthetic feeder ' + feedClient.modelMRID + ' with ' + str(len(feedClient)) + ' bus,phase pairs', flush=True)
+        gapps = feedClient
+    elif simReq is None:
+        print(appName + ': ERROR: simID and simReq arguments are required without -replay or -synthetic', flush=True)
+        exit(1)
+    else:
+        try:
+            from gridappsd import GridAPPSD
+        except ImportError as e:
+            print(appName + ': ERROR: the gridappsd-python module is required to connect to GridAPPS-D: ' + str(e), flush=True)
+            exit(1)
+        gapps = GridAPPSD()
+
+    # journaled and synthetic models could share an mRID with a real model,
+    # so their metadata is neither taken from nor saved to the cache
+    if feedClient:
+        cacheFlag = False
+
+    journal = None
+    if journalPath:
+        try:
+            journal = MessageJournal(journalPath, {'version': __version__,
+                                                   'simID': simID,
+                                                   'simReq': simReq,
+                                                   'created': time.time()})
+        except OSError as e:
+            print(appName + ': ERROR: unable to create journal file: ' + str(e), flush=True)
+            gapps.disconnect()
+            exit(1)
+
+        gapps = JournalingGridAPPSD(gapps, journal)
+        # the query responses are only journaled when the queries are made
+        cacheFlag = False
+
+    if metricsAddress or metricsPath:
+        try:
+            metricsPublisher = MetricsPublisher(metricsAddress, metricsPath)
+        except OSError as e:
+            print(appName + ': ERROR: unable to serve metrics on port ' + str(metricsAddress[1]) + ': ' + str(e), flush=True)
+            gapps.disconnect()
+            exit(1)
+
+        if metricsAddress:
+            print(appName + ': serving metrics at http://' + metricsAddress[0] + ':' + str(metricsAddress[1]) + '/metrics', flush=True)
+        if metricsPath:
+            print(appName + ': writing metrics to ' + metricsPath, flush=True)
 
     # interrogate simReq to determine whether to subscribe to the sensor-
     # simulator service or to simulation output measurements
@@ -2808,34 +3129,11 @@ Optional command line arguments:
     if not sensorSimulatorRunningFlag:
         useSensorsForEstimatesFlag = False
 
-    # subscribe as early as possible to simulation or sensor measurements
-    # to avoid getting any estimates without corresponding measurements for
-    # a timestamp
-    if useSensorsForEstimatesFlag:
-        # subscribe to all simulation measurements for the bottom plot
-        gapps.subscribe(simulation_output_topic(simID), simulationCallback)
-
-        # if the user hasn't explicitly specified whether to plot matches
-        # don't plot matches when the sensor measurements are being used
-        if not plotMatchesForceFlag:
-            plotMatchesFlag = False
-
-    # query to get connectivity node,phase pairs
-    queryBusToEst()
-
-    # query to get bus to sensor mrid mapping
-    queryBusToSim()
-
-    # query to get the nominimal voltage mapping
-    queryVnom()
-
-    # matplotlib setup done before receiving any messages that reference it
-    initPlot(plotConfigFlag)
-
-    if plotConfigFlag or len(plotBusList)>0:
-        # determine what to plot based on the state-plotter-config file
-        # and finish plot initialization
-        configPlot(plotBusList)
+    metadataCache = None
+    if cacheFlag:
+        metadataCache = MetadataCache(cacheDir)
+        if recacheFlag:
+            metadataCache.invalidate(modelMRID)
 
     # determine which flavor of callback for measurements and estimates
     measCallback = measurementNoConfigCallback
@@ -2850,26 +3148,110 @@ Optional command line arguments:
         senCallback = sensorStatsCallback
         estCallback = estimateStatsCallback
 
+    # subscribe before the metadata queries so messages are buffered while
+    # they run, measurements ahead of estimates to avoid getting any
+    # estimates without corresponding measurements for a timestamp, with
+    # the callbacks run from the GUI thread when the queue is drained
+    if useSensorsForEstimatesFlag:
+        # subscribe to all simulation measurements for the bottom plot
+        gapps.subscribe(simulation_output_topic(simID),
+                        queueCallback(simulationCallback, (), 'simulation'))
+
+        # if the user hasn't explicitly specified whether to plot matches
+        # don't plot matches when the sensor measurements are being used
+        if not plotMatchesForceFlag:
+            plotMatchesFlag = False
+
     # subscribe to either sensor or simulation measurements for the top plot
     if useSensorsForEstimatesFlag:
         gapps.subscribe(service_output_topic('gridappsd-sensor-simulator',
-                                             simID), measCallback)
+                                             simID),
+                        queueCallback(measCallback, ('meas', 'diff'), 'sensor'))
     else:
-        gapps.subscribe(simulation_output_topic(simID), measCallback)
+        gapps.subscribe(simulation_output_topic(simID),
+                        queueCallback(measCallback, ('meas', 'diff'),
+                                      'simulation'))
 
         if sensorSimulatorRunningFlag:
             gapps.subscribe(service_output_topic('gridappsd-sensor-simulator',
-                                                 simID), senCallback)
+                                                 simID),
+                            queueCallback(senCallback, ('meas', 'diff'),
+                                          'sensor'))
 
     # subscribe to state-estimator output--with config file
-    gapps.subscribe(service_output_topic('state-estimator', simID), estCallback)
+    gapps.subscribe(service_output_topic('state-estimator', simID),
+                    queueCallback(estCallback, ('est', 'diff'), 'estimate'))
+
+    if feedClient:
+        def feedDone():
+            print(appName + ': fed ' + str(feedClient.count) + ' messages in ' + '{:.2f}'.format(feedClient.seconds) + ' seconds', flush=True)
+            feedDoneEvent.set()
 
-    # interactive plot event loop allows both the ActiveMQ messages to be
-    # received and plot GUI events
-    plt.show()
+        # messages start arriving as they would from the broker
+        feedClient.start(feedDone)
+
+    if headlessFlag:
+        # the same callbacks fill the recorder's stores instead
+        try:
+            recorder = SeriesRecorder(recordPath, {
+                    'version': __version__, 'model': modelMRID,
+                    'simID': simID, 'magnitude': plotMagFlag,
+                    'comparative': plotCompFlag,
+                    'statistics': plotStatsFlag,
+                    'overlay': plotOverlayFlag, 'match': plotMatchesFlag,
+                    'sensors': sensorSimulatorRunningFlag,
+                    'created': time.time()})
+        except OSError as e:
+            print(appName + ': ERROR: unable to create recording file: ' + str(e), flush=True)
+            gapps.disconnect()
+            exit(1)
+
+        measStore = recorder.store('meas')
+        estStore = recorder.store('est')
+        diffMeasStore = recorder.store('diff meas')
+        diffEstStore = recorder.store('diff est')
+        print(appName + ': recording to ' + recordPath + ' without a plot window', flush=True)
+    else:
+        # matplotlib setup done right away so the window is shown while the
+        # metadata is queried
+        with startupReport.phase('plot setup'):
+            initPlot(plotConfigFlag)
+
+    # query to get connectivity node,phase pairs, bus to sensor mrid mapping
+    # and the nominal voltage mapping, with the rest of the plot setup done
+    # from the GUI thread once they finish
+    threading.Thread(target=startupQueriesThread, args=(metadataCache,),
+                     daemon=True).start()
+
+    if headlessFlag:
+        # stop the same way for SIGTERM as for Ctrl-C
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            recordLoop()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            recorder.close({'tsInit': tsInit})
+            print('\n' + appName + ': recorded ' + ', '.join(str(len(store)) + ' ' + name for name, store in recorder.storeDict.items()) + ' timestamps to ' + recordPath, flush=True)
+    else:
+        # interactive plot event loop allows both the ActiveMQ messages to be
+        # received and plot GUI events
+        plt.show()
 
     gapps.disconnect()
 
+    if metricsPublisher:
+        # leave the final values in the file
+        publishMetrics()
+        metricsPublisher.close()
+
+    if journal:
+        journal.close()
+        print(appName + ': journaled ' + str(len(journal.indexList)) + ' messages, ' + str(journal.byteCount) + ' bytes, to ' + journalPath, flush=True)
+
+    if startupError:
+        exit(1)
+
 
 if __name__ == '__main__':
     _main()
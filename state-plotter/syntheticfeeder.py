@@ -0,0 +1,283 @@
+# ------------------------------------------------------------------------------
+# Copyright (c) 2019, Battelle Memorial Institute All rights reserved.
+# Battelle Memorial Institute (hereinafter Battelle) hereby grants permission to any person or entity
+# lawfully obtaining a copy of this software and associated documentation files (hereinafter the
+# Software) to redistribute and use the Software in source and binary forms, with or without modification.
+# Such person or entity may use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and may permit others to do so, subject to the following conditions:
+# Redistributions of source code must retain the above copyright notice, this list of conditions and the
+# following disclaimers.
+# Redistributions in binary form must reproduce the above copyright notice, this list of conditions and
+# the following disclaimer in the documentation and/or other materials provided with the distribution.
+# Other than as used herein, neither the name Battelle Memorial Institute or Battelle may be used in any
+# form whatsoever without the express written consent of Battelle.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL
+# BATTELLE OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY,
+# OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE
+# GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED
+# AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+# General disclaimer for use with OSS licenses
+#
+# This material was prepared as an account of work sponsored by an agency of the United States Government.
+# Neither the United States Government nor the United States Department of Energy, nor Battelle, nor any
+# of their employees, nor any jurisdiction or organization that has cooperated in the development of these
+# materials, makes any warranty, express or implied, or assumes any legal liability or responsibility for
+# the accuracy, completeness, or usefulness or any information, apparatus, product, software, or process
+# disclosed, or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or service by trade name, trademark, manufacturer,
+# or otherwise does not necessarily constitute or imply its endorsement, recommendation, or favoring by the United
+# States Government or any agency thereof, or Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by BATTELLE for the
+# UNITED STATES DEPARTMENT OF ENERGY under Contract DE-AC05-76RL01830
+"""
+Synthetic feeder and message generator for the state plotter.
+
+A SyntheticGridAPPSD stands in for the GridAPPSD object with a made-up
+feeder of any number of buses, so the plotter can be run at sizes beyond
+the models available. Each bus is three-phase, single-phase on one of A, B
+or C, or split-phase secondary with S1 and S2, chosen at random in the
+given proportions. Every bus,phase pair has a state estimate node and one
+PNV measurement.
+
+get_response answers the ConnectivityNode SPARQL query, the CIM Dictionary
+and the Vnom Export from the generated feeder. Once start is called, a
+thread delivers a simulation, sensor and state estimator message for each
+timestamp to the callbacks subscribed to those topics, the same way the
+broker listener would. Simulated voltages wander randomly around nominal.
+Sensor values add Gaussian noise with a standard deviation of noise times
+the magnitude and noise radians of angle, with a fraction of them dropped.
+Estimates carry half the sensor noise. Everything is drawn from a seeded
+generator so runs with the same arguments are identical.
+
+@author: Gary D. Black
+"""
+
+import json
+import threading
+import time
+import uuid
+
+import numpy as np
+
+# proportions of three-phase, single-phase and split-phase buses
+DEFAULT_PHASE_MIX = (0.6, 0.3, 0.1)
+
+START_TIMESTAMP = 1570041120
+INTERVAL = 3
+
+PRIMARY_VNOM = 2401.777
+SECONDARY_VNOM = 120.0
+PHASE_ANGLE_DICT = {'A': 0.0, 'B': -120.0, 'C': 120.0}
+
+# limits on how far the simulated voltages wander from nominal
+MAG_WANDER = 0.05
+ANG_WANDER = 3.0
+
+
+def wrapAngle(angle):
+    # degrees in (-180, 180]
+    return 180.0 - (180.0 - angle) % 360.0
+
+
+class SyntheticGridAPPSD:
+    def __init__(self, buses, phaseMix=DEFAULT_PHASE_MIX, dropRate=0.01,
+                 noise=0.005, timestamps=100, speed=0.0, seed=0):
+        self.dropRate = dropRate
+        self.noise = noise
+        self.timestamps = timestamps
+        self.speed = speed
+        self.rng = np.random.default_rng(seed)
+        self.callbackDict = {'sim': [], 'sen': [], 'est': []}
+        self.stopEvent = threading.Event()
+        self.thread = None
+        self.count = 0
+        self.seconds = 0.0
+
+        # the model mRID covers everything the metadata depends on so the
+        # metadata cache keeps different feeders apart
+        mix = np.array(phaseMix, dtype=float)
+        self.modelMRID = 'synthetic-' + str(buses) + '-' + \
+                '-'.join('{:g}'.format(share) for share in mix) + \
+                '-' + str(seed)
+        self.simID = 'synthetic'
+        self.simRequest = json.dumps({
+                'power_system_config': {'Line_name': self.modelMRID},
+                'service_configs': [
+                    {'id': 'gridappsd-sensor-simulator', 'user_options': {}},
+                    {'id': 'state-estimator', 'user_options':
+                        {'use-sensors-for-estimates': False}}]})
+
+        self._buildFeeder(buses, mix/mix.sum())
+
+    def _mrid(self):
+        return '_' + str(uuid.UUID(bytes=self.rng.bytes(16), version=4)).upper()
+
+    def _buildFeeder(self, buses, mix):
+        kinds = self.rng.choice(3, size=buses, p=mix)
+        primaries = self.rng.choice(['A', 'B', 'C'], size=buses)
+
+        self.busList = ['bus' + str(bus) for bus in range(buses)]
+        self.cnidList = [self._mrid() for bus in range(buses)]
+        self.vnomLineList = ['Bus, BusNumber, Phase1, Vnom1, Angle1, '
+                             'BusNumber, Phase2, Vnom2, Angle2, BusNumber, '
+                             'Phase3, Vnom3, Angle3']
+
+        # one row per bus,phase pair
+        pairBusList = []
+        pairPhaseList = []
+        vnomMagList = []
+        vnomAngList = []
+        for bus, (kind, primary) in enumerate(zip(kinds, primaries)):
+            name = self.busList[bus]
+            if kind == 2:
+                # secondary on the primary phase with S2 opposite S1
+                angle = PHASE_ANGLE_DICT[primary]
+                phaseDict = {'S1': angle, 'S2': wrapAngle(angle + 180.0)}
+                vnom = SECONDARY_VNOM
+                groups = [(1, angle), (2, phaseDict['S2']), (3, angle)]
+            else:
+                phaseDict = PHASE_ANGLE_DICT if kind==0 else \
+                        {primary: PHASE_ANGLE_DICT[primary]}
+                vnom = PRIMARY_VNOM
+                groups = [(1, 0.0), (2, -120.0), (3, 120.0)]
+
+            self.vnomLineList.append('"' + name.upper() + '",' + ','.join(
+                    '{},{},{:.3f},{:.2f}'.format(bus, number, vnom, angle)
+                    for number, angle in groups))
+
+            for phase, angle in phaseDict.items():
+                pairBusList.append(bus)
+                pairPhaseList.append(phase)
+                vnomMagList.append(vnom)
+                vnomAngList.append(angle)
+
+        self.pairBusArray = np.array(pairBusList)
+        self.pairPhaseList = pairPhaseList
+        self.pairCNIDList = [self.cnidList[bus] for bus in pairBusList]
+        self.measMRIDList = [self._mrid() for bus in pairBusList]
+        self.vnomMagArray = np.array(vnomMagList)
+        self.vnomAngArray = np.array(vnomAngList)
+        self.magOffset = np.zeros(len(pairBusList))
+        self.angOffset = np.zeros(len(pairBusList))
+
+    def __len__(self):
+        # number of bus,phase pairs
+        return len(self.measMRIDList)
+
+    def get_response(self, topic, request, timeout=None):
+        if isinstance(request, dict) and 'queryString' in request:
+            return {'data': {'results': {'bindings': [
+                    {'cnid': {'value': cnid}, 'cnname': {'value': name}}
+                    for name, cnid in zip(self.busList, self.cnidList)]}}}
+
+        configType = json.loads(request)['configurationType']
+        if configType == 'CIM Dictionary':
+            return {'data': {'feeders': [{'measurements': [
+                    {'mRID': mrid, 'measurementType': 'PNV',
+                     'ConnectivityNode': self.busList[bus],
+                     'phases': phase.lower()}
+                    for mrid, bus, phase in zip(self.measMRIDList,
+                                                self.pairBusArray,
+                                                self.pairPhaseList)]}]}}
+        if configType == 'Vnom Export':
+            return {'data': {'vnom': self.vnomLineList}}
+
+        raise ValueError('no synthetic response for ' + configType)
+
+    def subscribe(self, topic, callback):
+        if 'state-estimator' in topic:
+            kind = 'est'
+        elif 'sensor-simulator' in topic:
+            kind = 'sen'
+        else:
+            kind = 'sim'
+        self.callbackDict[kind].append(callback)
+
+    def _step(self):
+        # simulated magnitudes and angles for the next timestamp
+        count = len(self)
+        self.magOffset = np.clip(self.magOffset +
+                                 self.rng.normal(0.0, 0.002, count),
+                                 -MAG_WANDER, MAG_WANDER)
+        self.angOffset = np.clip(self.angOffset +
+                                 self.rng.normal(0.0, 0.1, count),
+                                 -ANG_WANDER, ANG_WANDER)
+        return self.vnomMagArray*(1.0 + self.magOffset), \
+               self.vnomAngArray + self.angOffset
+
+    def _noisy(self, mags, angs, noise):
+        count = len(self)
+        return mags*(1.0 + self.rng.normal(0.0, noise, count)), \
+               angs + np.degrees(self.rng.normal(0.0, noise, count))
+
+    def _measurementMessage(self, ts, mags, angs, keep=None):
+        mridList = self.measMRIDList
+        if keep is not None:
+            mridList = [mrid for mrid, kept in zip(mridList, keep) if kept]
+            mags = mags[keep]
+            angs = angs[keep]
+        return {'message': {'timestamp': ts, 'measurements': {
+                mrid: {'measurement_mrid': mrid, 'magnitude': mag,
+                       'angle': ang}
+                for mrid, mag, ang in zip(mridList, mags.tolist(),
+                                          angs.tolist())}}}
+
+    def _estimateMessage(self, ts, mags, angs):
+        return {'message': {'timestamp': ts, 'Estimate': {'SvEstVoltages': [
+                {'ConnectivityNode': cnid, 'phase': phase, 'v': mag,
+                 'angle': ang}
+                for cnid, phase, mag, ang in zip(self.pairCNIDList,
+                                                 self.pairPhaseList,
+                                                 mags.tolist(),
+                                                 angs.tolist())]}}}
+
+    def messages(self):
+        # (kind, message) for each message in delivery order, measurements
+        # before the estimate for the same timestamp
+        for step in range(self.timestamps):
+            ts = START_TIMESTAMP + INTERVAL*step
+            mags, angs = self._step()
+            if self.callbackDict['sim']:
+                yield 'sim', self._measurementMessage(ts, mags, angs)
+            if self.callbackDict['sen']:
+                senMags, senAngs = self._noisy(mags, angs, self.noise)
+                keep = self.rng.random(len(self)) >= self.dropRate
+                yield 'sen', self._measurementMessage(ts, senMags, senAngs,
+                                                      keep)
+            if self.callbackDict['est']:
+                yield 'est', self._estimateMessage(
+                        ts, *self._noisy(mags, angs, self.noise/2))
+
+    def start(self, doneCallback=None):
+        # deliver the messages from a thread as the broker listener would,
+        # calling doneCallback after the last one
+        def deliver():
+            start = time.monotonic()
+            for kind, message in self.messages():
+                if self.stopEvent.is_set():
+                    break
+                if self.speed > 0:
+                    ts = message['message']['timestamp']
+                    delay = start + (ts - START_TIMESTAMP)/self.speed - \
+                            time.monotonic()
+                    if delay > 0 and self.stopEvent.wait(delay):
+                        break
+                for callback in self.callbackDict[kind]:
+                    callback({}, message)
+                self.count += 1
+            self.seconds = time.monotonic() - start
+            if doneCallback:
+                doneCallback()
+
+        self.thread = threading.Thread(target=deliver, daemon=True)
+        self.thread.start()
+
+    def disconnect(self):
+        self.stopEvent.set()